@@ -0,0 +1,183 @@
+import os
+import json
+import hashlib
+import argparse
+import logging
+from dataclasses import dataclass, asdict
+from typing import Dict, List
+import numpy as np
+import OpenEXR
+import Imath
+from kriptomatte.domain.services.hashing import MurmurHashService
+
+logger = logging.getLogger(__name__)
+
+DISTRIBUTIONS = ("voronoi", "random")
+
+@dataclass
+class SyntheticExrSpec:
+    """
+    Parameters of a synthetic Cryptomatte EXR.
+    distribution:
+        "voronoi": every object is a soft-edged cell of a jittered grid, so each covers about
+                   1/objects of the frame and its neighbours fill the lower ranks (realistic).
+        "random":  every rank of every pixel holds a random object (worst case for masking).
+    softness: edge width of voronoi cells in pixels. Larger values fill more ranks.
+    """
+    width: int = 1920
+    height: int = 1080
+    ranks: int = 6
+    objects: int = 500
+    distribution: str = "voronoi"
+    softness: float = 2.0
+    half: bool = False
+    sidecar: bool = False
+    layer_name: str = "CryptoObject"
+    seed: int = 0
+
+def object_ids(names: List[str]) -> np.ndarray:
+    """Cryptomatte uint32 IDs of the names (MurmurHash3_32 with the exponent fix-up)."""
+    return MurmurHashService.hash_names(names)
+
+def _voronoi_ranks(spec: SyntheticExrSpec, rng: np.random.Generator, ids: np.ndarray):
+    # Jittered grid with about spec.objects cells
+    cols = max(1, int(round(np.sqrt(spec.objects * spec.width / spec.height))))
+    rows = max(1, int(np.ceil(spec.objects / cols)))
+    cell_w, cell_h = spec.width / cols, spec.height / rows
+    seeds_x = (np.arange(cols)[None, :] + rng.random((rows, cols))) * cell_w
+    seeds_y = (np.arange(rows)[:, None] + rng.random((rows, cols))) * cell_h
+    seed_ids = ids[np.arange(rows * cols) % ids.size].reshape(rows, cols)
+
+    rank_ids = np.zeros((spec.height, spec.width, spec.ranks), dtype=np.uint32)
+    rank_cov = np.zeros((spec.height, spec.width, spec.ranks), dtype=np.float32)
+    xs = np.arange(spec.width) + 0.5
+    offsets = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+    keep = min(spec.ranks, len(offsets))
+
+    # Row chunks keep the [rows, W, 9] temporaries small
+    chunk = max(1, (1 << 22) // spec.width)
+    for y0 in range(0, spec.height, chunk):
+        ys = np.arange(y0, min(spec.height, y0 + chunk)) + 0.5
+        cell_y = np.minimum((ys / cell_h).astype(int), rows - 1)[:, None]
+        cell_x = np.minimum((xs / cell_w).astype(int), cols - 1)[None, :]
+        dists, cand_ids = [], []
+        for dy, dx in offsets:
+            cy = np.clip(cell_y + dy, 0, rows - 1)
+            cx = np.clip(cell_x + dx, 0, cols - 1)
+            dists.append(np.hypot(seeds_x[cy, cx] - xs[None, :], seeds_y[cy, cx] - ys[:, None]))
+            cand_ids.append(seed_ids[cy, cx])
+        dists = np.stack(dists, axis=-1)
+        cand_ids = np.stack(cand_ids, axis=-1)
+
+        # Soft assignment: closer seeds get more coverage
+        weights = np.exp(-(dists - dists.min(axis=-1, keepdims=True)) / max(spec.softness, 1e-3))
+        # Clipped neighbours repeat a seed, drop the duplicates
+        order = np.argsort(cand_ids, axis=-1, kind="stable")
+        sorted_ids = np.take_along_axis(cand_ids, order, axis=-1)
+        dup = np.zeros_like(sorted_ids, dtype=bool)
+        dup[..., 1:] = sorted_ids[..., 1:] == sorted_ids[..., :-1]
+        np.put_along_axis(weights, order, np.where(dup, 0.0, np.take_along_axis(weights, order, axis=-1)), axis=-1)
+        weights[weights < 1e-3] = 0.0
+        weights /= weights.sum(axis=-1, keepdims=True)
+
+        top = np.argsort(-weights, axis=-1, kind="stable")[..., :keep]
+        cov = np.take_along_axis(weights, top, axis=-1)
+        chunk_ids = np.where(cov > 0, np.take_along_axis(cand_ids, top, axis=-1), 0)
+        rank_ids[y0:y0 + ys.size, :, :keep] = chunk_ids
+        rank_cov[y0:y0 + ys.size, :, :keep] = cov
+    return rank_ids, rank_cov
+
+def _random_ranks(spec: SyntheticExrSpec, rng: np.random.Generator, ids: np.ndarray):
+    rank_ids = ids[rng.integers(0, ids.size, size=(spec.height, spec.width, spec.ranks))]
+    rank_cov = rng.random((spec.height, spec.width, spec.ranks), dtype=np.float32)
+    rank_cov = -np.sort(-rank_cov, axis=-1)
+    rank_cov /= rank_cov.sum(axis=-1, keepdims=True)
+    return rank_ids, rank_cov
+
+def generate(path: str, spec: SyntheticExrSpec) -> Dict[str, str]:
+    """
+    Writes a synthetic Cryptomatte EXR (and its sidecar manifest if spec.sidecar).
+    Returns the manifest (name -> 8 digit hex ID).
+    """
+    if spec.distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution {spec.distribution}, expected one of {DISTRIBUTIONS}")
+    rng = np.random.default_rng(spec.seed)
+    names = [f"object_{i:05d}" for i in range(spec.objects)]
+    ids = object_ids(names)
+    manifest = {name: f"{obj_id:08x}" for name, obj_id in zip(names, ids.tolist())}
+
+    if spec.distribution == "voronoi":
+        rank_ids, rank_cov = _voronoi_ranks(spec, rng, ids)
+    else:
+        rank_ids, rank_cov = _random_ranks(spec, rng, ids)
+
+    header = OpenEXR.Header(spec.width, spec.height)
+    float_type = Imath.PixelType(Imath.PixelType.FLOAT)
+    coverage_type = Imath.PixelType(Imath.PixelType.HALF if spec.half else Imath.PixelType.FLOAT)
+    coverage_dtype = np.float16 if spec.half else np.float32
+
+    # Two ranks per RGBA channel group: R/B hold IDs, G/A hold coverage
+    channels, pixels = {}, {}
+    for rank in range(spec.ranks):
+        prefix = f"{spec.layer_name}{rank // 2:02d}"
+        id_name, cov_name = ("R", "G") if rank % 2 == 0 else ("B", "A")
+        channels[f"{prefix}.{id_name}"] = Imath.Channel(float_type)
+        channels[f"{prefix}.{cov_name}"] = Imath.Channel(coverage_type)
+        pixels[f"{prefix}.{id_name}"] = np.ascontiguousarray(rank_ids[:, :, rank]).tobytes()
+        pixels[f"{prefix}.{cov_name}"] = np.ascontiguousarray(rank_cov[:, :, rank]).astype(coverage_dtype).tobytes()
+    if spec.ranks % 2:
+        # Readers expect whole RGBA groups: an odd rank count gets an empty last rank
+        prefix = f"{spec.layer_name}{spec.ranks // 2:02d}"
+        channels[f"{prefix}.B"] = Imath.Channel(float_type)
+        channels[f"{prefix}.A"] = Imath.Channel(coverage_type)
+        pixels[f"{prefix}.B"] = np.zeros((spec.height, spec.width), dtype=np.float32).tobytes()
+        pixels[f"{prefix}.A"] = np.zeros((spec.height, spec.width), dtype=coverage_dtype).tobytes()
+    header["channels"] = channels
+
+    meta_prefix = f"cryptomatte/{hashlib.md5(spec.layer_name.encode()).hexdigest()[:7]}/"
+    header[meta_prefix + "name"] = spec.layer_name.encode("utf-8")
+    header[meta_prefix + "hash"] = b"MurmurHash3_32"
+    header[meta_prefix + "conversion"] = b"uint32_to_float32"
+    if spec.sidecar:
+        sidecar_name = os.path.splitext(os.path.basename(path))[0] + ".json"
+        with open(os.path.join(os.path.dirname(path), sidecar_name), "w") as f:
+            json.dump(manifest, f)
+        header[meta_prefix + "manif_file"] = sidecar_name.encode("utf-8")
+    else:
+        header[meta_prefix + "manifest"] = json.dumps(manifest).encode("utf-8")
+
+    out = OpenEXR.OutputFile(path, header)
+    try:
+        out.writePixels(pixels)
+    finally:
+        out.close()
+    logger.info("Wrote %s: %s", path, asdict(spec))
+    return manifest
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+    defaults = SyntheticExrSpec()
+    parser.add_argument('--width', type=int, default=defaults.width)
+    parser.add_argument('--height', type=int, default=defaults.height)
+    parser.add_argument('--ranks', type=int, default=defaults.ranks)
+    parser.add_argument('--objects', type=int, default=defaults.objects)
+    parser.add_argument('--distribution', choices=DISTRIBUTIONS, default=defaults.distribution)
+    parser.add_argument('--softness', type=float, default=defaults.softness)
+    parser.add_argument('--half', action='store_true', help='Store coverage channels as half floats')
+    parser.add_argument('--sidecar', action='store_true', help='Write the manifest to a sidecar JSON')
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+
+def spec_from_args(args: argparse.Namespace) -> SyntheticExrSpec:
+    return SyntheticExrSpec(width=args.width, height=args.height, ranks=args.ranks, objects=args.objects,
+                            distribution=args.distribution, softness=args.softness, half=args.half,
+                            sidecar=args.sidecar, seed=args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic Cryptomatte EXR.')
+    parser.add_argument('output', type=str, help='Path of the EXR to write')
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    generate(args.output, spec_from_args(args))
+
+if __name__ == "__main__":
+    main()
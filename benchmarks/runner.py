@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List
+import numpy as np
+from benchmarks.generator import generate, add_spec_arguments, spec_from_args
+from kriptomatte.application.services import CryptomatteExtractionService, OUTPUT_MODES
+from kriptomatte.domain.services.masking import MaskCompositionService, LabelDecompositionService, RankIndex
+from kriptomatte.domain.model.value_objects import CryptoID
+from kriptomatte.infrastructure.io.image_writer import ImageWriter
+from kriptomatte.infrastructure.persistence.exr_repository import OpenExrRepository
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process so far."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """
+    Times fn repeat times, then runs it once more under tracemalloc for its peak allocation
+    (NumPy reports its buffers to tracemalloc).
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": seconds,
+        "best": min(seconds),
+        "median": float(np.median(seconds)),
+        "peak_alloc_mb": peak / (1024 * 1024),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def run_benchmarks(exr_path: str, repeat: int = 3, legacy_objects: int = 20, encode_objects: int = 50,
+                   service_kwargs: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """
+    Times each pipeline stage on one EXR. Returns a JSON-serializable report.
+    """
+    service_kwargs = service_kwargs or {}
+    stages: Dict[str, Any] = {}
+    work_dir = tempfile.mkdtemp(prefix="km-bench-")
+    try:
+        # A fresh repository per call, so the manifest cache does not hide parsing
+        stages["load_header"] = measure(lambda: OpenExrRepository().load_header(exr_path), repeat)
+
+        repo = OpenExrRepository()
+        with repo.open_session(exr_path) as session:
+            layers = session.image.layers
+            stages["read_channels"] = measure(lambda: session.read_layers(layers), repeat)
+            stages["read_ranks"] = measure(lambda: session.read_ranks(layers), repeat)
+            layer = layers[0]
+            raw_data = session.read_layers([layer])[layer.name]
+
+        id_channels = raw_data[:, :, 0::2].view(np.uint32)
+        stages["unique_ids"] = measure(lambda: np.unique(id_channels), repeat)
+        stages["rank_index"] = measure(lambda: RankIndex.from_channels(raw_data), repeat)
+        rank_index = RankIndex.from_channels(raw_data)
+
+        visible = np.isin(layer.manifest.ids, np.unique(id_channels))
+        visible_ids = layer.manifest.ids[visible].tolist()
+
+        # The legacy path is O(objects), time a sample and report per object
+        sample = visible_ids[:legacy_objects]
+        legacy = measure(lambda: [MaskCompositionService.compute_mask(CryptoID.from_uint32(obj_id).value, raw_data)
+                                  for obj_id in sample], repeat)
+        legacy["objects"] = len(sample)
+        legacy["per_object"] = legacy["best"] / max(1, len(sample))
+        stages["compute_mask"] = legacy
+        indexed = measure(lambda: [MaskCompositionService.compute_mask(CryptoID.from_uint32(obj_id).value, raw_data,
+                                                                       rank_index)
+                                   for obj_id in sample], repeat)
+        indexed["objects"] = len(sample)
+        indexed["per_object"] = indexed["best"] / max(1, len(sample))
+        stages["compute_mask_indexed"] = indexed
+
+        stages["decompose"] = measure(lambda: LabelDecompositionService.decompose(visible_ids, raw_data), repeat)
+        stages["decompose"]["objects"] = len(visible_ids)
+
+        masks = [mask for _, mask in LabelDecompositionService.iter_masks(visible_ids[:encode_objects], raw_data)]
+        encode_dir = os.path.join(work_dir, "encode")
+
+        def encode():
+            for i, mask in enumerate(masks):
+                ImageWriter.save_mask(os.path.join(encode_dir, f"{i}.png"), mask)
+        encode_stage = measure(encode, repeat)
+        encode_stage["objects"] = len(masks)
+        encode_stage["per_object"] = encode_stage["best"] / max(1, len(masks))
+        stages["encode_png"] = encode_stage
+
+        def extract_all():
+            out_dir = os.path.join(work_dir, "extract")
+            shutil.rmtree(out_dir, ignore_errors=True)
+            CryptomatteExtractionService(OpenExrRepository(), **service_kwargs).extract_all(exr_path, out_dir)
+        stages["extract_all"] = measure(extract_all, repeat)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "input": exr_path,
+        "resolution": list(raw_data.shape[:2]),
+        "ranks": raw_data.shape[2] // 2,
+        "visible_objects": len(visible_ids),
+        "service": {key: str(value) for key, value in service_kwargs.items()},
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Formats the best time of each stage against a baseline report."""
+    lines = [f"{'stage':<16}{'baseline s':>12}{'current s':>12}{'ratio':>8}"]
+    for name, stage in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if base is None:
+            lines.append(f"{name:<16}{'-':>12}{stage['best']:>12.4f}{'-':>8}")
+            continue
+        ratio = stage["best"] / base["best"] if base["best"] else float("inf")
+        lines.append(f"{name:<16}{base['best']:>12.4f}{stage['best']:>12.4f}{ratio:>8.2f}")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Kriptomatte pipeline stages on a synthetic or given EXR.')
+    parser.add_argument('--input', '-i', type=str, default=None,
+                        help='Benchmark this EXR instead of generating a synthetic one')
+    add_spec_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--legacy-objects', type=int, default=20,
+                        help='Number of objects timed through the per-object compute_mask path')
+    parser.add_argument('--encode-objects', type=int, default=50, help='Number of masks timed through ImageWriter')
+    parser.add_argument('--output-mode', choices=OUTPUT_MODES, default='full')
+    parser.add_argument('--writers', type=int, default=0)
+    parser.add_argument('--output', '-o', type=str, default=None, help='Write the JSON report here')
+    parser.add_argument('--compare', type=str, default=None, help='Baseline JSON report to compare against')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    tmp_dir = None
+    exr_path = args.input
+    if exr_path is None:
+        tmp_dir = tempfile.mkdtemp(prefix="km-bench-input-")
+        exr_path = os.path.join(tmp_dir, "synthetic.exr")
+        spec = spec_from_args(args)
+        generate(exr_path, spec)
+    try:
+        report = run_benchmarks(exr_path, repeat=args.repeat, legacy_objects=args.legacy_objects,
+                                encode_objects=args.encode_objects,
+                                service_kwargs={"output_mode": args.output_mode, "writer_workers": args.writers})
+        if args.input is None:
+            report["synthetic"] = asdict(spec)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print("\n".join(compare(report, baseline)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import time
+import logging
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+from kriptomatte.domain.repositories import ImageRepository
+from kriptomatte.application.services import CryptomatteExtractionService
+from kriptomatte.infrastructure.logging.logger import setup_logger
+from kriptomatte.infrastructure.logging.metrics import StageMetrics
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class BatchResult:
+    file_path: str
+    seconds: float
+    error: str | None = None  # Formatted traceback, None on success
+    metrics: Dict[str, Any] | None = None  # StageMetrics.report() of this file
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+# One service per worker process, created by _init_worker
+_worker_service: CryptomatteExtractionService | None = None
+
+def _init_worker(repo_factory: Callable[[], ImageRepository], service_kwargs: Dict[str, Any], log_level: int):
+    global _worker_service
+    # Spawned workers (Windows, macOS) do not inherit the parent's handlers
+    setup_logger(level=log_level)
+    _worker_service = CryptomatteExtractionService(repo_factory(), **service_kwargs)
+
+def _extract_one(file_path: str, output_dir: str | None) -> BatchResult:
+    _worker_service.metrics.reset()
+    start = time.perf_counter()
+    try:
+        _worker_service.extract_all(file_path, output_dir)
+    except Exception:
+        return BatchResult(file_path=file_path, seconds=time.perf_counter() - start, error=traceback.format_exc(),
+                           metrics=_worker_service.metrics.report())
+    return BatchResult(file_path=file_path, seconds=time.perf_counter() - start,
+                       metrics=_worker_service.metrics.report())
+
+class BatchExtractionService:
+    """
+    Runs CryptomatteExtractionService.extract_all over many files on a process pool.
+    Each worker builds one repository and one extraction service and reuses them for every file it is given.
+    A failing file is reported in its BatchResult and does not stop the run.
+    """
+    def __init__(self, repo_factory: Callable[[], ImageRepository], workers: int = 1,
+                 service_kwargs: Dict[str, Any] | None = None, log_level: int = logging.INFO,
+                 metrics: StageMetrics | None = None):
+        """
+        repo_factory: picklable callable returning an ImageRepository (e.g. the OpenExrRepository class).
+        workers: number of worker processes. 0 runs every file in this process.
+        service_kwargs: keyword arguments for CryptomatteExtractionService.
+        metrics: StageMetrics the per-file metrics of every worker are merged into.
+        """
+        if workers < 0:
+            raise ValueError(f"Batch workers must be >= 0, got {workers}")
+        self.repo_factory = repo_factory
+        self.workers = workers
+        self.service_kwargs = service_kwargs or {}
+        self.log_level = log_level
+        self.metrics = metrics or StageMetrics()
+
+    def extract_files(self, file_paths: List[str], output_dir: str | None = None) -> List[BatchResult]:
+        """
+        Extracts every file. Returns one BatchResult per file, in input order.
+        """
+        total = len(file_paths)
+        logger.info("Batch extraction of %s files with %s workers", total, self.workers)
+        results: Dict[str, BatchResult] = {}
+
+        if self.workers == 0:
+            _init_worker(self.repo_factory, self.service_kwargs, self.log_level)
+            for file_path in file_paths:
+                results[file_path] = _extract_one(file_path, output_dir)
+                self._report(results[file_path], len(results), total)
+                self._merge_metrics(results[file_path])
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(self.repo_factory, self.service_kwargs, self.log_level)) as executor:
+                futures = {executor.submit(_extract_one, file_path, output_dir): file_path for file_path in file_paths}
+                for future in as_completed(futures):
+                    file_path = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception:
+                        # Worker process died (e.g. killed by the OOM killer)
+                        result = BatchResult(file_path=file_path, seconds=0.0, error=traceback.format_exc())
+                    results[file_path] = result
+                    self._report(result, len(results), total)
+                    self._merge_metrics(result)
+
+        failed = [result for result in results.values() if not result.ok]
+        logger.info("Batch finished: %s succeeded, %s failed.", total - len(failed), len(failed))
+        for result in failed:
+            logger.error("Failed: %s", result.file_path)
+        return [results[file_path] for file_path in file_paths]
+
+    def _merge_metrics(self, result: BatchResult):
+        if result.metrics:
+            self.metrics.merge(result.metrics)
+        self.metrics.count("failed_files" if not result.ok else "succeeded_files")
+
+    @staticmethod
+    def _report(result: BatchResult, done: int, total: int):
+        if result.ok:
+            logger.info("[%s/%s] Done %s in %.2fs", done, total, result.file_path, result.seconds)
+        else:
+            logger.error("[%s/%s] Failed %s:\n%s", done, total, result.file_path, result.error)
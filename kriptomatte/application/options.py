@@ -0,0 +1,57 @@
+# Choices and options of CryptomatteExtractionService, kept free of heavy imports so the CLI can list them cheaply.
+from kriptomatte.infrastructure.io.png_options import PngOptions
+
+# "full": one full-frame PNG per object.
+# "cropped": one PNG per object cropped to its bounding box, with the offset stored in PNG metadata.
+OUTPUT_MODES = ("full", "cropped")
+
+# "png": one PNG per object plus the packed-ID preview (PngSink).
+# "labels": one label map and JSON legend per layer (LabelMapSink).
+# "tiff": one multi-page TIFF per layer, a page per object (TiffSink).
+# "npz": one compressed .npz of cropped masks per layer (NpzSink).
+OUTPUT_FORMATS = ("png", "labels", "tiff", "npz")
+
+# Extraction options as plain JSON (built by cli.extraction_options, sent to the server), with their defaults
+EXTRACTION_OPTION_DEFAULTS = {"use_decomposition": True, "output_mode": "full", "writer_workers": 0,
+                              "memory_budget": None, "png_compress_level": None, "png_strategy": "default",
+                              "layers": [], "include": [], "exclude": [], "union": False, "output_formats": ["png"],
+                              "roi": None, "proxy": 1, "incremental": False, "masking_workers": 1}
+
+def describe_image(image, with_manifest: bool = True) -> dict:
+    """
+    JSON-ready description of an ExrImage: data window, and per layer its channels, rank count,
+    object count and, with_manifest, every manifest entry (name -> hex ID).
+    """
+    layers = []
+    for layer in image.layers:
+        manifest = layer.manifest
+        entry = {"name": layer.name, "channels": layer.channel_names, "ranks": len(layer.channel_names) // 2,
+                 "objects": len(manifest)}
+        if with_manifest:
+            entry["manifest"] = {name: f"{obj_id:08x}"
+                                 for name, obj_id in zip(manifest.names.tolist(), manifest.ids.tolist())}
+        layers.append(entry)
+    return {"width": image.window.width, "height": image.window.height, "layers": layers}
+
+def service_kwargs_from_options(options: dict) -> dict:
+    """CryptomatteExtractionService keyword arguments from extraction options (keys of EXTRACTION_OPTION_DEFAULTS)."""
+    from kriptomatte.domain.model.value_objects import ObjectSelection, BoundingBox
+    
+    unknown = set(options) - set(EXTRACTION_OPTION_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown extraction options {sorted(unknown)}")
+    options = {**EXTRACTION_OPTION_DEFAULTS, **options}
+    return dict(use_decomposition=options["use_decomposition"],
+                output_mode=options["output_mode"],
+                writer_workers=options["writer_workers"],
+                memory_budget=options["memory_budget"],
+                png_options=PngOptions(compress_level=options["png_compress_level"],
+                                       strategy=options["png_strategy"]),
+                selection=ObjectSelection(layers=tuple(options["layers"]), include=tuple(options["include"]),
+                                          exclude=tuple(options["exclude"])),
+                union=options["union"],
+                output_formats=options["output_formats"],
+                roi=BoundingBox(*options["roi"]) if options["roi"] else None,
+                proxy=options["proxy"],
+                incremental=options["incremental"],
+                masking_workers=options["masking_workers"])
@@ -0,0 +1,78 @@
+import os
+import logging
+from typing import Any, Dict
+from kriptomatte.domain.repositories import ImageRepository
+from kriptomatte.domain.services.masking import RankIndex
+from kriptomatte.domain.services.picking import PixelPickIndex, PickIndexService
+from kriptomatte.domain.model.value_objects import ColumnarManifest
+from kriptomatte.infrastructure.logging.metrics import StageMetrics
+from kriptomatte.infrastructure.persistence.extraction_record import ExtractionRecord
+from kriptomatte.infrastructure.persistence.pick_index_store import PickIndexStore
+
+logger = logging.getLogger(__name__)
+
+class ObjectPickService:
+    """
+    Answers "which objects are under this pixel" for one Cryptomatte layer of a file,
+    through a PixelPickIndex built from its rank data, without extracting any mask.
+    """
+    def __init__(self, repo: ImageRepository, metrics: StageMetrics | None = None):
+        self.repo = repo
+        self.metrics = metrics or StageMetrics()
+
+    def build(self, file_path: str, layer_name: str | None = None, top_k: int | None = None) -> PixelPickIndex:
+        """
+        Reads the ranks of one layer (the first one by default) and builds its index.
+        top_k: objects kept per pixel (all covered ranks by default), see PickIndexService.build.
+        """
+        with self.metrics.stage("load_header"):
+            session = self.repo.open_session(file_path)
+        with session:
+            layers = session.image.layers
+            layer = next((layer for layer in layers if layer_name in (None, layer.name)), None)
+            if layer is None:
+                raise ValueError(f"No Cryptomatte layer {layer_name!r} in {file_path}, "
+                                 f"found {[layer.name for layer in layers]}")
+            with self.metrics.stage("read_channels"):
+                ranks = session.read_ranks([layer])[layer.name]
+        manifest = layer.manifest if isinstance(layer.manifest, ColumnarManifest) else ColumnarManifest.from_dict(layer.manifest)
+        with self.metrics.stage("rank_index"):
+            rank_index = RankIndex.from_channels(ranks)
+        with self.metrics.stage("pick_index"):
+            index = PickIndexService.build(ranks, manifest, top_k=top_k, index=rank_index)
+        logger.info("Built pick index of layer %s of %s: %s objects, %s per pixel",
+                    layer.name, file_path, index.ids.size, index.top_k)
+        return index
+
+    def open(self, file_path: str, layer_name: str | None = None, top_k: int | None = None,
+             index_path: str | None = None) -> PixelPickIndex:
+        """
+        The index of a layer, memory-mapped from index_path when it was saved there for the same
+        input (mtime, size), layer and top_k. Otherwise it is built and, with an index_path, saved for reuse.
+        """
+        source = self._source(file_path, layer_name, top_k)
+        if index_path is not None and os.path.exists(index_path):
+            try:
+                index, saved_source = PickIndexStore.load(index_path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Ignoring unreadable pick index %s: %s", index_path, e)
+            else:
+                if saved_source == source:
+                    logger.debug("Reusing pick index %s", index_path)
+                    return index
+                logger.info("Pick index %s is stale, rebuilding", index_path)
+        index = self.build(file_path, layer_name, top_k)
+        if index_path is not None:
+            PickIndexStore.save(index_path, index, source)
+        return index
+
+    @staticmethod
+    def index_path_for(file_path: str, layer_name: str | None = None, output_dir: str | None = None) -> str:
+        """Default index location: {output_dir or the file's directory}/{base}[.{layer}].kmpick."""
+        base_name = os.path.splitext(os.path.basename(file_path))[0]
+        suffix = f".{layer_name}" if layer_name else ""
+        return os.path.join(output_dir or os.path.dirname(file_path), f"{base_name}{suffix}.kmpick")
+
+    @staticmethod
+    def _source(file_path: str, layer_name: str | None, top_k: int | None) -> Dict[str, Any]:
+        return {"input": ExtractionRecord.stat_input(file_path), "layer": layer_name, "top_k": top_k}
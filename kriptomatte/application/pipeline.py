@@ -0,0 +1,203 @@
+import time
+import queue
+import logging
+import threading
+import traceback
+from dataclasses import replace
+from typing import Any, Iterator, List, Tuple
+from kriptomatte.application.services import CryptomatteExtractionService
+from kriptomatte.application.sinks import LayerExtraction
+from kriptomatte.application.batch import BatchResult
+
+logger = logging.getLogger(__name__)
+
+# Messages from the masking stage to the sink stage, in order for each file:
+# (_FILE, path, read error, has frame), then for a read frame (_LAYER, extraction), (_MASK, mask)..., (_END_LAYER, None)
+# per layer and a final (_END_FILE, None), or (_ERROR, exception) if masking failed
+_FILE, _LAYER, _MASK, _END_LAYER, _END_FILE, _ERROR, _DONE = range(7)
+
+class PipelinedExtractionService:
+    """
+    Extracts a sequence of files with reading, masking and writing overlapped, in one process:
+      - a reader thread opens the next files and reads their channels (OpenEXR decompresses without the GIL),
+      - the calling thread masks the current file,
+      - a sink thread hands the masks of the previous file to the sinks, whose writer threads encode PNGs.
+    Stages are connected by bounded queues, so memory is bounded whatever the length of the sequence:
+    read_ahead: frames of channel data read and waiting to be masked.
+    mask_queue: masks computed and waiting for the sinks.
+    """
+    def __init__(self, service: CryptomatteExtractionService, read_ahead: int = 1, mask_queue: int = 64):
+        if read_ahead < 1:
+            raise ValueError(f"Read ahead must be >= 1, got {read_ahead}")
+        if mask_queue < 1:
+            raise ValueError(f"Mask queue depth must be >= 1, got {mask_queue}")
+        self.service = service
+        self.read_ahead = read_ahead
+        self.mask_queue = mask_queue
+        self.metrics = service.metrics
+
+    def extract_files(self, file_paths: List[str], output_dir: str | None = None) -> List[BatchResult]:
+        """
+        Extracts every file through the service's extract_all. Returns one BatchResult per file, in input order.
+        A failing file is reported in its BatchResult and does not stop the run.
+        """
+        logger.info("Pipelined extraction of %s files (read ahead %s, mask queue %s)",
+                    len(file_paths), self.read_ahead, self.mask_queue)
+        frames: queue.Queue = queue.Queue(maxsize=self.read_ahead)
+        masks: queue.Queue = queue.Queue(maxsize=self.mask_queue)
+        stop = threading.Event()
+        results: List[BatchResult] = []
+
+        reader = threading.Thread(target=self._read_stage, args=(file_paths, output_dir, frames, stop),
+                                  name="km-reader", daemon=True)
+        writer = threading.Thread(target=self._sink_stage, args=(output_dir, masks, results, len(file_paths), stop),
+                                  name="km-sinks", daemon=True)
+        reader.start()
+        writer.start()
+        try:
+            self._mask_stage(len(file_paths), frames, masks, stop)
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            reader.join()
+            writer.join()
+            # Frames read ahead and never masked, after an interruption
+            while not frames.empty():
+                _, frame, _ = frames.get_nowait()
+                if frame is not None:
+                    frame.session.close()
+
+        failed = [result for result in results if not result.ok]
+        logger.info("Pipeline finished: %s succeeded, %s failed.", len(results) - len(failed), len(failed))
+        by_path = {result.file_path: result for result in results}
+        return [by_path[file_path] for file_path in file_paths]
+
+    def _read_stage(self, file_paths: List[str], output_dir: str | None, frames: queue.Queue, stop: threading.Event):
+        for file_path in file_paths:
+            frame, error = None, None
+            try:
+                # Up-to-date files are not read, extract_all skips them
+                if not (self.service.incremental and self.service.up_to_date(file_path, output_dir)):
+                    frame = self.service.read_frame(file_path)
+            except Exception:
+                error = traceback.format_exc()
+            if not self._put(frames, (file_path, frame, error), stop):
+                if frame is not None:
+                    frame.session.close()
+                return
+
+    def _mask_stage(self, count: int, frames: queue.Queue, masks: queue.Queue, stop: threading.Event):
+        for _ in range(count):
+            with self.metrics.stage("read_wait"):
+                message = self._get(frames, stop)
+            if message is None:
+                return
+            file_path, frame, error = message
+            if not self._put(masks, (_FILE, file_path, error, frame is not None), stop):
+                return
+            if frame is None:
+                continue
+            try:
+                for extraction in self.service.extract_frame(frame):
+                    # Returning closes the frame generator, and with it the file
+                    if not self._put(masks, (_LAYER, replace(extraction, masks=iter(()))), stop):
+                        return
+                    for mask in extraction.masks:
+                        with self.metrics.stage("write_wait"):
+                            if not self._put(masks, (_MASK, mask), stop):
+                                return
+                    if not self._put(masks, (_END_LAYER, None), stop):
+                        return
+                self._put(masks, (_END_FILE, None), stop)
+            except Exception as e:
+                self._put(masks, (_ERROR, e), stop)
+        self._put(masks, (_DONE, None), stop)
+
+    def _sink_stage(self, output_dir: str | None, masks: queue.Queue, results: List[BatchResult], total: int,
+                    stop: threading.Event):
+        while True:
+            message = self._get(masks, stop)
+            if message is None or message[0] == _DONE:
+                return
+            _, file_path, error, has_frame = message
+            start = time.perf_counter()
+            stream = _FileStream(masks, stop) if has_frame else None
+            if error is None:
+                try:
+                    if stream is None:
+                        self.service.extract_all(file_path, output_dir)
+                    else:
+                        self.service.extract_all(file_path, output_dir, extractions=stream.extractions())
+                except Exception:
+                    error = traceback.format_exc()
+            if stream is not None:
+                # Skip what the sinks did not consume, so the next file starts at its own message
+                stream.drain()
+            result = BatchResult(file_path=file_path, seconds=time.perf_counter() - start, error=error)
+            results.append(result)
+            self.metrics.count("failed_files" if not result.ok else "succeeded_files")
+            if result.ok:
+                logger.info("[%s/%s] Done %s in %.2fs", len(results), total, file_path, result.seconds)
+            else:
+                logger.error("[%s/%s] Failed %s:\n%s", len(results), total, file_path, result.error)
+
+    @staticmethod
+    def _put(target: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        # Blocks while the queue is full (backpressure), gives up once the pipeline is stopped
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _get(source: queue.Queue, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+class _FileStream:
+    """The messages of one file in the mask queue, read back as LayerExtractions for extract_all."""
+    def __init__(self, masks: queue.Queue, stop: threading.Event):
+        self._masks = masks
+        self._stop = stop
+        self._finished = False
+
+    def _next(self) -> Tuple[int, Any]:
+        message = PipelinedExtractionService._get(self._masks, self._stop)
+        if message is None:
+            raise RuntimeError("Pipeline stopped")
+        if message[0] in (_END_FILE, _ERROR):
+            self._finished = True
+        if message[0] == _ERROR:
+            raise message[1]
+        return message
+
+    def extractions(self) -> Iterator[LayerExtraction]:
+        while True:
+            kind, item = self._next()
+            if kind == _END_FILE:
+                return
+            yield replace(item, masks=self._layer_masks())
+
+    def _layer_masks(self) -> Iterator:
+        while True:
+            kind, item = self._next()
+            if kind == _END_LAYER:
+                return
+            yield item
+
+    def drain(self):
+        while not self._finished:
+            try:
+                self._next()
+            except Exception:
+                pass
+            if self._stop.is_set():
+                return
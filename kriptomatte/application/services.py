@@ -1,119 +1,425 @@
 import os
 import logging
 import numpy as np
-from kriptomatte.domain.repositories import ImageRepository
-from kriptomatte.domain.services.masking import MaskCompositionService
-from kriptomatte.domain.services.visualization import BitwiseColorService
-from kriptomatte.domain.model.value_objects import CryptoID
-from kriptomatte.infrastructure.io.image_writer import ImageWriter
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+from kriptomatte.domain.repositories import ImageRepository, ImageSession
+from kriptomatte.domain.services.masking import MaskCompositionService, LabelDecompositionService, LabelDecomposition, BandAccumulator, RankIndex
+from kriptomatte.domain.services.parallel_masking import ParallelDecompositionService
+from kriptomatte.domain.model.value_objects import CryptoID, ColumnarManifest, PixelWindow, ObjectSelection, BoundingBox, RankData
+from kriptomatte.domain.model.entities import CryptomatteLayer, ObjectMask, SparseObjectMask
+from kriptomatte.infrastructure.io.image_writer import PngOptions
+from kriptomatte.infrastructure.logging.metrics import StageMetrics
+from kriptomatte.infrastructure.persistence.extraction_record import ExtractionRecord
+from kriptomatte.application.sinks import LayerExtraction, MaskSink, PngSink, LabelMapSink, TiffSink, NpzSink
+from kriptomatte.application.options import OUTPUT_MODES, OUTPUT_FORMATS
 
 logger = logging.getLogger(__name__)
 
+@dataclass
+class FrameData:
+    """
+    A file opened by CryptomatteExtractionService.read_frame, ready for extract_frame.
+    selected: layer name -> boolean mask of the selected manifest rows.
+    roi: region of the data window that is read. window: the output grid (the roi at proxy resolution).
+    layer_data: layer name -> RankData of the roi, None when they are streamed in bands (memory_budget).
+    """
+    file_path: str
+    session: ImageSession
+    layers: List[CryptomatteLayer]
+    selected: Dict[str, np.ndarray]
+    roi: BoundingBox
+    window: PixelWindow
+    layer_data: Dict[str, RankData] | None = None
+
 class CryptomatteExtractionService:
-    def __init__(self, repo: ImageRepository):
+    def __init__(self, repo: ImageRepository, use_decomposition: bool = True, output_mode: str = "full",
+                 writer_workers: int = 0, png_options: PngOptions | None = None, memory_budget: int | None = None,
+                 metrics: StageMetrics | None = None, selection: ObjectSelection | None = None, union: bool = False,
+                 output_formats: Sequence[str] = ("png",), roi: BoundingBox | None = None, proxy: int = 1,
+                 incremental: bool = False, masking_workers: int = 1):
+        """
+        use_decomposition: compute all masks of a layer in one pass (LabelDecompositionService).
+        Set to False to fall back to one compute_mask call per object.
+        output_mode: one of OUTPUT_MODES.
+        writer_workers: PNG encoding threads of the default PngSink (AsyncImageWriter). 0 encodes inline.
+        png_options: PNG compression level and strategy of the default PngSink.
+        memory_budget: bytes allowed for rank data. When set, channels are streamed in row bands
+        sized to the budget and masks are accumulated band by band (requires use_decomposition).
+        metrics: StageMetrics collecting per-stage timers and counters over every extraction.
+        selection: layers and objects to extract (everything by default). Unselected layers are not read
+        and unselected objects are never matched.
+        union: also compute one matte of all selected objects per layer (LayerExtraction.union_mask).
+        output_formats: OUTPUT_FORMATS written by extract_all when no sinks are given.
+        roi: region of the data window to extract. Only its scanlines are read and its columns are cropped
+        before masking; masks are then relative to the roi.
+        proxy: box-filter every mask to 1/proxy resolution (requires use_decomposition).
+        incremental: keep an ExtractionRecord per file in the output directory. Files whose input (mtime, size)
+        and options match their record are skipped, and outputs whose content did not change are not rewritten.
+        masking_workers: threads decomposing each frame in row bands (ParallelDecompositionService),
+        so one large frame uses several cores. 1 masks on the calling thread.
+        """
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode {output_mode}, expected one of {OUTPUT_MODES}")
+        if memory_budget is not None and not use_decomposition:
+            raise ValueError("Streaming with a memory budget requires use_decomposition")
+        if proxy < 1:
+            raise ValueError(f"Proxy factor must be >= 1, got {proxy}")
+        if proxy > 1 and not use_decomposition:
+            raise ValueError("Proxy resolution requires use_decomposition")
+        if masking_workers < 1:
+            raise ValueError(f"Masking workers must be >= 1, got {masking_workers}")
+        unknown = [output_format for output_format in output_formats if output_format not in OUTPUT_FORMATS]
+        if unknown or not output_formats:
+            raise ValueError(f"Unknown output formats {unknown or list(output_formats)}, expected some of {OUTPUT_FORMATS}")
         self.repo = repo
+        self.use_decomposition = use_decomposition
+        self.output_mode = output_mode
+        self.writer_workers = writer_workers
+        self.png_options = png_options
+        self.memory_budget = memory_budget
+        self.metrics = metrics or StageMetrics()
+        self.selection = selection or ObjectSelection()
+        self.union = union
+        self.output_formats = tuple(output_formats)
+        self.roi = roi
+        self.proxy = proxy
+        self.incremental = incremental
+        self.masking_workers = masking_workers
+        self._parallel = ParallelDecompositionService(masking_workers) if masking_workers > 1 else None
 
-    def extract_all(self, file_path: str, output_dir: str | None = None):
+    def extract_all(self, file_path: str, output_dir: str | None = None, sinks: List[MaskSink] | None = None,
+                    extractions: Iterable[LayerExtraction] | None = None):
         """
-        Extracts all masks from the given EXR file.
+        Extracts all masks from the given EXR file and hands them to every sink.
+        sinks: defaults to the sinks of output_formats (per-object PNGs and the packed-ID preview).
+        extractions: the LayerExtractions of file_path when they are computed elsewhere
+        (PipelinedExtractionService). Defaults to extract(file_path).
         """
         if output_dir is None:
             output_dir = os.path.dirname(file_path)
+        if sinks is None:
+            sinks = self.create_sinks()
+
+        record = None
+        if self.incremental:
+            if self.up_to_date(file_path, output_dir):
+                logger.info("Unchanged since the last extraction, skipping %s", file_path)
+                self.metrics.count("skipped_files")
+                return
+            record_path = ExtractionRecord.path_for(file_path, output_dir)
+            previous = ExtractionRecord.load(record_path, output_dir)
+            record = ExtractionRecord(output_dir, ExtractionRecord.stat_input(file_path), self.record_options(),
+                                      previous)
+            if previous is not None:
+                # Outputs are about to change, an interrupted run must not leave a matching record
+                os.remove(record_path)
+            for sink in sinks:
+                sink.record = record
+
+        try:
+            for sink in sinks:
+                sink.begin_file(file_path, output_dir)
+            
+            if extractions is None:
+                extractions = self.extract(file_path)
+            for extraction in extractions:
+                if record is not None:
+                    record.layers[extraction.layer.name] = {name: f"{obj_id:08x}"
+                                                            for name, obj_id in extraction.object_ids.items()}
+                for sink in sinks:
+                    sink.begin_layer(extraction)
+                
+                for obj_mask in extraction.masks:
+                    logger.debug("Saving mask for %s", obj_mask.name)
+                    obj_id = extraction.object_ids[obj_mask.name]
+                    for sink in sinks:
+                        sink.write_mask(extraction, obj_id, obj_mask)
+                
+                for sink in sinks:
+                    sink.end_layer(extraction)
+            
+            for sink in sinks:
+                sink.end_file()
+
+            if record is not None:
+                for stale_path in record.stale_outputs():
+                    if os.path.exists(stale_path):
+                        logger.info("Removing output of a previous extraction: %s", stale_path)
+                        os.remove(stale_path)
+                record.save(record_path)
+        finally:
+            for sink in sinks:
+                sink.close()
+                
+        logger.info("Extraction complete.")
+
+    def up_to_date(self, file_path: str, output_dir: str | None = None) -> bool:
+        """True when the ExtractionRecord of file_path matches its mtime, size and the current options."""
+        if output_dir is None:
+            output_dir = os.path.dirname(file_path)
+        record = ExtractionRecord.load(ExtractionRecord.path_for(file_path, output_dir), output_dir)
+        return record is not None and record.matches(ExtractionRecord.stat_input(file_path), self.record_options())
+
+    def record_options(self) -> Dict[str, object]:
+        """The options stored in ExtractionRecords: a file extracted with other options is not skipped."""
+        return {"output_mode": self.output_mode, "output_formats": list(self.output_formats),
+                "png_options": repr(self.png_options), "selection": repr(self.selection), "union": self.union,
+                "roi": repr(self.roi), "proxy": self.proxy}
+
+    def create_sinks(self) -> List[MaskSink]:
+        """One new sink per output format."""
+        sinks = []
+        for output_format in self.output_formats:
+            if output_format == "png":
+                sinks.append(PngSink(writer_workers=self.writer_workers, png_options=self.png_options,
+                                     metrics=self.metrics))
+            elif output_format == "labels":
+                sinks.append(LabelMapSink(png_options=self.png_options, metrics=self.metrics))
+            elif output_format == "tiff":
+                sinks.append(TiffSink(metrics=self.metrics))
+            elif output_format == "npz":
+                sinks.append(NpzSink(metrics=self.metrics))
+        return sinks
 
-        logger.info(f"Starting extraction for {file_path}")
+    def extract(self, file_path: str) -> Iterator[LayerExtraction]:
+        """
+        Extracts masks without writing anything: yields one LayerExtraction per Cryptomatte layer,
+        whose masks are NumPy arrays computed lazily. The file stays open until the generator is
+        exhausted or closed, and each layer's masks must be consumed before asking for the next layer.
+        """
+        yield from self.extract_frame(self.read_frame(file_path))
+
+    def read_frame(self, file_path: str) -> FrameData:
+        """
+        Opens a file and reads the channels of its selected layers, the I/O half of extract.
+        With a memory_budget only the header is read, bands are streamed by extract_frame.
+        The returned frame holds the open file: pass it to extract_frame, or close its session.
+        """
+        logger.info("Starting extraction for %s", file_path)
         
         # 1. Reconstitute Aggregate
+        # The session keeps the file open so the header is parsed once for all reads
         try:
-            exr_image = self.repo.load_header(file_path)
+            with self.metrics.stage("load_header"):
+                session = self.repo.open_session(file_path)
         except Exception as e:
-            logger.error(f"Failed to load EXR header: {e}")
+            logger.error("Failed to load EXR header: %s", e)
             raise
+        exr_image = session.image
 
-        base_name = os.path.splitext(os.path.basename(file_path))[0]
-
-        for layer in exr_image.layers:
-            logger.info(f"Processing layer: {layer.name}")
-            
-            # Create a folder for this layer
-            layer_folder = os.path.join(output_dir, f"{base_name}_{layer.name}")
-            os.makedirs(layer_folder, exist_ok=True)
-            
-            # 2. Load heavy data only when needed
-            logger.info(f"Reading channels for {layer.name}")
-            raw_data = self.repo.read_channels(file_path, layer.channel_names)
-            
-            # --- OPTIMIZATION START ---
-            logger.info(f"Analyzing visible objects in {layer.name}...")
-            
-            # Cryptomatte channels are alternating: [ID, Coverage, ID, Coverage, ...]
-            # We slice raw_data to get only the ID channels (indices 0, 2, 4, etc.)
-            id_channels = raw_data[:, :, 0::2]
-            
-            # Get all unique IDs present in the actual pixels
-            visible_ids = np.unique(id_channels)
-            
-            # Convert to a set for O(1) lookup speed
-            visible_ids_set = set(visible_ids)
-            logger.info(f"Found {len(visible_ids_set)} visible objects out of {len(layer.manifest)} in manifest.")
-            # --- OPTIMIZATION END ---
+        try:
+            # Unselected layers are never read
+            layers = [layer for layer in exr_image.layers if self.selection.matches_layer(layer.name)]
+            if len(layers) < len(exr_image.layers):
+                logger.info("Selected %s of %s layers", len(layers), len(exr_image.layers))
+            # Manifest rows of the selected objects, resolved through the manifest's name index
+            selected = {layer.name: self.selection.select(self._columnar_manifest(layer)) for layer in layers}
+            roi = self._resolve_roi(exr_image.window)
+            # Grid of every mask of this extraction: the roi, at proxy resolution
+            window = PixelWindow(height=roi.height, width=roi.width).downsampled(self.proxy)
+            frame = FrameData(file_path=file_path, session=session, layers=layers, selected=selected,
+                              roi=roi, window=window)
             
-            # 3. Domain logic to get masks
-            # layer.manifest is Dict[str, float]
-            # sort keys for deterministic order
-            sorted_names = sorted(layer.manifest.keys())
+            # 2. Load heavy data of every layer in one bulk read,
+            # or leave it to extract_frame to stream in row bands
+            if not self.memory_budget:
+                logger.info("Reading channels for %s layers", len(layers))
+                with self.metrics.stage("read_channels"):
+                    frame.layer_data = session.read_ranks(layers, roi)
+        except BaseException:
+            session.close()
+            raise
+        return frame
+
+    def extract_frame(self, frame: FrameData) -> Iterator[LayerExtraction]:
+        """
+        The compute half of extract: yields the LayerExtractions of a frame from read_frame
+        and closes its file when exhausted or closed.
+        """
+        self.metrics.count("files")
+        layers, selected, window = frame.layers, frame.selected, frame.window
+        
+        with frame.session as session:
+            # Keep only the per-object results of each band
+            if self.memory_budget:
+                layer_decompositions, union_masks = self._decompose_streaming(session, layers, selected, frame.roi,
+                                                                              window)
+            else:
+                layer_data = frame.layer_data
+                frame.layer_data = None
             
-            # Keep track of masks for the combined preview
-            layer_masks_for_preview = []
+            for layer in layers:
+                logger.info("Processing layer: %s", layer.name)
+                manifest = self._columnar_manifest(layer)
+                candidates = selected[layer.name]
             
-            for obj_name in sorted_names:
-                obj_id = layer.manifest[obj_name]
+                # --- OPTIMIZATION START ---
+                logger.info("Analyzing visible objects in %s...", layer.name)
                 
+                decomposition = None
+                union_mask = None
+                if self.memory_budget:
+                    decomposition = layer_decompositions.pop(layer.name)
+                    union_mask = union_masks.pop(layer.name, None)
+                    visible_ids = decomposition.visible_ids()
+                else:
+                    # Release each layer's data once it has been processed
+                    raw_data = layer_data.pop(layer.name)
+                    
+                    # One pass over the ranks: the IDs with coverage on each rank and the rows they span.
+                    # Masking then skips empty ranks, and the rows where an object does not appear
+                    with self.metrics.stage("rank_index"):
+                        rank_index = RankIndex.from_channels(raw_data)
+                    empty = rank_index.empty_ranks()
+                    if empty:
+                        logger.info("Skipping %s of %s ranks without coverage", empty, len(rank_index.ids))
+                        self.metrics.count("empty_ranks", empty)
+                    
+                    if self.union:
+                        # One pass over the ranks for the whole selection
+                        with self.metrics.stage("masking"):
+                            union_mask = self._union_mask(manifest.ids[candidates], raw_data, rank_index)
+                    
+                    if self.use_decomposition and self.selection.restricts_objects():
+                        # Only the selected IDs are matched
+                        with self.metrics.stage("masking"):
+                            decomposition = self._decompose(manifest.ids[candidates], raw_data, rank_index)
+                        visible_ids = decomposition.visible_ids()
+                    else:
+                        # IDs with coverage on any rank, IDs of zero coverage have empty masks
+                        visible_ids = rank_index.visible_ids()
+            
                 # --- FAST CHECK ---
-                # If the ID isn't in the pixel data, skip expensive computation entirely
-                if obj_id not in visible_ids_set:
-                    continue
-                # ------------------
-                
-                # compute_mask returns [H, W] uint8
-                mask = MaskCompositionService.compute_mask(obj_id, raw_data)
-                
-                # Optimization: check if empty (Double check, though visible_ids_set should handle 99% of cases)
-                if mask.min() == mask.max():
-                    logger.debug(f"Skipping empty mask for {obj_name}")
-                    continue
+                # Vectorized join of the manifest IDs against the pixel IDs.
+                # Objects that are not in the pixel data skip expensive computation entirely
+                visible = candidates & np.isin(manifest.ids, visible_ids)
                 
-                # Collect for preview (non-empty only)
-                # Convert float ID to uint32 for bitwise packing
-                id_obj = CryptoID(obj_id)
-                id_uint32 = id_obj.to_uint32()
-                layer_masks_for_preview.append((id_uint32, mask))
-                
-                logger.info(f"Saving mask for {obj_name}")
-                
-                # 4. Save
-                # Sanitize filename
-                safe_name = "".join([c for c in obj_name if c.isalnum() or c in (' ', '.', '_')]).strip()
-                save_path = os.path.join(layer_folder, f"{safe_name}_mask.png")
-                
-                ImageWriter.save_mask(save_path, mask)
+                # 3. Domain logic to get masks
+                # (name, uint32 ID) pairs, sorted by name for deterministic order
+                objects = sorted(zip(manifest.names[visible].tolist(), manifest.ids[visible].tolist()))
+                logger.info("Found %s visible objects out of %s in manifest.", len(objects), len(manifest))
+                self.metrics.count("layers")
+                self.metrics.count("visible_objects", len(objects))
+                # --- OPTIMIZATION END ---
             
-            # --- SUMMARY PREVIEW GENERATION ---
-            if layer_masks_for_preview:
-                logger.info(f"Generating summary preview for layer {layer.name}...")
-                
-                # Combine masks using actual IDs
-                combined_id_map = MaskCompositionService.combine_masks_with_ids(layer_masks_for_preview)
+                if decomposition is not None:
+                    obj_masks = self._iter_decomposed_masks(decomposition, objects, window)
+                else:
+                    obj_masks = self._iter_object_masks(objects, raw_data, rank_index)
                 
-                # Encode IDs to RGB
-                packed_preview = BitwiseColorService.encode_ids_to_rgb(combined_id_map)
-                
-                # Save preview
-                preview_filename = f"{base_name}_{layer.name}_mask.png"
-                preview_path = os.path.join(output_dir, preview_filename)
-                
-                logger.info(f"Saving packed ID preview to {preview_path}")
-                ImageWriter.save_mask(preview_path, packed_preview)
+                # Masks are produced lazily, only the time spent producing them is charged to masking
+                yield LayerExtraction(layer=layer, window=window, object_ids=dict(objects),
+                                      masks=self.metrics.timed_iter("masking", obj_masks), union_mask=union_mask)
+
+
+    def _decompose_streaming(self, session: ImageSession, layers: List[CryptomatteLayer], selected: Dict[str, np.ndarray],
+                             roi: BoundingBox, window: PixelWindow) -> Tuple[Dict[str, LabelDecomposition], Dict[str, np.ndarray]]:
+        """
+        Streams the roi of the layers in row bands sized to memory_budget and decomposes each band
+        against the selected manifest IDs. Peak memory for rank data is one band, whatever the image height.
+        window: the output grid (the roi at proxy resolution).
+        Returns the decomposition of every layer, and its union mask when union is set.
+        """
+        num_channels = sum(len(layer.channel_names) for layer in layers)
+        rows_per_band = self._rows_for_budget(roi.width, num_channels)
+        # Proxy blocks must not straddle two bands
+        rows_per_band = max(self.proxy, rows_per_band // self.proxy * self.proxy)
+        logger.info("Streaming %s layers in bands of %s rows", len(layers), rows_per_band)
+        
+        layer_ids = {layer.name: self._columnar_manifest(layer).ids[selected[layer.name]] for layer in layers}
+        accumulators = {layer_name: BandAccumulator(ids, window, self.proxy) for layer_name, ids in layer_ids.items()}
+        union_masks = {}
+        if self.union:
+            union_masks = {layer_name: np.zeros((window.height, window.width), dtype=np.uint8) for layer_name in layer_ids}
+        bands_iter = self.metrics.timed_iter("read_channels", session.iter_rank_bands(layers, rows_per_band, roi))
+        for first_row, bands in bands_iter:
+            logger.debug("Decomposing rows %s-%s", first_row, first_row + rows_per_band - 1)
+            with self.metrics.stage("masking"):
+                for layer_name, band in bands.items():
+                    accumulators[layer_name].add_decomposition(first_row, self._decompose(accumulators[layer_name].labels,
+                                                                                          band))
+                    if self.union:
+                        band_union = self._union_mask(layer_ids[layer_name], band)
+                        proxy_row = first_row // self.proxy
+                        union_masks[layer_name][proxy_row:proxy_row + band_union.shape[0]] = band_union
+        
+        with self.metrics.stage("masking"):
+            decompositions = {layer_name: accumulator.finalize() for layer_name, accumulator in accumulators.items()}
+        return decompositions, union_masks
+
+    def _decompose(self, obj_ids: np.ndarray | List[int], ranks: RankData,
+                   rank_index: RankIndex | None = None) -> LabelDecomposition:
+        if self._parallel is not None:
+            return self._parallel.decompose(obj_ids, ranks, self.proxy, rank_index)
+        return LabelDecompositionService.decompose(obj_ids, ranks, self.proxy, rank_index)
+
+    def _union_mask(self, obj_ids: np.ndarray, ranks: RankData, rank_index: RankIndex | None = None) -> np.ndarray:
+        if self._parallel is not None:
+            return self._parallel.union_mask(obj_ids, ranks, self.proxy, rank_index)
+        return MaskCompositionService.compute_union_mask(obj_ids, ranks, self.proxy, rank_index)
+
+    def _resolve_roi(self, frame: PixelWindow) -> BoundingBox:
+        if self.roi is None:
+            return BoundingBox(x_min=0, y_min=0, x_max=frame.width - 1, y_max=frame.height - 1)
+        roi = self.roi
+        if roi.x_min < 0 or roi.y_min < 0 or roi.x_max >= frame.width or roi.y_max >= frame.height \
+                or roi.width < 1 or roi.height < 1:
+            raise ValueError(f"Region of interest {roi} is outside the {frame.width}x{frame.height} data window")
+        return roi
+
+    def _rows_for_budget(self, width: int, num_channels: int) -> int:
+        # Per pixel: the decoded buffers and their rank planes (at most 2 x 4 bytes per channel),
+        # plus the decomposition temporaries of one rank (~32 bytes)
+        bytes_per_row = width * (num_channels * 8 + 32)
+        return max(1, self.memory_budget // max(1, bytes_per_row))
+
+    @staticmethod
+    def _columnar_manifest(layer: CryptomatteLayer) -> ColumnarManifest:
+        if isinstance(layer.manifest, ColumnarManifest):
+            return layer.manifest
+        return ColumnarManifest.from_dict(layer.manifest)
+
+    def _iter_decomposed_masks(self, decomposition: LabelDecomposition, objects: List[Tuple[str, int]],
+                               window: PixelWindow) -> Iterator[ObjectMask]:
+        """
+        Yields one mask per (name, uint32 ID) object with coverage from a finished decomposition.
+        Masks are SparseObjectMask in "cropped" mode and full-frame ObjectMask otherwise.
+        """
+        if self.output_mode == "cropped":
+            # Decomposition crops directly, full-frame masks are never allocated
+            yield from LabelDecompositionService.iter_sparse_masks_from(decomposition, objects, window)
+            return
+        
+        masks = LabelDecompositionService.iter_masks_from(decomposition, [obj_id for _, obj_id in objects], window)
+        for (obj_name, _), (_, mask) in zip(objects, masks):
+            if mask.min() == mask.max():
+                logger.debug("Skipping empty mask for %s", obj_name)
+                continue
+            yield ObjectMask(name=obj_name, mask_data=mask)
+
+    def _iter_object_masks(self, objects: List[Tuple[str, int]], raw_data: RankData,
+                           rank_index: RankIndex | None = None) -> Iterator[ObjectMask]:
+        """
+        Yields one mask per (name, uint32 ID) object with coverage, in objects order.
+        Masks are SparseObjectMask in "cropped" mode and full-frame ObjectMask otherwise.
+        """
+        if self.use_decomposition:
+            window = raw_data.window.downsampled(self.proxy)
+            decomposition = self._decompose([obj_id for _, obj_id in objects], raw_data, rank_index)
+            yield from self._iter_decomposed_masks(decomposition, objects, window)
+            return
+        
+        masks = (MaskCompositionService.compute_mask(CryptoID.from_uint32(obj_id).value, raw_data, rank_index)
+                 for _, obj_id in objects)
+        
+        for (obj_name, _), mask in zip(objects, masks):
+            # Optimization: check if empty (Double check, though the visible ID join should handle 99% of cases)
+            if mask.min() == mask.max():
+                logger.debug("Skipping empty mask for %s", obj_name)
+                continue
+            
+            if self.output_mode == "cropped":
+                yield SparseObjectMask.from_dense(obj_name, mask)
             else:
-                logger.warning(f"No masks found for layer {layer.name}, skipping preview.")
-                
-        logger.info("Extraction complete.")
+                yield ObjectMask(name=obj_name, mask_data=mask)
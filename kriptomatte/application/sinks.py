@@ -0,0 +1,283 @@
+import os
+import json
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Iterator, List
+import numpy as np
+from kriptomatte.domain.services.masking import PreviewAccumulator
+from kriptomatte.domain.services.visualization import BitwiseColorService
+from kriptomatte.domain.model.value_objects import PixelWindow
+from kriptomatte.domain.model.entities import CryptomatteLayer, ObjectMask, SparseObjectMask
+from kriptomatte.infrastructure.io.image_writer import ImageWriter, PngOptions
+from kriptomatte.infrastructure.io.async_writer import AsyncImageWriter
+from kriptomatte.infrastructure.io.tiff_writer import TiffStackWriter
+from kriptomatte.infrastructure.io.mask_archive import SparseMaskArchive
+from kriptomatte.infrastructure.persistence.extraction_record import ExtractionRecord
+from kriptomatte.infrastructure.logging.metrics import StageMetrics
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class LayerExtraction:
+    """
+    The masks of one Cryptomatte layer, as yielded by CryptomatteExtractionService.extract.
+    object_ids: name -> uint32 ID of every visible object, sorted by name.
+    masks: lazy iterator of ObjectMask (SparseObjectMask in "cropped" mode), in object_ids order,
+           empty masks skipped. It reads from the open file: consume it before the next layer.
+    union_mask: uint8 [H, W] matte of all selected objects, when the service computes unions.
+    """
+    layer: CryptomatteLayer
+    window: PixelWindow
+    object_ids: Dict[str, int]
+    masks: Iterator[ObjectMask]
+    union_mask: np.ndarray | None = None
+
+class MaskSink(ABC):
+    """
+    Destination of extracted masks. CryptomatteExtractionService.extract_all calls
+    begin_file, then begin_layer / write_mask... / end_layer per layer, then end_file
+    on success. close is always called last, also after a failure.
+    record: set by extract_all in incremental mode. Sinks register every output with it and skip
+    writing outputs whose content digest is the same as in the previous run.
+    """
+    record: ExtractionRecord | None = None
+
+    def begin_file(self, file_path: str, output_dir: str):
+        pass
+
+    def begin_layer(self, extraction: LayerExtraction):
+        pass
+
+    @abstractmethod
+    def write_mask(self, extraction: LayerExtraction, obj_id: int, mask: ObjectMask):
+        pass
+
+    def end_layer(self, extraction: LayerExtraction):
+        pass
+
+    def end_file(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _unchanged(self, path: str, *content) -> bool:
+        """Registers path with the record. True if it already holds this content (digest of content)."""
+        if self.record is None:
+            return False
+        if self.record.unchanged(path, ExtractionRecord.digest(*content) if content else None):
+            self.metrics.count("images_unchanged")
+            logger.debug("Unchanged, not rewritten: %s", path)
+            return True
+        return False
+
+def _mask_content(mask: ObjectMask) -> tuple:
+    # Cropped PNGs store their offset and frame size as well
+    if isinstance(mask, SparseObjectMask):
+        return mask.mask_data, mask.bbox, mask.window
+    return (mask.mask_data,)
+
+class PngSink(MaskSink):
+    """
+    Writes one PNG per object into {output_dir}/{base}_{layer}/, the packed-ID
+    preview to {output_dir}/{base}_{layer}_mask.png and the union matte, if any,
+    to {output_dir}/{base}_{layer}_union.png.
+    writer_workers: PNG encoding threads (AsyncImageWriter). 0 encodes inline.
+    """
+    def __init__(self, writer_workers: int = 0, png_options: PngOptions | None = None,
+                 metrics: StageMetrics | None = None):
+        self.writer_workers = writer_workers
+        self.png_options = png_options
+        self.metrics = metrics or StageMetrics()
+        self._writer: AsyncImageWriter | None = None
+
+    def begin_file(self, file_path: str, output_dir: str):
+        self._output_dir = output_dir
+        self._base_name = os.path.splitext(os.path.basename(file_path))[0]
+        self._writer = AsyncImageWriter(workers=self.writer_workers, options=self.png_options, metrics=self.metrics)
+
+    def begin_layer(self, extraction: LayerExtraction):
+        # Create a folder for this layer
+        self._layer_folder = os.path.join(self._output_dir, f"{self._base_name}_{extraction.layer.name}")
+        os.makedirs(self._layer_folder, exist_ok=True)
+        # The combined preview is folded in as masks are produced, so no mask outlives its write
+        self._preview = PreviewAccumulator(extraction.window)
+
+    def write_mask(self, extraction: LayerExtraction, obj_id: int, mask: ObjectMask):
+        # Fold into the preview (non-empty only), the uint32 ID is used for bitwise packing
+        with self.metrics.stage("preview"):
+            if isinstance(mask, SparseObjectMask):
+                self._preview.add_sparse(obj_id, mask)
+            else:
+                self._preview.add(obj_id, mask.mask_data)
+
+        # Sanitize filename
+        safe_name = "".join([c for c in mask.name if c.isalnum() or c in (' ', '.', '_')]).strip()
+        save_path = os.path.join(self._layer_folder, f"{safe_name}_mask.png")
+        if self._unchanged(save_path, self.png_options, *_mask_content(mask)):
+            return
+
+        if isinstance(mask, SparseObjectMask):
+            self._writer.save_sparse_mask(save_path, mask)
+        else:
+            self._writer.save_mask(save_path, mask.mask_data)
+
+    def end_layer(self, extraction: LayerExtraction):
+        layer = extraction.layer
+        # --- SUMMARY PREVIEW GENERATION ---
+        if self._preview.count:
+            logger.info("Generating summary preview for layer %s...", layer.name)
+
+            with self.metrics.stage("preview"):
+                # Encode IDs to RGB
+                packed_preview = BitwiseColorService.encode_ids_to_rgb(self._preview.id_map)
+
+            # Save preview
+            preview_path = os.path.join(self._output_dir, f"{self._base_name}_{layer.name}_mask.png")
+            if not self._unchanged(preview_path, self.png_options, packed_preview):
+                logger.info("Saving packed ID preview to %s", preview_path)
+                self._writer.save_mask(preview_path, packed_preview)
+        else:
+            logger.warning("No masks found for layer %s, skipping preview.", layer.name)
+        self._preview = None
+
+        if extraction.union_mask is not None:
+            union_path = os.path.join(self._output_dir, f"{self._base_name}_{layer.name}_union.png")
+            if not self._unchanged(union_path, self.png_options, extraction.union_mask):
+                logger.info("Saving union matte to %s", union_path)
+                self._writer.save_mask(union_path, extraction.union_mask)
+
+        # Wait for this layer's queued writes and surface any failure
+        self._writer.join()
+
+    def end_file(self):
+        self._writer.join()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+class LabelMapSink(MaskSink):
+    """
+    Writes one label map per layer to {output_dir}/{base}_{layer}_labels.png (uint16, 0 is background)
+    and its legend to {base}_{layer}_labels.json (object name -> label and hex Cryptomatte ID).
+    Labels are numbered from 1 in mask order; where objects overlap the highest coverage wins,
+    as in MaskCompositionService.combine_masks_sequentially. Above 65535 objects the map is a uint32 TIFF.
+    """
+    def __init__(self, png_options: PngOptions | None = None, metrics: StageMetrics | None = None):
+        self.png_options = png_options
+        self.metrics = metrics or StageMetrics()
+
+    def begin_file(self, file_path: str, output_dir: str):
+        self._output_dir = output_dir
+        self._base_name = os.path.splitext(os.path.basename(file_path))[0]
+
+    def begin_layer(self, extraction: LayerExtraction):
+        # Folded like the preview, with labels instead of Cryptomatte IDs
+        self._labels = PreviewAccumulator(extraction.window)
+        self._legend: Dict[str, Dict[str, object]] = {}
+
+    def write_mask(self, extraction: LayerExtraction, obj_id: int, mask: ObjectMask):
+        label = len(self._legend) + 1
+        self._legend[mask.name] = {"label": label, "id": f"{obj_id:08x}"}
+        with self.metrics.stage("preview"):
+            if isinstance(mask, SparseObjectMask):
+                self._labels.add_sparse(label, mask)
+            else:
+                self._labels.add(label, mask.mask_data)
+
+    def end_layer(self, extraction: LayerExtraction):
+        if not self._legend:
+            self._labels = None
+            return
+        label_map = self._labels.id_map
+        if len(self._legend) <= np.iinfo(np.uint16).max:
+            label_map = label_map.astype(np.uint16)
+        path = os.path.join(self._output_dir, f"{self._base_name}_{extraction.layer.name}_labels.png")
+        if label_map.dtype != np.uint16:
+            path = os.path.splitext(path)[0] + ".tif"
+        legend_path = os.path.splitext(path)[0] + ".json"
+        # Both files are registered with the record, the legend is rewritten with its map
+        if all([self._unchanged(output_path, self.png_options, label_map, self._legend) for output_path in (path, legend_path)]):
+            self._labels = None
+            return
+        with self.metrics.stage("encode"):
+            path = ImageWriter.save_label_map(path, label_map, options=self.png_options)
+            with open(legend_path, "w") as f:
+                json.dump({"layer": extraction.layer.name, "image": os.path.basename(path), "objects": self._legend},
+                          f, indent=2)
+        self.metrics.count("images_written")
+        logger.info("Saved label map of %s objects to %s", len(self._legend), path)
+        self._labels = None
+
+class TiffSink(MaskSink):
+    """
+    Writes the masks of each layer as pages of {output_dir}/{base}_{layer}.tif, one full-frame
+    page per object with the object name in its PageName tag. Pages are encoded as they arrive.
+    """
+    def __init__(self, compression: str = "tiff_adobe_deflate", metrics: StageMetrics | None = None):
+        self.compression = compression
+        self.metrics = metrics or StageMetrics()
+        self._stack: TiffStackWriter | None = None
+
+    def begin_file(self, file_path: str, output_dir: str):
+        self._output_dir = output_dir
+        self._base_name = os.path.splitext(os.path.basename(file_path))[0]
+
+    def write_mask(self, extraction: LayerExtraction, obj_id: int, mask: ObjectMask):
+        if self._stack is None:
+            # Opened on the first mask, a TIFF without pages is not valid
+            path = os.path.join(self._output_dir, f"{self._base_name}_{extraction.layer.name}.tif")
+            # Pages are encoded as they arrive, so the stack is rewritten whenever the file is
+            self._unchanged(path)
+            self._stack = TiffStackWriter(path, compression=self.compression)
+        with self.metrics.stage("encode"):
+            self._stack.add_page(mask.to_dense(), mask.name)
+        self.metrics.count("images_written")
+
+    def end_layer(self, extraction: LayerExtraction):
+        if self._stack is not None:
+            logger.info("Saved %s pages to %s", self._stack.pages, self._stack.path)
+        self.close()
+
+    def close(self):
+        if self._stack is not None:
+            self._stack.close()
+            self._stack = None
+
+class NpzSink(MaskSink):
+    """
+    Writes the masks of each layer, cropped to their bounding boxes, to one compressed
+    {output_dir}/{base}_{layer}.npz (see SparseMaskArchive).
+    """
+    def __init__(self, metrics: StageMetrics | None = None):
+        self.metrics = metrics or StageMetrics()
+
+    def begin_file(self, file_path: str, output_dir: str):
+        self._output_dir = output_dir
+        self._base_name = os.path.splitext(os.path.basename(file_path))[0]
+
+    def begin_layer(self, extraction: LayerExtraction):
+        self._masks: List[SparseObjectMask] = []
+        self._ids: List[int] = []
+
+    def write_mask(self, extraction: LayerExtraction, obj_id: int, mask: ObjectMask):
+        if not isinstance(mask, SparseObjectMask):
+            mask = SparseObjectMask.from_dense(mask.name, mask.mask_data)
+        self._masks.append(mask)
+        self._ids.append(obj_id)
+
+    def end_layer(self, extraction: LayerExtraction):
+        if self._masks:
+            path = os.path.join(self._output_dir, f"{self._base_name}_{extraction.layer.name}.npz")
+            content = [np.asarray(self._ids, dtype=np.uint32)]
+            for mask in self._masks:
+                content.extend((mask.name, *_mask_content(mask)))
+            if not self._unchanged(path, *content):
+                with self.metrics.stage("encode"):
+                    SparseMaskArchive.save(path, self._masks, self._ids, extraction.window)
+                self.metrics.count("images_written")
+                logger.info("Saved %s cropped masks to %s", len(self._masks), path)
+        self._masks, self._ids = [], []
@@ -1,13 +1,41 @@
 from dataclasses import dataclass, field
 from typing import List, Optional
 import numpy as np
-from .value_objects import Manifest
+from .value_objects import Manifest, BoundingBox, PixelWindow
 
 @dataclass
 class ObjectMask:
     name: str
     mask_data: np.ndarray  # Shape [H, W], dtype=uint8
 
+    def to_dense(self) -> np.ndarray:
+        return self.mask_data
+
+@dataclass
+class SparseObjectMask(ObjectMask):
+    """
+    ObjectMask cropped to the bounding box of its non-zero coverage.
+    mask_data holds only the cropped region, shape [bbox.height, bbox.width].
+    """
+    bbox: BoundingBox
+    window: PixelWindow
+
+    def to_dense(self) -> np.ndarray:
+        dense = np.zeros((self.window.height, self.window.width), dtype=self.mask_data.dtype)
+        dense[self.bbox.slices()] = self.mask_data
+        return dense
+
+    @classmethod
+    def from_dense(cls, name: str, mask: np.ndarray) -> Optional["SparseObjectMask"]:
+        """Crops a full-frame mask. Returns None if the mask has no coverage."""
+        rows = np.flatnonzero(mask.any(axis=1))
+        if not rows.size:
+            return None
+        cols = np.flatnonzero(mask.any(axis=0))
+        bbox = BoundingBox(x_min=int(cols[0]), y_min=int(rows[0]), x_max=int(cols[-1]), y_max=int(rows[-1]))
+        window = PixelWindow(height=mask.shape[0], width=mask.shape[1])
+        return cls(name=name, mask_data=mask[bbox.slices()].copy(), bbox=bbox, window=window)
+
 @dataclass
 class CryptomatteLayer:
     name: str
@@ -17,3 +45,5 @@ class CryptomatteLayer:
     
     # Metadata extracted from header
     id_prefix: str = ""
+    # Sidecar manifest file, empty when the manifest is embedded in the header
+    manifest_path: str = ""
@@ -1,13 +1,83 @@
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Sequence, Tuple
+import re
 import ctypes
-import struct
+import fnmatch
+import numpy as np
 
 @dataclass(frozen=True)
 class PixelWindow:
     height: int
     width: int
 
+    def downsampled(self, factor: int) -> "PixelWindow":
+        """Window of a proxy at 1/factor resolution, partial blocks on the edges included."""
+        return PixelWindow(height=-(-self.height // factor), width=-(-self.width // factor))
+
+@dataclass(frozen=True)
+class BoundingBox:
+    """Inclusive pixel bounds inside the data window."""
+    x_min: int
+    y_min: int
+    x_max: int
+    y_max: int
+
+    @property
+    def width(self) -> int:
+        return self.x_max - self.x_min + 1
+
+    @property
+    def height(self) -> int:
+        return self.y_max - self.y_min + 1
+
+    def slices(self) -> Tuple[slice, slice]:
+        """Returns (rows, cols) slices selecting this box from a full-frame array."""
+        return slice(self.y_min, self.y_max + 1), slice(self.x_min, self.x_max + 1)
+
+@dataclass(frozen=True, eq=False)
+class RankData:
+    """
+    Rank pairs of a Cryptomatte layer, split by type and stored rank-major, so each rank is one contiguous plane.
+    ids: uint32 [ranks, H, W], the bits of the float32 IDs.
+    coverage: [ranks, H, W] in the file's precision, float16 for half channels, float32 otherwise.
+    Coverage is summed in float32, so half coverage gives the same masks as its float32 upcast.
+    """
+    ids: np.ndarray
+    coverage: np.ndarray
+
+    @classmethod
+    def from_channels(cls, channels_arr: np.ndarray) -> "RankData":
+        """Zero-copy views of interleaved float32 [H, W, N_Channels] (ID, Coverage pairs per rank) data."""
+        end = channels_arr.shape[2] // 2 * 2
+        return cls(ids=np.moveaxis(channels_arr[:, :, 0:end:2].view(np.uint32), 2, 0),
+                   coverage=np.moveaxis(channels_arr[:, :, 1:end:2], 2, 0))
+
+    @classmethod
+    def of(cls, data: "RankData | np.ndarray") -> "RankData":
+        """Accepts RankData or interleaved channel data."""
+        return data if isinstance(data, RankData) else cls.from_channels(data)
+
+    @property
+    def num_ranks(self) -> int:
+        return self.ids.shape[0]
+
+    @property
+    def window(self) -> PixelWindow:
+        return PixelWindow(height=self.ids.shape[1], width=self.ids.shape[2])
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.coverage.nbytes
+
+    def rows(self, first: int, last: int) -> "RankData":
+        """Inclusive row range, as views."""
+        return RankData(ids=self.ids[:, first:last + 1], coverage=self.coverage[:, first:last + 1])
+
+    def coverage_of(self, rank: int) -> np.ndarray:
+        """float32 [H, W] coverage of one rank, converted only if stored as half."""
+        return self.coverage[rank].astype(np.float32, copy=False)
+
 @dataclass(frozen=True)
 class CryptoID:
     value: float
@@ -19,15 +89,110 @@ class CryptoID:
         return [0.0, float((bits << 8) & mask) / float(mask), float((bits << 16) & mask) / float(mask)]
 
     def to_hex(self) -> str:
-        packed = struct.pack('=f', self.value)
-        # Unpack as unsigned int to get hex representation
-        unpacked = struct.unpack("=I", packed)[0]
-        return f"{unpacked:08x}"
+        return f"{self.to_uint32():08x}"
 
     def to_uint32(self) -> int:
         """Returns the 32-bit unsigned integer representation of the float ID."""
-        packed = struct.pack('=f', self.value)
-        return struct.unpack("=I", packed)[0]
+        return int(np.float32(self.value).view(np.uint32))
+
+    @classmethod
+    def from_uint32(cls, value: int) -> "CryptoID":
+        return cls(float(np.uint32(value).view(np.float32)))
+
+class ColumnarManifest(Mapping):
+    """
+    Manifest stored as two parallel columns: names[i] has the 32-bit ID ids[i].
+    Reads like a Dict[str, float] (Object Name -> float ID), while the columns
+    allow vectorized joins against pixel IDs.
+    """
+    def __init__(self, names: Sequence[str], ids: np.ndarray):
+        self.names = np.asarray(names, dtype=object)
+        self.ids = np.ascontiguousarray(ids, dtype=np.uint32)
+        if self.names.shape != self.ids.shape:
+            raise ValueError(f"Manifest has {self.names.size} names but {self.ids.size} IDs")
+        self._index: Dict[str, int] | None = None
+        self._sorted: Tuple[np.ndarray, np.ndarray] | None = None
+
+    @property
+    def float_ids(self) -> np.ndarray:
+        """The IDs reinterpreted as float32, as stored in the EXR ID channels (no copy)."""
+        return self.ids.view(np.float32)
+
+    @classmethod
+    def from_dict(cls, manifest: Dict[str, float]) -> "ColumnarManifest":
+        float_ids = np.fromiter(manifest.values(), dtype=np.float32, count=len(manifest))
+        return cls(list(manifest.keys()), float_ids.view(np.uint32))
+
+    def __getitem__(self, name: str) -> float:
+        if self._index is None:
+            # Built on first lookup only
+            self._index = {name: i for i, name in enumerate(self.names.tolist())}
+        return float(self.float_ids[self._index[name]])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names.tolist())
+
+    def match(self, pattern: str) -> np.ndarray:
+        """
+        Boolean mask over names matching a case-sensitive glob (fnmatch syntax).
+        The literal prefix of the pattern is resolved by binary search over the sorted names,
+        so "char_*" or an exact name never scans the whole manifest.
+        """
+        matched = np.zeros(self.names.size, dtype=bool)
+        prefix = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+        if prefix == pattern:
+            if self._index is None:
+                self._index = {name: i for i, name in enumerate(self.names.tolist())}
+            if pattern in self._index:
+                matched[self._index[pattern]] = True
+            return matched
+
+        if self._sorted is None:
+            # Built on first glob only
+            order = np.argsort(self.names.astype(str), kind="stable")
+            self._sorted = order, self.names[order].astype(str)
+        order, sorted_names = self._sorted
+        start = np.searchsorted(sorted_names, prefix, side="left")
+        end = np.searchsorted(sorted_names, prefix + "\U0010ffff", side="right")
+        candidates = order[start:end]
+        if pattern != prefix + "*":
+            regex = re.compile(fnmatch.translate(pattern))
+            candidates = candidates[[regex.match(name) is not None for name in sorted_names[start:end].tolist()]]
+        matched[candidates] = True
+        return matched
+
+    def __len__(self) -> int:
+        return self.names.size
+
+@dataclass(frozen=True)
+class ObjectSelection:
+    """
+    Which layers and objects to extract, as case-sensitive globs.
+    layers: layer names to keep (all when empty).
+    include: object names to keep (all when empty).
+    exclude: object names dropped after include.
+    """
+    layers: Tuple[str, ...] = ()
+    include: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = ()
+
+    def matches_layer(self, layer_name: str) -> bool:
+        return not self.layers or any(fnmatch.fnmatchcase(layer_name, pattern) for pattern in self.layers)
+
+    def restricts_objects(self) -> bool:
+        return bool(self.include or self.exclude)
+
+    def select(self, manifest: ColumnarManifest) -> np.ndarray:
+        """Boolean mask over the manifest columns of the selected objects."""
+        if self.include:
+            selected = np.zeros(len(manifest), dtype=bool)
+            for pattern in self.include:
+                selected |= manifest.match(pattern)
+        else:
+            selected = np.ones(len(manifest), dtype=bool)
+        for pattern in self.exclude:
+            selected &= ~manifest.match(pattern)
+        return selected
 
 # Manifest is essentially a mapping of Object Name -> ID (float)
-Manifest = Dict[str, float]
+Manifest = Mapping[str, float]
@@ -1,7 +1,67 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Iterator, Tuple
 import numpy as np
 from .model.aggregates import ExrImage
+from .model.entities import CryptomatteLayer
+from .model.value_objects import BoundingBox, RankData
+
+class ImageSession(ABC):
+    """
+    An open image file. Keeps the file handle and parsed header for the whole extraction,
+    so several reads do not reopen the file. Use as a context manager.
+    """
+    image: ExrImage
+
+    @abstractmethod
+    def read_channels(self, channels: List[str]) -> np.ndarray:
+        """
+        Reads specific channels from the open file.
+        Returns a numpy array of shape [H, W, len(channels)].
+        """
+        pass
+
+    @abstractmethod
+    def read_layers(self, layers: List[CryptomatteLayer], roi: BoundingBox | None = None) -> Dict[str, np.ndarray]:
+        """
+        Reads the channels of all given layers in one bulk call.
+        roi: region of the data window to read (only its scanlines are decoded). Defaults to the whole window.
+        Returns layer name -> numpy array of shape [H, W, len(layer.channel_names)] (H, W of the roi).
+        """
+        pass
+
+    @abstractmethod
+    def iter_bands(self, layers: List[CryptomatteLayer], rows_per_band: int,
+                   roi: BoundingBox | None = None) -> Iterator[Tuple[int, Dict[str, np.ndarray]]]:
+        """
+        Streams the channels of all given layers in horizontal bands of at most rows_per_band rows.
+        Yields (first_row, layer name -> numpy array of shape [band_rows, W, len(layer.channel_names)]),
+        top to bottom. Only one band is held in memory at a time.
+        roi: as in read_layers. first_row is then relative to the top of the roi.
+        """
+        pass
+
+    def read_ranks(self, layers: List[CryptomatteLayer], roi: BoundingBox | None = None) -> Dict[str, RankData]:
+        """
+        Same as read_layers, as RankData: uint32 IDs and coverage in the file's precision, rank-major.
+        The default splits read_layers output; implementations can skip the float32 upcast and stack.
+        """
+        return {name: RankData.from_channels(data) for name, data in self.read_layers(layers, roi).items()}
+
+    def iter_rank_bands(self, layers: List[CryptomatteLayer], rows_per_band: int,
+                        roi: BoundingBox | None = None) -> Iterator[Tuple[int, Dict[str, RankData]]]:
+        """Same as iter_bands, as RankData."""
+        for first_row, bands in self.iter_bands(layers, rows_per_band, roi):
+            yield first_row, {name: RankData.from_channels(data) for name, data in bands.items()}
+
+    @abstractmethod
+    def close(self):
+        pass
+
+    def __enter__(self) -> "ImageSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
 class ImageRepository(ABC):
     @abstractmethod
@@ -19,3 +79,11 @@ class ImageRepository(ABC):
         Returns a numpy array of shape [H, W, len(channels)].
         """
         pass
+
+    @abstractmethod
+    def open_session(self, path: str) -> ImageSession:
+        """
+        Opens the file once and parses its header into session.image.
+        The session serves every channel read of an extraction.
+        """
+        pass
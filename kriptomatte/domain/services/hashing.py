@@ -1,5 +1,85 @@
 import struct
-from kriptomatte import pymmh3 as mmh3
+import numpy as np
+from typing import Iterable
+
+_C1 = 0xcc9e2d51
+_C2 = 0x1b873593
+_MASK = 0xffffffff
+
+# Names are hashed in groups of similar length, so padding stays small
+_BATCH_GROUP = 4096
+
+def murmurhash3_32(data: bytes, seed: int = 0) -> int:
+    """
+    Scalar MurmurHash3_x86_32 reference. Returns the unsigned 32-bit hash.
+    """
+    length = len(data)
+    h1 = seed & _MASK
+    nblocks = length // 4
+
+    for block_start in range(0, nblocks * 4, 4):
+        k1 = int.from_bytes(data[block_start:block_start + 4], "little")
+        k1 = (k1 * _C1) & _MASK
+        k1 = ((k1 << 15) | (k1 >> 17)) & _MASK
+        k1 = (k1 * _C2) & _MASK
+
+        h1 ^= k1
+        h1 = ((h1 << 13) | (h1 >> 19)) & _MASK
+        h1 = (h1 * 5 + 0xe6546b64) & _MASK
+
+    tail = data[nblocks * 4:]
+    if tail:
+        k1 = int.from_bytes(tail, "little")
+        k1 = (k1 * _C1) & _MASK
+        k1 = ((k1 << 15) | (k1 >> 17)) & _MASK
+        k1 = (k1 * _C2) & _MASK
+        h1 ^= k1
+
+    h1 ^= length
+    h1 ^= h1 >> 16
+    h1 = (h1 * 0x85ebca6b) & _MASK
+    h1 ^= h1 >> 13
+    h1 = (h1 * 0xc2b2ae35) & _MASK
+    h1 ^= h1 >> 16
+    return h1
+
+def _rotl32(x: np.ndarray, r: int) -> np.ndarray:
+    return (x << np.uint32(r)) | (x >> np.uint32(32 - r))
+
+def _murmurhash3_32_batch(encoded: list[bytes]) -> np.ndarray:
+    """
+    Vectorized MurmurHash3_x86_32 (seed 0) of byte strings.
+    Every string is zero-padded to the longest one (rounded to 4 bytes) and the
+    4-byte blocks are processed column by column, masked past each string's own blocks.
+    The zero padding makes each tail block read as the little-endian tail bytes.
+    """
+    lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded))
+    nblocks = lengths // 4
+    width = (int(lengths.max()) // 4 + 1) * 4 if lengths.size else 4
+
+    padded = np.zeros((len(encoded), width), dtype=np.uint8)
+    flat = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    rows = np.repeat(np.arange(len(encoded)), lengths)
+    cols = np.arange(flat.size) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    padded[rows, cols] = flat
+    blocks = padded.view("<u4").astype(np.uint32)
+
+    c1, c2 = np.uint32(_C1), np.uint32(_C2)
+    h1 = np.zeros(len(encoded), dtype=np.uint32)
+    with np.errstate(over="ignore"):
+        for column in range(blocks.shape[1]):
+            k1 = _rotl32(blocks[:, column] * c1, 15) * c2
+            mixed = _rotl32(h1 ^ k1, 13) * np.uint32(5) + np.uint32(0xe6546b64)
+            # Full block for strings that have it, tail block for the one right after
+            h1 = np.where(column < nblocks, mixed, np.where(column == nblocks, h1 ^ k1, h1))
+
+        h1 ^= lengths.astype(np.uint32)
+        h1 ^= h1 >> np.uint32(16)
+        h1 *= np.uint32(0x85ebca6b)
+        h1 ^= h1 >> np.uint32(13)
+        h1 *= np.uint32(0xc2b2ae35)
+        h1 ^= h1 >> np.uint32(16)
+    return h1
 
 class MurmurHashService:
     @staticmethod
@@ -7,10 +87,33 @@ class MurmurHashService:
         """
         Hashes a string name to a 32-bit float ID following the Cryptomatte specification.
         """
-        hash_32 = mmh3.hash(input_name)
+        hash_32 = murmurhash3_32(input_name.encode("utf-8"))
         exp = hash_32 >> 23 & 255
         if (exp == 0) or (exp == 255):
             hash_32 ^= 1 << 23
 
         packed = struct.pack('<L', hash_32 & 0xffffffff)
         return struct.unpack('<f', packed)[0]
+
+    @staticmethod
+    def hash_names(names: Iterable[str]) -> np.ndarray:
+        """
+        Hashes many names at once. Returns their uint32 Cryptomatte IDs, in input order,
+        with the same exponent fix-up as hash_name_to_float (no denormal, inf or NaN floats).
+        """
+        encoded = [name.encode("utf-8") for name in names]
+        ids = np.empty(len(encoded), dtype=np.uint32)
+        # Group by length so one long name does not pad the whole list
+        order = sorted(range(len(encoded)), key=lambda i: len(encoded[i]))
+        for start in range(0, len(order), _BATCH_GROUP):
+            group = order[start:start + _BATCH_GROUP]
+            ids[group] = _murmurhash3_32_batch([encoded[i] for i in group])
+
+        exp = (ids >> np.uint32(23)) & np.uint32(255)
+        ids[(exp == 0) | (exp == 255)] ^= np.uint32(1 << 23)
+        return ids
+
+    @staticmethod
+    def hash_names_to_float(names: Iterable[str]) -> np.ndarray:
+        """Same as hash_names, as a float32 array (zero-copy view of the IDs)."""
+        return MurmurHashService.hash_names(names).view(np.float32)
@@ -1,46 +1,180 @@
 import numpy as np
+from typing import Iterator, List, NamedTuple, Tuple
+from kriptomatte.domain.model.entities import SparseObjectMask
+from kriptomatte.domain.model.value_objects import BoundingBox, PixelWindow, RankData
+
+class RankIndex(NamedTuple):
+    """
+    Where each rank of a layer has coverage, built in one pass over the rank data.
+    ids: per rank, sorted unique uint32 IDs with non-zero coverage on that rank.
+    first_rows, last_rows: per rank, the first and last row where each of those IDs has coverage.
+    Higher ranks are often empty: masking skips them, and the rows where an object does not appear.
+    """
+    ids: Tuple[np.ndarray, ...]
+    first_rows: Tuple[np.ndarray, ...]
+    last_rows: Tuple[np.ndarray, ...]
+
+    @classmethod
+    def from_channels(cls, channels_arr: RankData | np.ndarray) -> "RankIndex":
+        """channels_arr: RankData, or numpy array of shape [H, W, N_Channels] (ID, Coverage pairs per rank)."""
+        ranks = RankData.of(channels_arr)
+        height, width = ranks.window.height, ranks.window.width
+        ids, first_rows, last_rows = [], [], []
+        for rank in range(ranks.num_ranks):
+            covered = ranks.coverage[rank] != 0
+            if not covered.any():
+                ids.append(np.zeros(0, dtype=np.uint32))
+                first_rows.append(np.zeros(0, dtype=np.int64))
+                last_rows.append(np.zeros(0, dtype=np.int64))
+                continue
+            # Objects are mostly contiguous: work on runs of one ID along a row, not on pixels
+            rank_ids = ranks.ids[rank]
+            run_starts = np.empty((height, width), dtype=bool)
+            run_starts[:, 0] = True
+            np.not_equal(rank_ids[:, 1:], rank_ids[:, :-1], out=run_starts[:, 1:])
+            runs = np.flatnonzero(run_starts)
+            del run_starts
+            # Runs with coverage on at least one of their pixels
+            runs = runs[np.logical_or.reduceat(covered.ravel(), runs)]
+            run_ids = rank_ids.ravel()[runs]
+            run_rows = runs // width
+            # Stable, so each ID's runs stay in row order: its first and last runs give its rows
+            order = np.argsort(run_ids, kind="stable")
+            run_ids = run_ids[order]
+            run_rows = run_rows[order]
+            starts = np.flatnonzero(np.r_[True, run_ids[1:] != run_ids[:-1]])
+            ends = np.r_[starts[1:], run_ids.size] - 1
+            ids.append(run_ids[starts])
+            first_rows.append(run_rows[starts])
+            last_rows.append(run_rows[ends])
+        return cls(tuple(ids), tuple(first_rows), tuple(last_rows))
+
+    def visible_ids(self) -> np.ndarray:
+        """uint32 IDs with coverage on at least one rank."""
+        if not self.ids:
+            return np.zeros(0, dtype=np.uint32)
+        return np.unique(np.concatenate(self.ids))
+
+    def empty_ranks(self) -> int:
+        return sum(1 for rank_ids in self.ids if not rank_ids.size)
+
+    def rows_for(self, rank: int, obj_ids: np.ndarray) -> Tuple[int, int] | None:
+        """
+        (first, last) rows of the rank where any of the sorted uint32 obj_ids has coverage,
+        None if none of them appears on the rank.
+        """
+        rank_ids = self.ids[rank]
+        if not rank_ids.size or not obj_ids.size:
+            return None
+        present = np.isin(rank_ids, obj_ids, assume_unique=True)
+        if not present.any():
+            return None
+        return int(self.first_rows[rank][present].min()), int(self.last_rows[rank][present].max())
+
+    def rank_rows(self, obj_id: int) -> List[Tuple[int, int, int]]:
+        """(rank, first row, last row) of every rank where one uint32 obj_id has coverage."""
+        found = []
+        for rank, rank_ids in enumerate(self.ids):
+            pos = np.searchsorted(rank_ids, np.uint32(obj_id))
+            if pos < rank_ids.size and rank_ids[pos] == obj_id:
+                found.append((rank, int(self.first_rows[rank][pos]), int(self.last_rows[rank][pos])))
+        return found
 
 class MaskCompositionService:
     @staticmethod
-    def get_coverage_for_rank(float_id: float, combined_cryptomattes: np.ndarray, rank: int) -> np.ndarray:
+    def get_coverage_for_rank(float_id: float, combined_cryptomattes: RankData | np.ndarray, rank: int) -> np.ndarray:
         """
-        Get the coverage mask for a given rank.
-        combined_cryptomattes is [H, W, Channels] where Channels are R, G, B, A sequences.
+        Get the float32 coverage mask for a given rank.
+        combined_cryptomattes is RankData, or [H, W, Channels] where Channels are R, G, B, A sequences.
         Rank 0 corresponds to channels 0 (ID) and 1 (Coverage).
         Rank 1 corresponds to channels 2 (ID) and 3 (Coverage).
         """
+        ranks = RankData.of(combined_cryptomattes)
         # Ensure we don't go out of bounds
-        if (rank * 2 + 1) >= combined_cryptomattes.shape[2]:
-            return np.zeros((combined_cryptomattes.shape[0], combined_cryptomattes.shape[1]), dtype=np.float32)
+        if rank >= ranks.num_ranks:
+            return np.zeros((ranks.window.height, ranks.window.width), dtype=np.float32)
 
-        id_rank = combined_cryptomattes[:, :, rank * 2] == float_id
-        coverage_rank = combined_cryptomattes[:, :, rank * 2 + 1] * id_rank
+        # Compare the raw 32 bits, not float values
+        id_rank = ranks.ids[rank] == np.float32(float_id).view(np.uint32)
+        coverage_rank = ranks.coverage_of(rank) * id_rank
 
         return coverage_rank
 
     @staticmethod
-    def compute_mask(obj_float_id: float, channels_arr: np.ndarray) -> np.ndarray:
+    def compute_mask(obj_float_id: float, channels_arr: RankData | np.ndarray, index: RankIndex | None = None) -> np.ndarray:
         """
         Computes the mask for a specific object ID from the raw channel data.
-        channels_arr: numpy array of shape [H, W, N_Channels]
+        channels_arr: RankData, or numpy array of shape [H, W, N_Channels]
+        index: RankIndex of channels_arr, to only scan the ranks and rows where the object has coverage.
         """
+        ranks = RankData.of(channels_arr)
+        if index is not None:
+            coverage = np.zeros((ranks.window.height, ranks.window.width), dtype=np.float32)
+            for rank, first, last in index.rank_rows(int(np.float32(obj_float_id).view(np.uint32))):
+                coverage[first:last + 1] += MaskCompositionService.get_coverage_for_rank(obj_float_id,
+                                                                                         ranks.rows(first, last), rank)
+            coverage = np.clip(coverage, 0.0, 1.0)
+            return (coverage * 255).astype(np.uint8)
+
         # Calculate number of ranks (pairs of ID/Coverage)
-        # Each rank is 2 channels.
-        num_ranks = channels_arr.shape[2] // 2
+        num_ranks = ranks.num_ranks
         
         coverage_list = []
         for rank in range(num_ranks):
-            coverage_rank = MaskCompositionService.get_coverage_for_rank(obj_float_id, channels_arr, rank)
+            coverage_rank = MaskCompositionService.get_coverage_for_rank(obj_float_id, ranks, rank)
             coverage_list.append(coverage_rank)
         
         if not coverage_list:
-            return np.zeros((channels_arr.shape[0], channels_arr.shape[1]), dtype=np.uint8)
+            return np.zeros((ranks.window.height, ranks.window.width), dtype=np.uint8)
 
         coverage = sum(coverage_list)
         coverage = np.clip(coverage, 0.0, 1.0)
         mask = (coverage * 255).astype(np.uint8)
         return mask
 
+    @staticmethod
+    def compute_union_mask(obj_ids: List[int] | np.ndarray, channels_arr: RankData | np.ndarray, downsample: int = 1,
+                           index: RankIndex | None = None) -> np.ndarray:
+        """
+        Matte of several objects at once, in a single pass over the ranks:
+        coverage of every rank whose uint32 ID is in obj_ids is summed, then clipped like compute_mask.
+        downsample: box-filter the clipped coverage to 1/downsample resolution.
+        index: RankIndex of channels_arr, to skip the ranks and rows without coverage of obj_ids.
+        """
+        ids = np.unique(np.asarray(obj_ids, dtype=np.uint32))
+        ranks = RankData.of(channels_arr)
+        coverage = np.zeros((ranks.window.height, ranks.window.width), dtype=np.float32)
+        if ids.size:
+            for rank in range(ranks.num_ranks):
+                rows = slice(None)
+                if index is not None:
+                    extent = index.rows_for(rank, ids)
+                    if extent is None:
+                        continue
+                    rows = slice(extent[0], extent[1] + 1)
+                hit = np.isin(ranks.ids[rank, rows], ids)
+                # Exact in the stored precision: coverage times 0 or 1, upcast when added
+                coverage[rows] += ranks.coverage[rank, rows] * hit
+        coverage = np.clip(coverage, 0.0, 1.0)
+        if downsample > 1:
+            coverage = MaskCompositionService.box_filter(coverage, downsample)
+        return (coverage * 255).astype(np.uint8)
+
+    @staticmethod
+    def box_filter(coverage: np.ndarray, factor: int) -> np.ndarray:
+        """
+        Mean of each factor x factor block of a float [H, W] array.
+        Partial blocks on the right and bottom edges average only their own pixels.
+        """
+        height, width = coverage.shape
+        proxy = PixelWindow(height=height, width=width).downsampled(factor)
+        padded = np.zeros((proxy.height * factor, proxy.width * factor), dtype=np.float32)
+        padded[:height, :width] = coverage
+        sums = padded.reshape(proxy.height, factor, proxy.width, factor).sum(axis=(1, 3))
+        rows = np.minimum(np.arange(1, proxy.height + 1) * factor, height) - np.arange(proxy.height) * factor
+        cols = np.minimum(np.arange(1, proxy.width + 1) * factor, width) - np.arange(proxy.width) * factor
+        return sums / (rows[:, None] * cols[None, :]).astype(np.float32)
+
     @staticmethod
     def combine_masks(masks: list[np.ndarray]) -> np.ndarray:
         """
@@ -66,15 +200,26 @@ class MaskCompositionService:
             return np.array([], dtype=np.uint32)
 
         first_mask = masks_with_ids[0][1]
-        mask_combined = np.zeros_like(first_mask, dtype=np.uint32)
-        best = np.zeros_like(first_mask) # Coverage tracker
+        preview = PreviewAccumulator(PixelWindow(height=first_mask.shape[0], width=first_mask.shape[1]))
+        for id_val, obj_mask in masks_with_ids:
+            preview.add(id_val, obj_mask)
+        return preview.id_map
+
+    @staticmethod
+    def combine_sparse_masks_with_ids(masks_with_ids: list[tuple[int, SparseObjectMask]], window: PixelWindow) -> np.ndarray:
+        """
+        Same as combine_masks_with_ids, but only touches each mask's bounding box.
+        masks_with_ids: List of (id, SparseObjectMask).
+        Returns:
+            mask_combined: uint32 array [H, W] with IDs.
+        """
+        if not masks_with_ids:
+            return np.array([], dtype=np.uint32)
 
+        preview = PreviewAccumulator(window)
         for id_val, obj_mask in masks_with_ids:
-             # Update where current coverage is better
-             mask_combined[obj_mask > best] = id_val
-             best = np.maximum(best, obj_mask)
-             
-        return mask_combined
+            preview.add_sparse(id_val, obj_mask)
+        return preview.id_map
 
     @staticmethod
     def combine_masks_sequentially(obj_masks: list[tuple[str, np.ndarray]]) -> tuple[np.ndarray, dict]:
@@ -106,3 +251,267 @@ class MaskCompositionService:
             best = np.maximum(best, obj_mask)
 
         return mask_combined, name_to_mask_id_map
+
+
+class PreviewAccumulator:
+    """
+    Folds masks one at a time into the packed-ID preview: each pixel keeps the ID of the
+    first mask with the highest coverage. Holds one uint32 ID map and one uint8 coverage
+    map, so masks can be written and released as they are produced.
+    """
+    def __init__(self, window: PixelWindow):
+        self.id_map = np.zeros((window.height, window.width), dtype=np.uint32)
+        self.best = np.zeros((window.height, window.width), dtype=np.uint8)
+        self.count = 0
+
+    def add(self, id_val: int, mask: np.ndarray):
+        """mask: full-frame uint8 coverage."""
+        self.id_map[mask > self.best] = id_val
+        np.maximum(self.best, mask, out=self.best)
+        self.count += 1
+
+    def add_sparse(self, id_val: int, mask: SparseObjectMask):
+        """Only touches the mask's bounding box."""
+        region = mask.bbox.slices()
+        crop = mask.mask_data
+        best_region = self.best[region]
+        self.id_map[region][crop > best_region] = id_val
+        np.maximum(best_region, crop, out=best_region)
+        self.count += 1
+
+class LabelDecomposition(NamedTuple):
+    """
+    Coverage of many objects grouped by object.
+    labels: sorted unique uint32 IDs, one per dense label index.
+    offsets: int64 array [len(labels) + 1]; label i owns entries offsets[i]:offsets[i+1].
+    pixel_indices: flat (row-major) pixel index of each entry, ascending within a label.
+    mask_values: uint8 coverage of each entry, identical to compute_mask.
+    """
+    labels: np.ndarray
+    offsets: np.ndarray
+    pixel_indices: np.ndarray
+    mask_values: np.ndarray
+
+    def entries(self, obj_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (pixel_indices, mask_values) of one object, empty if it has no entries."""
+        label = np.searchsorted(self.labels, np.uint32(obj_id))
+        if label >= self.labels.size or self.labels[label] != obj_id:
+            return self.pixel_indices[:0], self.mask_values[:0]
+        start, end = self.offsets[label], self.offsets[label + 1]
+        return self.pixel_indices[start:end], self.mask_values[start:end]
+
+    def visible_ids(self) -> np.ndarray:
+        """uint32 IDs that have at least one entry."""
+        return self.labels[np.diff(self.offsets) > 0]
+
+class LabelDecompositionService:
+    """
+    Decomposes every requested object of a layer in a single pass over the rank data,
+    instead of scanning all ranks once per object as compute_mask does.
+    """
+    @staticmethod
+    def decompose(obj_ids: List[int] | np.ndarray, channels_arr: RankData | np.ndarray, downsample: int = 1,
+                  index: RankIndex | None = None) -> LabelDecomposition:
+        """
+        Groups the coverage of all requested objects by object.
+        obj_ids: uint32 object IDs (the bits of the float32 IDs).
+        channels_arr: RankData, or numpy array of shape [H, W, N_Channels] (ID, Coverage pairs per rank).
+        downsample: box-filter each object's coverage to 1/downsample resolution (proxy).
+        Pixel indices then refer to the PixelWindow.downsampled(downsample) grid.
+        index: RankIndex of channels_arr, to only scan the ranks and rows where the requested objects have coverage.
+        Pixels of zero coverage get no entry.
+        """
+        labels = np.unique(np.asarray(obj_ids, dtype=np.uint32))
+        ranks = RankData.of(channels_arr)
+        height, width = ranks.window.height, ranks.window.width
+        num_pixels = height * width
+        num_ranks = ranks.num_ranks
+
+        label_chunks = []
+        pixel_chunks = []
+        coverage_chunks = []
+        if labels.size:
+            for rank in range(num_ranks):
+                first, last = 0, height - 1
+                if index is not None:
+                    extent = index.rows_for(rank, labels)
+                    if extent is None:
+                        continue
+                    first, last = extent
+                # Pixels without coverage add nothing to a mask: empty ranks are skipped outright
+                rank_coverage = ranks.coverage[rank, first:last + 1].ravel()
+                pixels = np.flatnonzero(rank_coverage)
+                if not pixels.size:
+                    continue
+                # IDs are the float bits as uint32, so matching is an integer join
+                rank_ids = ranks.ids[rank, first:last + 1].ravel()[pixels]
+                pos = np.searchsorted(labels, rank_ids)
+                np.minimum(pos, labels.size - 1, out=pos)
+                hit = np.flatnonzero(labels[pos] == rank_ids)
+                if not hit.size:
+                    continue
+                pixels = pixels[hit]
+                label_chunks.append(pos[hit])
+                coverage_chunks.append(rank_coverage[pixels].astype(np.float32))
+                pixel_chunks.append(pixels + first * width if first else pixels)
+
+        if not label_chunks:
+            empty = np.zeros(0, dtype=np.int64)
+            return LabelDecomposition(labels, np.zeros(labels.size + 1, dtype=np.int64), empty, np.zeros(0, dtype=np.uint8))
+
+        # Sort by (label, pixel). The sort is stable, so entries of the same pixel
+        # stay in rank order and are summed in the same order as compute_mask.
+        keys = np.concatenate(label_chunks).astype(np.int64) * num_pixels + np.concatenate(pixel_chunks)
+        coverage = np.concatenate(coverage_chunks)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        coverage = coverage[order]
+
+        starts = np.ones(keys.size, dtype=bool)
+        starts[1:] = keys[1:] != keys[:-1]
+        summed = coverage[starts]
+        if not starts.all():
+            # Same object on several ranks of one pixel: accumulate sequentially
+            group = np.cumsum(starts) - 1
+            np.add.at(summed, group[~starts], coverage[~starts])
+        keys = keys[starts]
+
+        summed = np.clip(summed, 0.0, 1.0)
+        if downsample > 1:
+            keys, summed, num_pixels = LabelDecompositionService._box_filter_entries(
+                keys, summed, height, width, downsample)
+        mask_values = (summed * 255).astype(np.uint8)
+
+        entry_labels = keys // num_pixels
+        pixel_indices = keys - entry_labels * num_pixels
+        offsets = np.searchsorted(entry_labels, np.arange(labels.size + 1))
+        return LabelDecomposition(labels, offsets, pixel_indices, mask_values)
+
+    @staticmethod
+    def _box_filter_entries(keys: np.ndarray, coverage: np.ndarray, height: int, width: int,
+                            factor: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Moves (label, pixel) entries to the proxy grid and averages each object's coverage per block.
+        Returns the proxy (label, pixel) keys, their mean coverage and the proxy pixel count.
+        """
+        num_pixels = height * width
+        proxy = PixelWindow(height=height, width=width).downsampled(factor)
+        proxy_pixels = proxy.height * proxy.width
+
+        entry_labels, pixels = np.divmod(keys, num_pixels)
+        rows, cols = np.divmod(pixels, width)
+        del pixels
+        proxy_keys = entry_labels * proxy_pixels
+        del entry_labels
+        proxy_keys += rows // factor * proxy.width + cols // factor
+        del rows, cols
+
+        order = np.argsort(proxy_keys, kind="stable")
+        proxy_keys = proxy_keys[order]
+        starts = np.flatnonzero(np.r_[True, proxy_keys[1:] != proxy_keys[:-1]])
+        sums = np.add.reduceat(coverage[order], starts)
+        del order
+        proxy_keys = proxy_keys[starts]
+
+        # Block area, smaller on the right and bottom edges
+        block_rows, block_cols = np.divmod(proxy_keys % proxy_pixels, proxy.width)
+        area = (np.minimum((block_rows + 1) * factor, height) - block_rows * factor) * \
+               (np.minimum((block_cols + 1) * factor, width) - block_cols * factor)
+        return proxy_keys, sums / area.astype(np.float32), proxy_pixels
+
+    @staticmethod
+    def iter_masks(obj_ids: List[int], channels_arr: RankData | np.ndarray) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Yields (obj_id, mask) for every requested uint32 ID, in request order.
+        Each mask is a full-frame [H, W] uint8 array, byte for byte equal to compute_mask.
+        """
+        window = RankData.of(channels_arr).window
+        decomposition = LabelDecompositionService.decompose(obj_ids, channels_arr)
+        yield from LabelDecompositionService.iter_masks_from(decomposition, obj_ids, window)
+
+    @staticmethod
+    def iter_masks_from(decomposition: LabelDecomposition, obj_ids: List[int], window: PixelWindow) -> Iterator[Tuple[int, np.ndarray]]:
+        """Same as iter_masks, from an existing decomposition."""
+        for obj_id in obj_ids:
+            pixels, values = decomposition.entries(obj_id)
+            mask = np.zeros(window.height * window.width, dtype=np.uint8)
+            mask[pixels] = values
+            yield obj_id, mask.reshape(window.height, window.width)
+
+    @staticmethod
+    def iter_sparse_masks(objects: List[Tuple[str, int]], channels_arr: RankData | np.ndarray) -> Iterator[SparseObjectMask]:
+        """
+        Yields a SparseObjectMask for every requested (name, uint32 obj_id) with non-zero coverage,
+        in request order. Only the bounding box of each object is ever allocated.
+        """
+        window = RankData.of(channels_arr).window
+        decomposition = LabelDecompositionService.decompose([obj_id for _, obj_id in objects], channels_arr)
+        yield from LabelDecompositionService.iter_sparse_masks_from(decomposition, objects, window)
+
+    @staticmethod
+    def iter_sparse_masks_from(decomposition: LabelDecomposition, objects: List[Tuple[str, int]], window: PixelWindow) -> Iterator[SparseObjectMask]:
+        """Same as iter_sparse_masks, from an existing decomposition."""
+        for name, obj_id in objects:
+            pixels, values = decomposition.entries(obj_id)
+            nonzero = values > 0
+            if not nonzero.any():
+                continue
+            pixels = pixels[nonzero]
+            values = values[nonzero]
+
+            rows, cols = np.divmod(pixels, window.width)
+            # Pixels are row-major sorted, so rows are already ascending
+            bbox = BoundingBox(x_min=int(cols.min()), y_min=int(rows[0]), x_max=int(cols.max()), y_max=int(rows[-1]))
+            cropped = np.zeros((bbox.height, bbox.width), dtype=np.uint8)
+            cropped[rows - bbox.y_min, cols - bbox.x_min] = values
+            yield SparseObjectMask(name=name, mask_data=cropped, bbox=bbox, window=window)
+
+class BandAccumulator:
+    """
+    Builds a LabelDecomposition band by band, for frames streamed in horizontal bands.
+    Every pixel's ranks live in the same band, so per-band decomposition is exact.
+    Only the compact per-object entries are kept between bands, never the rank data.
+    """
+    def __init__(self, obj_ids: List[int] | np.ndarray, window: PixelWindow, downsample: int = 1):
+        """
+        window: the output grid, PixelWindow.downsampled(downsample) of the streamed frame.
+        downsample: proxy factor, bands must then start on multiples of it.
+        """
+        self.labels = np.unique(np.asarray(obj_ids, dtype=np.uint32))
+        self.window = window
+        self.downsample = downsample
+        # Flat pixel indices fit in uint32 below 4 gigapixels
+        self._pixel_dtype = np.uint32 if window.height * window.width < 2 ** 32 else np.int64
+        self._parts: List[LabelDecomposition] = []
+
+    def add_band(self, first_row: int, band: RankData | np.ndarray):
+        """band: rank data of the rows starting at first_row, RankData or [rows, W, N_Channels]."""
+        self.add_decomposition(first_row, LabelDecompositionService.decompose(self.labels, band, self.downsample))
+
+    def add_decomposition(self, first_row: int, part: LabelDecomposition):
+        """part: decomposition of the band starting at first_row against self.labels. Bands are added top to bottom."""
+        if not part.pixel_indices.size:
+            return
+        pixel_indices = (part.pixel_indices + first_row // self.downsample * self.window.width).astype(self._pixel_dtype)
+        self._parts.append(part._replace(pixel_indices=pixel_indices))
+
+    def finalize(self) -> LabelDecomposition:
+        counts = np.zeros(self.labels.size, dtype=np.int64)
+        for part in self._parts:
+            counts += np.diff(part.offsets)
+        offsets = np.zeros(self.labels.size + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        pixel_indices = np.empty(offsets[-1], dtype=self._pixel_dtype)
+        mask_values = np.empty(offsets[-1], dtype=np.uint8)
+        # Bands arrive top to bottom: appending each band's run after the previous bands' runs
+        # of the same label keeps pixels ascending within a label
+        filled = offsets[:-1].copy()
+        for part in self._parts:
+            part_counts = np.diff(part.offsets)
+            dest = np.arange(part.pixel_indices.size) + np.repeat(filled - part.offsets[:-1], part_counts)
+            pixel_indices[dest] = part.pixel_indices
+            mask_values[dest] = part.mask_values
+            filled += part_counts
+        self._parts = []
+        return LabelDecomposition(self.labels, offsets, pixel_indices, mask_values)
@@ -0,0 +1,83 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+from kriptomatte.domain.model.value_objects import RankData
+from kriptomatte.domain.services.masking import (MaskCompositionService, LabelDecompositionService, LabelDecomposition,
+                                                 BandAccumulator, RankIndex)
+
+class ParallelDecompositionService:
+    """
+    Masks one frame on several threads. Rows are split into bands, views of the rank data rather
+    than copies, that are decomposed concurrently and stitched in order by a BandAccumulator.
+    The sorts, searches and comparisons doing the work release the GIL, so bands run on separate cores.
+    Results are identical to LabelDecompositionService.decompose and MaskCompositionService.compute_union_mask.
+    """
+    def __init__(self, workers: int, bands_per_worker: int = 4, min_band_rows: int = 16):
+        """
+        workers: threads per frame.
+        bands_per_worker: bands per thread, so uneven bands still keep every thread busy.
+        min_band_rows: smallest band, below which per-band overhead outweighs the parallelism.
+        """
+        if workers < 1:
+            raise ValueError(f"Masking workers must be >= 1, got {workers}")
+        self.workers = workers
+        self.bands_per_worker = bands_per_worker
+        self.min_band_rows = min_band_rows
+
+    def decompose(self, obj_ids: List[int] | np.ndarray, channels_arr: RankData | np.ndarray, downsample: int = 1,
+                  index: RankIndex | None = None) -> LabelDecomposition:
+        """Same as LabelDecompositionService.decompose. With an index, rows without coverage of obj_ids are skipped."""
+        ranks = RankData.of(channels_arr)
+        labels = np.unique(np.asarray(obj_ids, dtype=np.uint32))
+        accumulator = BandAccumulator(labels, ranks.window.downsampled(downsample), downsample)
+        bands = self._bands(ranks, labels, downsample, index)
+        if not bands:
+            return accumulator.finalize()
+        
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(bands)), thread_name_prefix="km-mask") as pool:
+            parts = [pool.submit(LabelDecompositionService.decompose, labels, ranks.rows(first, last), downsample)
+                     for first, last in bands]
+            for (first, _), part in zip(bands, parts):
+                accumulator.add_decomposition(first, part.result())
+        return accumulator.finalize()
+
+    def union_mask(self, obj_ids: List[int] | np.ndarray, channels_arr: RankData | np.ndarray, downsample: int = 1,
+                   index: RankIndex | None = None) -> np.ndarray:
+        """Same as MaskCompositionService.compute_union_mask, band by band."""
+        ranks = RankData.of(channels_arr)
+        ids = np.unique(np.asarray(obj_ids, dtype=np.uint32))
+        window = ranks.window.downsampled(downsample)
+        union = np.zeros((window.height, window.width), dtype=np.uint8)
+        bands = self._bands(ranks, ids, downsample, index)
+        if not bands:
+            return union
+        
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(bands)), thread_name_prefix="km-mask") as pool:
+            masks = [pool.submit(MaskCompositionService.compute_union_mask, ids, ranks.rows(first, last), downsample)
+                     for first, last in bands]
+            for (first, _), mask in zip(bands, masks):
+                band_union = mask.result()
+                union[first // downsample:first // downsample + band_union.shape[0]] = band_union
+        return union
+
+    def _bands(self, ranks: RankData, ids: np.ndarray, downsample: int,
+               index: RankIndex | None) -> List[Tuple[int, int]]:
+        """Inclusive (first, last) row ranges covering the frame, or the rows where ids have coverage."""
+        height = ranks.window.height
+        first, last = 0, height - 1
+        if index is not None:
+            extents = [extent for extent in (index.rows_for(rank, ids) for rank in range(len(index.ids)))
+                       if extent is not None]
+            if not extents:
+                return []
+            first = min(extent[0] for extent in extents)
+            last = max(extent[1] for extent in extents)
+        if not ids.size or height == 0:
+            return []
+        # Proxy blocks must not straddle two bands, nor be cut short above the bottom edge
+        first = first // downsample * downsample
+        last = min(height, -(-(last + 1) // downsample) * downsample) - 1
+        rows = last - first + 1
+        band_rows = max(self.min_band_rows, -(-rows // (self.workers * self.bands_per_worker)))
+        band_rows = -(-band_rows // downsample) * downsample
+        return [(start, min(start + band_rows, last + 1) - 1) for start in range(first, last + 1, band_rows)]
@@ -0,0 +1,220 @@
+import numpy as np
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+from kriptomatte.domain.model.value_objects import BoundingBox, ColumnarManifest, PixelWindow, RankData
+from kriptomatte.domain.services.masking import RankIndex
+
+# Rows of rank data merged per step of the build, bounds its float32 temporaries
+BUILD_BAND_ROWS = 256
+
+class PickHit(NamedTuple):
+    """An object under one pixel, coverage in [0, 1] at the 8-bit precision of its mask."""
+    name: str
+    obj_id: int
+    coverage: float
+
+class RegionHit(NamedTuple):
+    """
+    An object inside a region.
+    pixels: region pixels where it has coverage.
+    coverage: its coverage summed over the region, divided by the region's area.
+    """
+    name: str
+    obj_id: int
+    pixels: int
+    coverage: float
+
+class PixelPickIndex:
+    """
+    The top-k objects under each pixel of a layer, for point, region and mask queries without extracting masks.
+    labels: [H, W, k] uint16 (uint32 above 65535 objects), 0 for an empty slot, label i + 1 for object i.
+    values: [H, W, k] uint8, the object's mask value at that pixel (its coverage summed over ranks, clipped, x 255).
+    ids, names: uint32 Cryptomatte ID and manifest name of each object with coverage in the layer.
+    Slots of one pixel are in no particular order. Pixel-major, so a point query reads k contiguous entries.
+    labels and values may be read-only memory maps (PickIndexStore.load).
+    """
+    def __init__(self, labels: np.ndarray, values: np.ndarray, ids: np.ndarray, names: Sequence[str]):
+        if labels.shape != values.shape or labels.ndim != 3:
+            raise ValueError(f"Labels {labels.shape} and values {values.shape} must be the same [H, W, k] shape")
+        self.labels = labels
+        self.values = values
+        self.ids = np.asarray(ids, dtype=np.uint32)
+        self.names = list(names)
+        if self.ids.size != len(self.names):
+            raise ValueError(f"Pick index has {len(self.names)} names but {self.ids.size} IDs")
+        self._labels_by_name: Dict[str, int] | None = None
+
+    @property
+    def window(self) -> PixelWindow:
+        return PixelWindow(height=self.labels.shape[0], width=self.labels.shape[1])
+
+    @property
+    def top_k(self) -> int:
+        return self.labels.shape[2]
+
+    def pick(self, x: int, y: int) -> List[PickHit]:
+        """Objects with coverage at pixel (x, y), highest coverage first."""
+        if not (0 <= x < self.labels.shape[1] and 0 <= y < self.labels.shape[0]):
+            raise IndexError(f"Pixel ({x}, {y}) is outside the {self.labels.shape[1]}x{self.labels.shape[0]} frame")
+        hits = [(int(value), int(label)) for label, value in zip(self.labels[y, x].tolist(), self.values[y, x].tolist())
+                if label]
+        hits.sort(key=lambda hit: -hit[0])
+        return [PickHit(self.names[label - 1], int(self.ids[label - 1]), value / 255.0) for value, label in hits]
+
+    def pick_region(self, region: BoundingBox | Sequence[Tuple[float, float]]) -> List[RegionHit]:
+        """
+        Objects with coverage inside a region, highest coverage first.
+        region: an inclusive BoundingBox, or polygon vertices (x, y) in pixel coordinates,
+        covering the pixels whose centers it contains (even-odd rule). Parts outside the frame are ignored.
+        """
+        bbox, inside = self._rasterize(region)
+        if bbox is None:
+            return []
+        rows, cols = bbox.slices()
+        labels = self.labels[rows, cols]
+        values = self.values[rows, cols]
+        if inside is not None:
+            labels, values = labels[inside], values[inside]
+            area = int(inside.sum())
+        else:
+            area = bbox.width * bbox.height
+        if not area:
+            return []
+        labels = labels.reshape(-1)
+        values = values.reshape(-1)
+        # A pixel holds each label at most once, so label counts are pixel counts
+        pixels = np.bincount(labels, minlength=self.ids.size + 1)
+        sums = np.bincount(labels, weights=values, minlength=self.ids.size + 1)
+        found = np.flatnonzero(pixels[1:]) + 1
+        found = found[np.argsort(-sums[found], kind="stable")]
+        return [RegionHit(self.names[label - 1], int(self.ids[label - 1]), int(pixels[label]),
+                          float(sums[label]) / 255.0 / area) for label in found.tolist()]
+
+    def mask_for(self, names: str | Iterable[str]) -> np.ndarray:
+        """
+        uint8 [H, W] mask of one or several objects. One object gives the same mask as its extraction,
+        several sum their masks, clipped. Names without coverage in the layer add nothing.
+        """
+        if isinstance(names, str):
+            names = [names]
+        if self._labels_by_name is None:
+            # Built on first lookup only
+            self._labels_by_name = {name: label for label, name in enumerate(self.names, start=1)}
+        wanted = np.zeros(self.ids.size + 1, dtype=bool)
+        wanted[[self._labels_by_name[name] for name in names if name in self._labels_by_name]] = True
+        mask = np.zeros(self.labels.shape[:2], dtype=np.uint16)
+        if not wanted.any():
+            return mask.astype(np.uint8)
+        for slot in range(self.top_k):
+            hit = wanted[self.labels[:, :, slot]]
+            mask[hit] += self.values[:, :, slot][hit]
+        return np.minimum(mask, 255).astype(np.uint8)
+
+    def _rasterize(self, region: BoundingBox | Sequence[Tuple[float, float]]) -> Tuple[BoundingBox | None, np.ndarray | None]:
+        """The region's box clipped to the frame, and for polygons the [h, w] pixels of that box inside it."""
+        height, width = self.labels.shape[:2]
+        if isinstance(region, BoundingBox):
+            x_min, y_min = max(region.x_min, 0), max(region.y_min, 0)
+            x_max, y_max = min(region.x_max, width - 1), min(region.y_max, height - 1)
+            if x_min > x_max or y_min > y_max:
+                return None, None
+            return BoundingBox(x_min=x_min, y_min=y_min, x_max=x_max, y_max=y_max), None
+
+        vertices = np.asarray(region, dtype=np.float64).reshape(-1, 2)
+        if len(vertices) < 3:
+            raise ValueError(f"A polygon needs at least 3 vertices, got {len(vertices)}")
+        # Pixels whose centers (x + 0.5, y + 0.5) can be inside
+        x_min = max(int(np.ceil(vertices[:, 0].min() - 0.5)), 0)
+        y_min = max(int(np.ceil(vertices[:, 1].min() - 0.5)), 0)
+        x_max = min(int(np.floor(vertices[:, 0].max() - 0.5)), width - 1)
+        y_max = min(int(np.floor(vertices[:, 1].max() - 0.5)), height - 1)
+        if x_min > x_max or y_min > y_max:
+            return None, None
+        bbox = BoundingBox(x_min=x_min, y_min=y_min, x_max=x_max, y_max=y_max)
+        # Scanline even-odd fill: each edge toggles the pixels left of where it crosses a row's centers.
+        # crossings[r, n] counts edges toggling the first n pixels of row r
+        crossings = np.zeros((bbox.height, bbox.width + 1), dtype=np.int32)
+        centers_y = np.arange(bbox.height) + y_min + 0.5
+        for (x0, y0), (x1, y1) in zip(vertices, np.roll(vertices, -1, axis=0)):
+            if y0 == y1:
+                continue
+            rows = np.flatnonzero((centers_y >= min(y0, y1)) & (centers_y < max(y0, y1)))
+            if not rows.size:
+                continue
+            cross_x = x0 + (centers_y[rows] - y0) * (x1 - x0) / (y1 - y0)
+            # Pixels of the row with centers left of the crossing
+            toggled = np.clip(np.ceil(cross_x - 0.5 - x_min), 0, bbox.width).astype(np.int64)
+            np.add.at(crossings, (rows, toggled), 1)
+        # Pixel j is toggled by every crossing with n > j
+        toggles = np.cumsum(crossings[:, ::-1], axis=1)[:, ::-1][:, 1:]
+        return bbox, (toggles & 1).astype(bool)
+
+class PickIndexService:
+    @staticmethod
+    def build(channels_arr: RankData | np.ndarray, manifest: ColumnarManifest, top_k: int | None = None,
+              index: RankIndex | None = None) -> PixelPickIndex:
+        """
+        Builds the PixelPickIndex of a layer in one pass over its ranks.
+        channels_arr: RankData, or numpy array of shape [H, W, N_Channels] (ID, Coverage pairs per rank).
+        manifest: names the objects; IDs missing from it are named by their hex ID.
+        top_k: objects kept per pixel, the ones with the highest coverage (all covered ranks by default).
+        With fewer slots than objects at a pixel, the dropped objects are missing from its picks and masks.
+        index: RankIndex of channels_arr, built when not given. Its empty ranks are skipped.
+        """
+        if top_k is not None and top_k < 1:
+            raise ValueError(f"top_k must be >= 1, got {top_k}")
+        ranks = RankData.of(channels_arr)
+        if index is None:
+            index = RankIndex.from_channels(ranks)
+        height, width = ranks.window.height, ranks.window.width
+        # Ranks up to the last one with coverage
+        used = [rank for rank, rank_ids in enumerate(index.ids) if rank_ids.size]
+        num_ranks = used[-1] + 1 if used else 0
+        slots = num_ranks if top_k is None else min(top_k, num_ranks)
+
+        obj_ids = index.visible_ids()
+        label_dtype = np.uint16 if obj_ids.size < np.iinfo(np.uint16).max else np.uint32
+        labels = np.zeros((height, width, max(slots, 1)), dtype=label_dtype)
+        values = np.zeros((height, width, max(slots, 1)), dtype=np.uint8)
+
+        for start in range(0, height if num_ranks else 0, BUILD_BAND_ROWS):
+            stop = min(start + BUILD_BAND_ROWS, height)
+            band = ranks.rows(start, stop - 1)
+            band_ids = band.ids[:num_ranks]
+            coverage = band.coverage[:num_ranks].astype(np.float32)
+            # An ID on several ranks of a pixel is summed into its first slot, in rank order as compute_mask does
+            for rank in range(1, num_ranks):
+                pending = coverage[rank] != 0
+                for earlier in range(rank):
+                    if not pending.any():
+                        break
+                    same = pending & (band_ids[earlier] == band_ids[rank])
+                    coverage[earlier][same] += coverage[rank][same]
+                    coverage[rank][same] = 0
+                    pending &= ~same
+            band_values = (np.clip(coverage, 0.0, 1.0) * 255).astype(np.uint8)
+            del coverage
+            band_labels = np.searchsorted(obj_ids, band_ids).astype(label_dtype) + label_dtype(1)
+            band_labels[band_values == 0] = 0
+            if slots < num_ranks:
+                # Highest values first, lower ranks first on ties
+                keep = np.argsort(255 - band_values, axis=0, kind="stable")[:slots]
+                band_values = np.take_along_axis(band_values, keep, axis=0)
+                band_labels = np.take_along_axis(band_labels, keep, axis=0)
+            values[start:stop] = np.moveaxis(band_values, 0, 2)
+            labels[start:stop] = np.moveaxis(band_labels, 0, 2)
+
+        return PixelPickIndex(labels, values, obj_ids, PickIndexService.object_names(obj_ids, manifest))
+
+    @staticmethod
+    def object_names(obj_ids: np.ndarray, manifest: ColumnarManifest) -> List[str]:
+        """Manifest name of each uint32 ID, its hex ID when the manifest does not list it."""
+        order = np.argsort(manifest.ids, kind="stable")
+        sorted_ids = manifest.ids[order]
+        pos = np.minimum(np.searchsorted(sorted_ids, obj_ids), max(sorted_ids.size - 1, 0))
+        names = []
+        for obj_id, p in zip(obj_ids.tolist(), pos.tolist()):
+            if sorted_ids.size and sorted_ids[p] == obj_id:
+                names.append(str(manifest.names[order[p]]))
+            else:
+                names.append(f"{obj_id:08x}")
+        return names
@@ -1,43 +1,56 @@
 import json
-import struct
 import os
 import logging
+import numpy as np
 from typing import Dict, Any, Tuple
-from kriptomatte.domain.model.value_objects import Manifest
+from kriptomatte.domain.model.value_objects import Manifest, ColumnarManifest
 from kriptomatte.infrastructure.io.file_system import FileSystem
+from kriptomatte.infrastructure.persistence.manifest_cache import ManifestCache
 
 logger = logging.getLogger(__name__)
 
 class ManifestFactory:
     @staticmethod
-    def create_from_metadata(metadata: Dict[str, Any], exr_file_path: str) -> Manifest:
+    def sidecar_path(metadata: Dict[str, Any], exr_file_path: str) -> str | None:
+        """Resolved path of the layer's sidecar manifest, None when the manifest is embedded."""
+        manifest_file = metadata.get("manif_file")
+        if not manifest_file:
+            return None
+        if isinstance(manifest_file, bytes):
+            manifest_file = manifest_file.decode('utf-8')
+        return FileSystem.resolve_path(exr_file_path, manifest_file)
+
+    @staticmethod
+    def create_from_metadata(metadata: Dict[str, Any], exr_file_path: str, cache: ManifestCache | None = None) -> Manifest:
         """
         Creates a Manifest domain object from the EXR metadata dictionary.
         Handles both embedded manifests and sidecar files.
+        With a cache, manifests already seen (same sidecar file or same embedded bytes) skip JSON parsing.
         """
         logger.debug("Starting manifest creation from metadata...")
         raw_manifest = {}
+        cache_key = None
         
         # Check for sidecar file
-        manifest_file = metadata.get("manif_file")
-        if manifest_file:
-            if isinstance(manifest_file, bytes):
-                manifest_file = manifest_file.decode('utf-8')
-            
-            logger.info(f"Side car manifest detected: {manifest_file}")
-            full_path = FileSystem.resolve_path(exr_file_path, manifest_file)
-            logger.debug(f"Resolved sidecar path: {full_path}")
+        full_path = ManifestFactory.sidecar_path(metadata, exr_file_path)
+        if full_path is not None:
+            logger.info("Side car manifest detected: %s", full_path)
             
             if full_path and os.path.exists(full_path):
+                 if cache is not None:
+                     cache_key = ManifestCache.key_for_file(full_path)
+                     cached = cache.get(cache_key)
+                     if cached is not None:
+                         return cached
                  logger.debug("Sidecar file exists. Loading JSON...")
                  try:
                     with open(full_path, 'r') as json_data:
                         raw_manifest = json.load(json_data)
-                    logger.debug(f"Loaded {len(raw_manifest)} items from sidecar.")
+                    logger.debug("Loaded %s items from sidecar.", len(raw_manifest))
                  except Exception as e:
-                     logger.error(f"Failed to read sidecar file: {e}")
+                     logger.error("Failed to read sidecar file: %s", e)
             else:
-                logger.error(f"Cryptomatte: Unable to find manifest file: {full_path}")
+                logger.error("Cryptomatte: Unable to find manifest file: %s", full_path)
                 # Fallback to embedded if available? Original code didn't seem to fallback if file specified but missing
         
         # If no sidecar or failed, try embedded
@@ -45,43 +58,47 @@ class ManifestFactory:
             logger.debug("Checking for embedded manifest...")
             manifest_bytes = metadata.get('manifest')
             if manifest_bytes:
-                logger.debug(f"Found embedded manifest bytes (len={len(manifest_bytes)}). Decoding...")
+                if cache is not None:
+                    cache_key = ManifestCache.key_for_bytes(manifest_bytes)
+                    cached = cache.get(cache_key)
+                    if cached is not None:
+                        return cached
+                logger.debug("Found embedded manifest bytes (len=%s). Decoding...", len(manifest_bytes))
                 manifest_string = manifest_bytes.decode('utf-8')
                 raw_manifest = json.loads(manifest_string)
-                logger.debug(f"Parsed embedded manifest. Contains {len(raw_manifest)} items.")
+                logger.debug("Parsed embedded manifest. Contains %s items.", len(raw_manifest))
             else:
                 logger.warning("No manifest found in metadata.")
-                return {}
+                return ColumnarManifest([], np.zeros(0, dtype=np.uint32))
 
         logger.debug("Parsing raw manifest (converting hex strings to floats)...")
-        return ManifestFactory._parse_raw_manifest(raw_manifest)
+        manifest = ManifestFactory._parse_raw_manifest(raw_manifest)
+        if cache is not None and cache_key is not None:
+            cache.put(cache_key, manifest)
+        return manifest
 
     @staticmethod
     def _parse_raw_manifest(raw_manifest: Dict[str, str]) -> Manifest:
         """
-        Converts the raw JSON manifest (Name -> HexString) to Domain Manifest (Name -> Float).
+        Converts the raw JSON manifest (Name -> HexString) to a columnar Domain Manifest.
+        The hex strings are parsed in bulk into one uint32 array; the float IDs are a view of it.
         """
-        domain_manifest: Manifest = {}
-        unpacker = struct.Struct('=f')
-        packer = struct.Struct("=I")
+        logger.debug("Processing %s raw manifest entries...", len(raw_manifest))
+        names = list(raw_manifest.keys())
+        hex_values = list(raw_manifest.values())
         
-        logger.debug(f"Processing {len(raw_manifest)} raw manifest entries...")
-        count = 0
-        for name, hex_value in raw_manifest.items():
-            # Original logic to convert hex string to float
-            packed = packer.pack(int(hex_value, 16))
-            # Ensure 4 bytes
-            packed = b'\0' * (4 - len(packed)) + packed
-            id_float = unpacker.unpack(packed)[0]
-            
-            # Ensure name is string
-            name_str = name
-            # original code did name.encode('utf-8') if str? wait.
-            # "name_str = name if type(name) is str else name.encode("utf-8")"
-            # It seems it wants bytes as keys in some parts, but Domain should use str.
-            
-            domain_manifest[name_str] = id_float
-            count += 1
-            
-        logger.debug(f"Finished parsing manifest. Processed {count} items.")
-        return domain_manifest
+        ids = None
+        # Fast path: every value is exactly 8 hex digits, decode them all at once as big-endian uint32
+        if all(isinstance(hex_value, str) for hex_value in hex_values) and set(map(len, hex_values)) <= {8}:
+            try:
+                ids = np.frombuffer(bytes.fromhex("".join(hex_values)), dtype=">u4").astype(np.uint32)
+            except ValueError:
+                ids = None
+        
+        if ids is None or ids.size != len(hex_values):
+            # Short or unusual values ("0x..." prefix, fewer digits): parse one by one
+            logger.debug("Manifest has non 8-digit hex IDs, parsing individually.")
+            ids = np.array([int(hex_value, 16) for hex_value in hex_values], dtype=np.uint32)
+        
+        logger.debug("Finished parsing manifest. Processed %s items.", ids.size)
+        return ColumnarManifest(names, ids)
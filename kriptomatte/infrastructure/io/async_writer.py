@@ -0,0 +1,103 @@
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, List, Tuple
+import numpy as np
+from PIL.PngImagePlugin import PngInfo
+from kriptomatte.domain.model.entities import SparseObjectMask
+from kriptomatte.infrastructure.io.image_writer import ImageWriter, PngOptions
+from kriptomatte.infrastructure.logging.metrics import StageMetrics
+
+logger = logging.getLogger(__name__)
+
+class ImageWriteError(Exception):
+    """
+    Raised by AsyncImageWriter.join when one or more queued writes failed.
+    failures: List of (path, exception).
+    """
+    def __init__(self, failures: List[Tuple[str, BaseException]]):
+        self.failures = failures
+        first_path, first_error = failures[0]
+        super().__init__(f"{len(failures)} image write(s) failed, first: {first_path}: {first_error}")
+
+class AsyncImageWriter:
+    """
+    Encodes and writes masks on a bounded thread pool.
+    Pillow releases the GIL while zlib compresses, so PNG encoding scales across threads.
+
+    workers: number of encoding threads. 0 writes inline on the calling thread (errors raise immediately).
+    max_pending: maximum number of queued writes. Submitting blocks once it is reached (backpressure),
+                 which bounds the memory held by masks waiting to be encoded. Defaults to 2 * workers.
+    metrics: optional StageMetrics. Records "encode" (summed over threads), "write_wait"
+             (time the caller spent blocked on backpressure or join) and the "images_written" counter.
+    """
+    def __init__(self, workers: int = 0, max_pending: int | None = None, options: PngOptions | None = None,
+                 metrics: StageMetrics | None = None):
+        if workers < 0:
+            raise ValueError(f"Writer workers must be >= 0, got {workers}")
+        self.workers = workers
+        self.options = options
+        self.metrics = metrics or StageMetrics()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="km-writer") if workers else None
+        self._slots = threading.BoundedSemaphore(max_pending or 2 * workers) if workers else None
+        self._pending: List[Tuple[str, Future]] = []
+
+    def save_mask(self, path: str, mask: np.ndarray, pnginfo: PngInfo | None = None):
+        self._submit(path, ImageWriter.save_mask, path, mask, pnginfo=pnginfo, options=self.options)
+
+    def save_sparse_mask(self, path: str, mask: SparseObjectMask):
+        self._submit(path, ImageWriter.save_sparse_mask, path, mask, options=self.options)
+
+    def join(self):
+        """
+        Waits for every queued write. Raises ImageWriteError listing all failed paths.
+        """
+        failures = []
+        with self.metrics.stage("write_wait"):
+            for path, future in self._pending:
+                error = future.exception()
+                if error is not None:
+                    failures.append((path, error))
+        self._pending = []
+        if failures:
+            raise ImageWriteError(failures)
+
+    def close(self):
+        """Stops the pool. Writes not started yet are cancelled."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self._pending = []
+
+    def __enter__(self) -> "AsyncImageWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.join()
+        finally:
+            self.close()
+
+    def _submit(self, path: str, fn: Callable, *args, **kwargs):
+        if self._executor is None:
+            if self.workers:
+                raise RuntimeError("AsyncImageWriter is closed")
+            self._encode(fn, *args, **kwargs)
+            return
+
+        # Blocks while max_pending writes are in flight
+        with self.metrics.stage("write_wait"):
+            self._slots.acquire()
+        try:
+            future = self._executor.submit(self._encode, fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._pending.append((path, future))
+
+    def _encode(self, fn: Callable, *args, **kwargs):
+        with self.metrics.stage("encode"):
+            fn(*args, **kwargs)
+        self.metrics.count("images_written")
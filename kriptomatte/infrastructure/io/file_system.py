@@ -1,5 +1,15 @@
 import os
+import re
+import glob
+import logging
 from pathlib import Path
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Frame number placeholders: "####" (padding = count) or printf style "%04d"
+FRAME_TOKEN_REGEX = re.compile(r"#+|%0?(\d*)d")
+GLOB_CHARS = set("*?[")
 
 class FileSystem:
     @staticmethod
@@ -18,3 +28,78 @@ class FileSystem:
         
         joined = os.path.join(os.path.dirname(base_path), relative_path)
         return os.path.normpath(joined)
+
+    @staticmethod
+    def parse_frame_range(spec: str) -> List[int]:
+        """
+        Parses a frame range such as "1001-1100", "1001-1100x2" or "1,5,10-20".
+        """
+        frames = []
+        for part in spec.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            match = re.fullmatch(r"(-?\d+)(?:-(-?\d+)(?:x(\d+))?)?", part)
+            if not match:
+                raise ValueError(f"Invalid frame range: {part}")
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) is not None else start
+            step = int(match.group(3)) if match.group(3) else 1
+            if end < start or step < 1:
+                raise ValueError(f"Invalid frame range: {part}")
+            frames.extend(range(start, end + 1, step))
+        return frames
+
+    @staticmethod
+    def expand_inputs(patterns: List[str], frames: str | None = None, extension: str = ".exr") -> List[str]:
+        """
+        Expands input arguments into a sorted, de-duplicated list of files.
+        Each pattern can be a file, a directory (all files with the extension),
+        a glob ("renders/*.exr") or a frame sequence ("shot_####.exr", "shot_%04d.exr").
+        Frame sequences use the given frame range, or every matching frame on disk if frames is None.
+        """
+        frame_list = FileSystem.parse_frame_range(frames) if frames else None
+        results = []
+        for pattern in patterns:
+            token = FRAME_TOKEN_REGEX.search(pattern)
+            if os.path.isdir(pattern):
+                matches = sorted(
+                    os.path.join(pattern, name) for name in os.listdir(pattern)
+                    if name.lower().endswith(extension) and os.path.isfile(os.path.join(pattern, name)))
+            elif token:
+                matches = FileSystem._expand_sequence(pattern, token, frame_list)
+            elif GLOB_CHARS & set(pattern):
+                matches = sorted(glob.glob(pattern))
+            else:
+                matches = [pattern]
+
+            if not matches:
+                logger.warning("No input files match %s", pattern)
+            results.extend(matches)
+
+        # Keep first occurrence order
+        return list(dict.fromkeys(os.path.normpath(path) for path in results))
+
+    @staticmethod
+    def _expand_sequence(pattern: str, token: re.Match, frame_list: List[int] | None) -> List[str]:
+        prefix, suffix = pattern[:token.start()], pattern[token.end():]
+        if token.group(0).startswith("#"):
+            padding = len(token.group(0))
+        else:
+            padding = int(token.group(1) or 0)
+
+        if frame_list is not None:
+            paths = [f"{prefix}{frame:0{padding}d}{suffix}" for frame in frame_list]
+            missing = [path for path in paths if not os.path.exists(path)]
+            for path in missing:
+                logger.warning("Missing frame: %s", path)
+            return [path for path in paths if path not in missing]
+
+        # No range given: take every frame on disk
+        frame_regex = re.compile(re.escape(os.path.basename(prefix)) + r"(-?\d+)" + re.escape(suffix) + "$")
+        matches = []
+        for path in glob.glob(glob.escape(prefix) + "*" + glob.escape(suffix)):
+            match = frame_regex.match(os.path.basename(path))
+            if match and len(match.group(1).lstrip("-")) >= padding:
+                matches.append((int(match.group(1)), path))
+        return [path for _, path in sorted(matches)]
@@ -1,22 +1,40 @@
 from PIL import Image
+from PIL.PngImagePlugin import PngInfo
 import numpy as np
 import os
 import logging
+from kriptomatte.domain.model.entities import SparseObjectMask
+from kriptomatte.infrastructure.io.png_options import PngOptions
 
 logger = logging.getLogger(__name__)
 
 class ImageWriter:
+    # PNG text keys describing where a cropped mask sits in the full frame
+    OFFSET_KEY = "kriptomatte:offset"
+    FRAME_KEY = "kriptomatte:frame"
+
+    @staticmethod
+    def save_sparse_mask(path: str, mask: SparseObjectMask, options: PngOptions | None = None):
+        """
+        Saves only the bounding box of a SparseObjectMask.
+        The top-left offset ("x,y") and full frame size ("width,height") are stored as PNG text chunks.
+        """
+        pnginfo = PngInfo()
+        pnginfo.add_text(ImageWriter.OFFSET_KEY, f"{mask.bbox.x_min},{mask.bbox.y_min}")
+        pnginfo.add_text(ImageWriter.FRAME_KEY, f"{mask.window.width},{mask.window.height}")
+        ImageWriter.save_mask(path, mask.mask_data, pnginfo=pnginfo, options=options)
+
     @staticmethod
-    def save_mask(path: str, mask: np.ndarray):
+    def save_mask(path: str, mask: np.ndarray, pnginfo: PngInfo | None = None, options: PngOptions | None = None):
         """
         Saves a mask (uint8 numpy array) to disk.
         """
-        logger.debug(f"Saving mask to {path}. Mask shape: {mask.shape}, dtype: {mask.dtype}")
+        logger.debug("Saving mask to %s. Mask shape: %s, dtype: %s", path, mask.shape, mask.dtype)
         
         # Ensure directory exists
         dir_name = os.path.dirname(path)
         if dir_name and not os.path.exists(dir_name):
-            logger.debug(f"Creating directory: {dir_name}")
+            logger.debug("Creating directory: %s", dir_name)
             os.makedirs(dir_name, exist_ok=True)
         
         # Original code did this:
@@ -26,21 +44,45 @@ class ImageWriter:
         # If it's a single channel mask [H, W], make it RGBA?
         # The user might want just the mask (L) or RGBA.
         # Following original logic:
+        save_params = options.save_params() if options else {}
         try:
             if mask.ndim == 2:
                 img = Image.fromarray(mask, mode='L')
-                img.save(path)
+                img.save(path, pnginfo=pnginfo, **save_params)
             elif mask.ndim == 3 and mask.shape[2] == 3:
                 img = Image.fromarray(mask, mode='RGB')
-                img.save(path)
+                img.save(path, pnginfo=pnginfo, **save_params)
             elif mask.ndim == 3 and mask.shape[2] == 4:
                 img = Image.fromarray(mask, mode='RGBA')
-                img.save(path)
+                img.save(path, pnginfo=pnginfo, **save_params)
             else:
-                logger.warning(f"Unknown mask shape {mask.shape}, trying to save anyway")
-                Image.fromarray(mask).save(path)
+                logger.warning("Unknown mask shape %s, trying to save anyway", mask.shape)
+                Image.fromarray(mask).save(path, pnginfo=pnginfo, **save_params)
             
-            logger.info(f"Saved mask to {path}")
+            logger.debug("Saved mask to %s", path)
+        except Exception as e:
+            logger.error("Failed to save image to %s: %s", path, e)
+            raise
+
+    @staticmethod
+    def save_label_map(path: str, label_map: np.ndarray, options: PngOptions | None = None):
+        """
+        Saves an integer label map. uint16 maps are written as 16-bit PNG.
+        Larger labels do not fit PNG and are written as a 32-bit TIFF next to it (path with .tif).
+        Returns the path actually written.
+        """
+        dir_name = os.path.dirname(path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        try:
+            if label_map.dtype == np.uint16:
+                save_params = options.save_params() if options else {}
+                Image.fromarray(label_map).save(path, **save_params)
+            else:
+                path = os.path.splitext(path)[0] + ".tif"
+                Image.fromarray(label_map.astype(np.int32), mode='I').save(path, compression="tiff_adobe_deflate")
+            logger.debug("Saved label map to %s", path)
         except Exception as e:
-            logger.error(f"Failed to save image to {path}: {e}")
+            logger.error("Failed to save label map to %s: %s", path, e)
             raise
+        return path
@@ -0,0 +1,45 @@
+import os
+import logging
+from typing import List
+import numpy as np
+from kriptomatte.domain.model.entities import SparseObjectMask
+from kriptomatte.domain.model.value_objects import BoundingBox, PixelWindow
+
+logger = logging.getLogger(__name__)
+
+class SparseMaskArchive:
+    """
+    Stores the cropped masks of one layer in a single compressed .npz:
+      names: object names, ids: uint32 Cryptomatte IDs,
+      bboxes: int64 [N, 4] (x_min, y_min, x_max, y_max), offsets: int64 [N + 1],
+      data: every crop flattened and concatenated (crop i is data[offsets[i]:offsets[i+1]]),
+      frame: (height, width) of the full frame.
+    """
+    @staticmethod
+    def save(path: str, masks: List[SparseObjectMask], ids: List[int], window: PixelWindow):
+        dir_name = os.path.dirname(path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        sizes = [mask.mask_data.size for mask in masks]
+        offsets = np.zeros(len(masks) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        data = np.concatenate([mask.mask_data.ravel() for mask in masks]) if masks else np.zeros(0, dtype=np.uint8)
+        bboxes = np.array([(m.bbox.x_min, m.bbox.y_min, m.bbox.x_max, m.bbox.y_max) for m in masks],
+                          dtype=np.int64).reshape(-1, 4)
+        np.savez_compressed(path, names=np.array([mask.name for mask in masks], dtype=str),
+                            ids=np.asarray(ids, dtype=np.uint32), bboxes=bboxes, offsets=offsets, data=data,
+                            frame=np.array([window.height, window.width], dtype=np.int64))
+        logger.debug("Wrote %s masks to %s", len(masks), path)
+
+    @staticmethod
+    def load(path: str) -> List[SparseObjectMask]:
+        with np.load(path, allow_pickle=False) as archive:
+            window = PixelWindow(height=int(archive["frame"][0]), width=int(archive["frame"][1]))
+            offsets, data = archive["offsets"], archive["data"]
+            masks = []
+            for i, (name, (x_min, y_min, x_max, y_max)) in enumerate(zip(archive["names"].tolist(),
+                                                                         archive["bboxes"].tolist())):
+                bbox = BoundingBox(x_min=x_min, y_min=y_min, x_max=x_max, y_max=y_max)
+                crop = data[offsets[i]:offsets[i + 1]].reshape(bbox.height, bbox.width)
+                masks.append(SparseObjectMask(name=name, mask_data=crop, bbox=bbox, window=window))
+        return masks
@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+from typing import Dict, Any
+
+# zlib strategies accepted by Pillow's PNG encoder (compress_type)
+PNG_STRATEGIES = {
+    "default": 0,
+    "filtered": 1,
+    "huffman": 2,
+    "rle": 3,
+    "fixed": 4,
+}
+
+@dataclass(frozen=True)
+class PngOptions:
+    """
+    PNG encoder settings.
+    compress_level: zlib level 0-9, None keeps Pillow's default (6). Lower is faster and larger.
+    strategy: key of PNG_STRATEGIES. "rle" and "huffman" encode flat masks much faster than "default".
+    """
+    compress_level: int | None = None
+    strategy: str = "default"
+
+    def __post_init__(self):
+        if self.compress_level is not None and not 0 <= self.compress_level <= 9:
+            raise ValueError(f"PNG compress level must be in 0-9, got {self.compress_level}")
+        if self.strategy not in PNG_STRATEGIES:
+            raise ValueError(f"Unknown PNG strategy {self.strategy}, expected one of {list(PNG_STRATEGIES)}")
+
+    def save_params(self) -> Dict[str, Any]:
+        params = {}
+        if self.compress_level is not None:
+            params["compress_level"] = self.compress_level
+        if self.strategy != "default":
+            params["compress_type"] = PNG_STRATEGIES[self.strategy]
+        return params
@@ -0,0 +1,43 @@
+import os
+import logging
+import numpy as np
+from PIL import Image, TiffImagePlugin
+
+logger = logging.getLogger(__name__)
+
+# TIFF PageName tag, holds the object name of each page
+PAGE_NAME_TAG = 285
+
+class TiffStackWriter:
+    """
+    Writes masks as pages of one multi-page TIFF, one page at a time,
+    so only the page being encoded is held in memory. Use as a context manager.
+    compression: Pillow TIFF compression ("tiff_adobe_deflate", "tiff_lzw", "raw", ...).
+    """
+    def __init__(self, path: str, compression: str = "tiff_adobe_deflate"):
+        dir_name = os.path.dirname(path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        self.path = path
+        self.compression = compression
+        self.pages = 0
+        self._tiff = TiffImagePlugin.AppendingTiffWriter(path, new=True)
+
+    def add_page(self, mask: np.ndarray, name: str):
+        """mask: uint8 [H, W] matte. name is stored in the page's PageName tag."""
+        Image.fromarray(mask, mode='L').save(self._tiff, format="TIFF", compression=self.compression,
+                                             tiffinfo={PAGE_NAME_TAG: name})
+        self._tiff.newFrame()
+        self.pages += 1
+
+    def close(self):
+        if self._tiff is not None:
+            self._tiff.close()
+            self._tiff = None
+            logger.debug("Wrote %s pages to %s", self.pages, self.path)
+
+    def __enter__(self) -> "TiffStackWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,113 @@
+import os
+import csv
+import json
+import time
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+class StageMetrics:
+    """
+    Thread-safe per-stage timers and counters.
+    Stages accumulate wall seconds and calls, counters accumulate integers.
+    Stages timed on worker threads (e.g. "encode") add up the time of every thread,
+    so they can exceed the wall time of the run.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, list] = {}
+        self._counters: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def timed_iter(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Yields from iterable, charging the time spent producing each item to the stage."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(name, time.perf_counter() - start)
+                return
+            self.add_time(name, time.perf_counter() - start)
+            yield item
+
+    def add_time(self, name: str, seconds: float, calls: int = 1):
+        with self._lock:
+            entry = self._stages.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += calls
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def merge(self, report: Dict[str, Any]):
+        """Adds a report() of another StageMetrics (e.g. from a batch worker process)."""
+        for name, stage in report.get("stages", {}).items():
+            self.add_time(name, stage["seconds"], stage["calls"])
+        for name, value in report.get("counters", {}).items():
+            self.count(name, value)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stages": {name: {"seconds": seconds, "calls": calls}
+                           for name, (seconds, calls) in self._stages.items()},
+                "counters": dict(self._counters),
+            }
+
+    def write(self, path: str):
+        """Writes report() as CSV if path ends with .csv, JSON otherwise."""
+        report = self.report()
+        if os.path.splitext(path)[1].lower() == ".csv":
+            with open(path, "w", newline="") as f:
+                rows = csv.writer(f)
+                rows.writerow(["kind", "name", "seconds", "calls", "value"])
+                for name, stage in report["stages"].items():
+                    rows.writerow(["stage", name, f"{stage['seconds']:.6f}", stage["calls"], ""])
+                for name, value in report["counters"].items():
+                    rows.writerow(["counter", name, "", "", value])
+        else:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+@contextmanager
+def profiling_hooks(metrics: StageMetrics, cprofile_path: str | None = None, trace_memory: bool = False):
+    """
+    Optional profilers around a block of work, both limited to the current process.
+    cprofile_path: dump cProfile stats here (readable with pstats or snakeviz).
+    trace_memory: record the tracemalloc peak as the "tracemalloc_peak_bytes" counter.
+    """
+    profiler = cProfile.Profile() if cprofile_path else None
+    if trace_memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        with metrics.stage("total"):
+            yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            metrics.count("tracemalloc_peak_bytes", peak)
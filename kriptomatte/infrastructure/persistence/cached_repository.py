@@ -0,0 +1,175 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Tuple
+import numpy as np
+from kriptomatte.domain.repositories import ImageRepository, ImageSession
+from kriptomatte.domain.model.aggregates import ExrImage
+from kriptomatte.domain.model.entities import CryptomatteLayer
+from kriptomatte.domain.model.value_objects import BoundingBox, RankData
+
+logger = logging.getLogger(__name__)
+
+class _LruCache:
+    """Thread-safe LRU bounded by entry count and by the summed size of its entries."""
+    def __init__(self, max_entries: int, max_size: int | None = None):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._entries: OrderedDict[Any, Tuple[Any, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Any, value: Any, size: int = 0):
+        if self.max_size is not None and size > self.max_size:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or (self.max_size is not None and self._size > self.max_size):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+class CachingImageRepository(ImageRepository):
+    """
+    ImageRepository decorator for long-lived processes (the km server). Keeps:
+    - an LRU of parsed headers (ExrImage, with their manifests) of up to max_headers files,
+    - an LRU of decoded channel data returned by ImageSession.read_layers and read_ranks, up to max_channel_bytes.
+    Entries are keyed by path, mtime and size, so a re-rendered file is read again. Headers are also checked
+    against the mtime and size of their sidecar manifests, so an edited manifest is parsed again.
+    Cached arrays are shared between requests and made read-only. Band streaming is not cached.
+    """
+    def __init__(self, repo: ImageRepository, max_headers: int = 256, max_channel_bytes: int = 2 * 1024 ** 3):
+        self.repo = repo
+        self.headers = _LruCache(max_headers)
+        self.channels = _LruCache(max_entries=1 << 30, max_size=max_channel_bytes)
+
+    @staticmethod
+    def file_key(path: str) -> Tuple[str, int, int]:
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def sidecar_key(image: ExrImage) -> Tuple[Tuple[str, int | None, int | None], ...]:
+        """(path, mtime, size) of each sidecar manifest of image, None for missing files."""
+        key = []
+        for path in sorted({layer.manifest_path for layer in image.layers if layer.manifest_path}):
+            try:
+                stat = os.stat(path)
+                key.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                key.append((path, None, None))
+        return tuple(key)
+
+    def _cached_header(self, key: Tuple[str, int, int]) -> ExrImage | None:
+        entry = self.headers.get(key)
+        if entry is None:
+            return None
+        image, sidecars = entry
+        if self.sidecar_key(image) != sidecars:
+            logger.debug("Sidecar manifest of %s changed, reloading its header", key[0])
+            return None
+        return image
+
+    def _cache_header(self, key: Tuple[str, int, int], image: ExrImage):
+        self.headers.put(key, (image, self.sidecar_key(image)))
+
+    def load_header(self, path: str) -> ExrImage:
+        key = self.file_key(path)
+        image = self._cached_header(key)
+        if image is None:
+            image = self.repo.load_header(path)
+            self._cache_header(key, image)
+        return image
+
+    def read_channels(self, path: str, channels: List[str]) -> np.ndarray:
+        return self.repo.read_channels(path, channels)
+
+    def open_session(self, path: str) -> "CachedSession":
+        key = self.file_key(path)
+        image = self._cached_header(key)
+        if image is not None:
+            # The file is only opened if something has to be read from it
+            return CachedSession(self, path, key, image)
+        session = self.repo.open_session(path)
+        self._cache_header(key, session.image)
+        return CachedSession(self, path, key, session.image, session)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {"headers": self.headers.stats(), "channels": self.channels.stats()}
+
+class CachedSession(ImageSession):
+    """ImageSession of a CachingImageRepository. Opens the underlying session on the first uncached read."""
+    def __init__(self, owner: CachingImageRepository, path: str, key: Tuple[str, int, int], image: ExrImage,
+                 session: ImageSession | None = None):
+        self._owner = owner
+        self._path = path
+        self._key = key
+        self._session = session
+        self.image = image
+
+    def _open(self) -> ImageSession:
+        if self._session is None:
+            self._session = self._owner.repo.open_session(self._path)
+        return self._session
+
+    def read_channels(self, channels: List[str]) -> np.ndarray:
+        return self._open().read_channels(channels)
+
+    def read_layers(self, layers: List[CryptomatteLayer], roi: BoundingBox | None = None) -> Dict[str, np.ndarray]:
+        key = (self._key, tuple(layer.name for layer in layers), roi)
+        layer_data = self._owner.channels.get(key)
+        if layer_data is None:
+            layer_data = self._open().read_layers(layers, roi)
+            for array in layer_data.values():
+                array.setflags(write=False)
+            self._owner.channels.put(key, layer_data, sum(array.nbytes for array in layer_data.values()))
+        else:
+            logger.debug("Channel cache hit for %s", self._path)
+        # Callers release layers by popping them, the cached dict must stay whole
+        return dict(layer_data)
+
+    def read_ranks(self, layers: List[CryptomatteLayer], roi: BoundingBox | None = None) -> Dict[str, RankData]:
+        key = (self._key, "ranks", tuple(layer.name for layer in layers), roi)
+        rank_data = self._owner.channels.get(key)
+        if rank_data is None:
+            rank_data = self._open().read_ranks(layers, roi)
+            for ranks in rank_data.values():
+                ranks.ids.setflags(write=False)
+                ranks.coverage.setflags(write=False)
+            self._owner.channels.put(key, rank_data, sum(ranks.nbytes for ranks in rank_data.values()))
+        else:
+            logger.debug("Channel cache hit for %s", self._path)
+        return dict(rank_data)
+
+    def iter_bands(self, layers: List[CryptomatteLayer], rows_per_band: int,
+                   roi: BoundingBox | None = None) -> Iterator[Tuple[int, Dict[str, np.ndarray]]]:
+        return self._open().iter_bands(layers, rows_per_band, roi)
+
+    def iter_rank_bands(self, layers: List[CryptomatteLayer], rows_per_band: int,
+                        roi: BoundingBox | None = None) -> Iterator[Tuple[int, Dict[str, RankData]]]:
+        return self._open().iter_rank_bands(layers, rows_per_band, roi)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
@@ -4,12 +4,13 @@ import numpy as np
 import re
 import enum
 import logging
-from typing import List, Dict, Any, Tuple
-from kriptomatte.domain.repositories import ImageRepository
+from typing import List, Dict, Any, Iterator, Tuple
+from kriptomatte.domain.repositories import ImageRepository, ImageSession
 from kriptomatte.domain.model.aggregates import ExrImage
 from kriptomatte.domain.model.entities import CryptomatteLayer
-from kriptomatte.domain.model.value_objects import PixelWindow
+from kriptomatte.domain.model.value_objects import PixelWindow, BoundingBox, RankData
 from kriptomatte.infrastructure.factories import ManifestFactory
+from kriptomatte.infrastructure.persistence.manifest_cache import ManifestCache
 
 logger = logging.getLogger(__name__)
 
@@ -28,30 +29,201 @@ numpy_dtype = {
 
 CRYPTO_METADATA_LEGAL_PREFIX = ["exr/cryptomatte/", "cryptomatte/"]
 
-class OpenExrRepository(ImageRepository):
-    def load_header(self, path: str) -> ExrImage:
-        logger.debug(f"Attempting to load header from: {path}")
+def _native_dtype(chan_type: Any) -> type:
+    """NumPy dtype of a channel as stored: float16 for half channels, float32 otherwise."""
+    # Match to our internal enum
+    exr_d = None
+    for ed, pd in pixel_dtype.items():
+        if pd == chan_type:
+            exr_d = ed
+            break
+    return numpy_dtype[ExrDtype.FLOAT16] if exr_d == ExrDtype.FLOAT16 else numpy_dtype[ExrDtype.FLOAT32]
+
+def _channel_to_array(channel_buffer: bytes, chan_type: Any, shape: Tuple[int, int]) -> np.ndarray:
+    """Converts a raw channel buffer to a float32 [H, W] array."""
+    np_type = _native_dtype(chan_type)
+    channel_arr = np.frombuffer(channel_buffer, dtype=np_type).reshape(shape)
+    
+    # Cast to float32 if half float, as domain expects standard floats
+    if np_type == np.float16:
+        channel_arr = channel_arr.astype(np.float32)
+    return channel_arr
+
+class ExrSession(ImageSession):
+    """
+    Keeps one OpenEXR.InputFile and its parsed header open for a whole extraction.
+    parse_layers=False skips Cryptomatte layer and manifest parsing when only pixels are needed.
+    """
+    def __init__(self, repo: "OpenExrRepository", path: str, parse_layers: bool = True):
+        logger.debug("Opening EXR session for: %s", path)
         try:
-            exr_file = OpenEXR.InputFile(path)
+            self._file = OpenEXR.InputFile(path)
         except Exception as e:
-            logger.error(f"Failed to open EXR file at {path}: {e}")
+            logger.error("Failed to open EXR file at %s: %s", path, e)
+            raise
+        self.path = path
+        try:
+            self._header = self._file.header()
+            self.image = repo._build_image(self._header, path, parse_layers)
+        except Exception:
+            self.close()
             raise
 
-        logger.debug("Reading EXR header...")
-        header = exr_file.header()
-        logger.debug("Header read successfully.")
-        
+    def read_channels(self, channels: List[str]) -> np.ndarray:
+        arrays = self._read_arrays(channels)
+        logger.debug("Stacking channels into single array...")
+        result = np.stack([arrays[name] for name in channels], axis=-1)
+        logger.debug("Channels read and stacked. Result shape: %s", result.shape)
+        return result
+
+    def read_layers(self, layers: List[CryptomatteLayer], roi: BoundingBox | None = None) -> Dict[str, np.ndarray]:
+        roi = roi or self._full_roi()
+        all_channels = list(dict.fromkeys(name for layer in layers for name in layer.channel_names))
+        arrays = self._read_arrays(all_channels, roi.y_min, roi.y_max, roi)
+        logger.debug("Read %s channels for %s layers in one call.", len(all_channels), len(layers))
+        return self._stack_layers(layers, arrays, roi.height, roi.width)
+
+    def read_ranks(self, layers: List[CryptomatteLayer], roi: BoundingBox | None = None) -> Dict[str, RankData]:
+        roi = roi or self._full_roi()
+        return self._read_ranks(layers, 0, roi.height - 1, roi)
+
+    def iter_rank_bands(self, layers: List[CryptomatteLayer], rows_per_band: int,
+                        roi: BoundingBox | None = None) -> Iterator[Tuple[int, Dict[str, RankData]]]:
+        roi = roi or self._full_roi()
+        rows_per_band = max(1, rows_per_band)
+        for first_row in range(0, roi.height, rows_per_band):
+            last_row = min(roi.height, first_row + rows_per_band) - 1
+            yield first_row, self._read_ranks(layers, first_row, last_row, roi)
+
+    def iter_bands(self, layers: List[CryptomatteLayer], rows_per_band: int,
+                   roi: BoundingBox | None = None) -> Iterator[Tuple[int, Dict[str, np.ndarray]]]:
+        # Scanline ranges work for tiled files too, the library decodes the tiles covering the range
+        roi = roi or self._full_roi()
+        all_channels = list(dict.fromkeys(name for layer in layers for name in layer.channel_names))
+        rows_per_band = max(1, rows_per_band)
+        logger.debug("Streaming %s channels in bands of %s rows.", len(all_channels), rows_per_band)
+        for first_row in range(0, roi.height, rows_per_band):
+            last_row = min(roi.height, first_row + rows_per_band) - 1
+            arrays = self._read_arrays(all_channels, roi.y_min + first_row, roi.y_min + last_row, roi)
+            yield first_row, self._stack_layers(layers, arrays, last_row - first_row + 1, roi.width)
+
+    def _full_roi(self) -> BoundingBox:
+        window = self.image.window
+        return BoundingBox(x_min=0, y_min=0, x_max=window.width - 1, y_max=window.height - 1)
+
+    def _stack_layers(self, layers: List[CryptomatteLayer], arrays: Dict[str, np.ndarray], rows: int, width: int) -> Dict[str, np.ndarray]:
+        result = {}
+        for layer in layers:
+            if layer.channel_names:
+                result[layer.name] = np.stack([arrays[name] for name in layer.channel_names], axis=-1)
+            else:
+                result[layer.name] = np.zeros((rows, width, 0), dtype=np.float32)
+        return result
+
+    def _read_ranks(self, layers: List[CryptomatteLayer], first_row: int, last_row: int,
+                    roi: BoundingBox) -> Dict[str, RankData]:
+        """
+        Reads rows first_row..last_row of the roi (relative to its top) as RankData.
+        ID buffers are reinterpreted as uint32 and coverage is kept in its stored precision,
+        each channel is copied once, into its rank plane.
+        """
+        all_channels = list(dict.fromkeys(name for layer in layers for name in layer.channel_names))
+        buffers = self._read_buffers(all_channels, roi.y_min + first_row, roi.y_min + last_row)
+        shape = (last_row - first_row + 1, self.image.window.width)
+        columns = slice(roi.x_min, roi.x_max + 1)
+        channel_types = self._header['channels']
+
+        result = {}
+        for layer in layers:
+            num_ranks = len(layer.channel_names) // 2
+            id_names = layer.channel_names[0:num_ranks * 2:2]
+            coverage_names = layer.channel_names[1:num_ranks * 2:2]
+            # Half only if every coverage channel is half, mixed layers are upcast
+            coverage_dtype = np.result_type(np.float16, *(_native_dtype(channel_types[name].type)
+                                                          for name in coverage_names))
+            ids = np.empty((num_ranks, shape[0], roi.width), dtype=np.uint32)
+            coverage = np.empty((num_ranks, shape[0], roi.width), dtype=coverage_dtype)
+            for rank, (id_name, coverage_name) in enumerate(zip(id_names, coverage_names)):
+                id_type = _native_dtype(channel_types[id_name].type)
+                id_plane = np.frombuffer(buffers[id_name], dtype=id_type).reshape(shape)[:, columns]
+                # Float32 IDs are taken bit for bit, half IDs (lossy, but possible) go through float32 first
+                ids[rank] = id_plane.view(np.uint32) if id_type == np.float32 else id_plane.astype(np.float32).view(np.uint32)
+                coverage_type = _native_dtype(channel_types[coverage_name].type)
+                coverage[rank] = np.frombuffer(buffers[coverage_name], dtype=coverage_type).reshape(shape)[:, columns]
+            result[layer.name] = RankData(ids=ids, coverage=coverage)
+        return result
+
+    def _read_arrays(self, channels: List[str], first_row: int | None = None, last_row: int | None = None,
+                     roi: BoundingBox | None = None) -> Dict[str, np.ndarray]:
+        """
+        Reads channels as float32 [rows, W] arrays. first_row/last_row (inclusive, relative to
+        the data window) restrict the read to a scanline range; by default the whole window is read.
+        roi: columns outside roi.x_min..roi.x_max are cropped right after decoding (no copy).
+        """
+        if first_row is None:
+            first_row, last_row = 0, self.image.window.height - 1
+        shape = (last_row - first_row + 1, self.image.window.width)
+        buffers = self._read_buffers(channels, first_row, last_row)
+        columns = slice(roi.x_min, roi.x_max + 1) if roi is not None else slice(None)
+        return {
+            channel_name: _channel_to_array(channel_buffer, self._header['channels'][channel_name].type, shape)[:, columns]
+            for channel_name, channel_buffer in buffers.items()
+        }
+
+    def _read_buffers(self, channels: List[str], first_row: int, last_row: int) -> Dict[str, bytes]:
+        """Raw buffers of the channels for rows first_row..last_row (inclusive, relative to the data window)."""
+        if self._file is None:
+            # Reading from a closed InputFile crashes the interpreter
+            raise ValueError(f"EXR session for {self.path} is closed")
+        if not channels:
+            return {}
+
+        logger.debug("Reading %s channels from %s, rows %s-%s.", len(channels), self.path, first_row, last_row)
+        # One call decodes each scanline block once for all channels,
+        # instead of once per channel. Scanline numbers are absolute, offset by the data window origin.
+        y_min = self._header['dataWindow'].min.y
+        buffers = self._file.channels(channels, scanLine1=y_min + first_row, scanLine2=y_min + last_row)
+        return dict(zip(channels, buffers))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class OpenExrRepository(ImageRepository):
+    def __init__(self, manifest_cache: ManifestCache | None = None):
+        """
+        manifest_cache: parsed manifests shared by every file this repository opens.
+        Defaults to an in-memory cache, so frames of one shot parse their manifest once.
+        """
+        self.manifest_cache = manifest_cache if manifest_cache is not None else ManifestCache()
+
+    def load_header(self, path: str) -> ExrImage:
+        logger.debug("Attempting to load header from: %s", path)
+        with self.open_session(path) as session:
+            return session.image
+
+    def read_channels(self, path: str, channels: List[str]) -> np.ndarray:
+        with ExrSession(self, path, parse_layers=False) as session:
+            return session.read_channels(channels)
+
+    def open_session(self, path: str) -> ExrSession:
+        return ExrSession(self, path)
+
+    def _build_image(self, header: Any, path: str, parse_layers: bool = True) -> ExrImage:
         # Parse Window
         dw = header['dataWindow']
         width = dw.max.x - dw.min.x + 1
         height = dw.max.y - dw.min.y + 1
         window = PixelWindow(height=height, width=width)
-        logger.debug(f"Data window parsed: {width}x{height}")
+        logger.debug("Data window parsed: %sx%s", width, height)
         
         # Parse Layers
-        logger.debug("Parsing Cryptomatte layers from header...")
-        layers = self._parse_layers(header, path)
-        logger.debug(f"Found {len(layers)} Cryptomatte layers.")
+        layers = []
+        if parse_layers:
+            logger.debug("Parsing Cryptomatte layers from header...")
+            layers = self._parse_layers(header, path)
+            logger.debug("Found %s Cryptomatte layers.", len(layers))
         
         return ExrImage(
             file_path=path,
@@ -60,52 +232,6 @@ class OpenExrRepository(ImageRepository):
             layers=layers
         )
 
-    def read_channels(self, path: str, channels: List[str]) -> np.ndarray:
-        logger.debug(f"Opening file {path} to read {len(channels)} channels.")
-        exr_file = OpenEXR.InputFile(path)
-        header = exr_file.header()
-        
-        # Get window shape for reshaping
-        dw = header['dataWindow']
-        width = dw.max.x - dw.min.x + 1
-        height = dw.max.y - dw.min.y + 1
-        shape = (height, width)
-        
-        read_channels_list = []
-        for i, channel_name in enumerate(channels):
-            logger.debug(f"Reading channel {i+1}/{len(channels)}: {channel_name}")
-            # Determine type
-            chan_type = header['channels'][channel_name].type
-            
-            # Match to our internal enum
-            exr_d = None
-            for ed, pd in pixel_dtype.items():
-                if pd == chan_type:
-                    exr_d = ed
-                    break
-            
-            if exr_d == ExrDtype.FLOAT16:
-                np_type = np.float16
-            else:
-                np_type = np.float32
-            
-            logger.debug(f"Channel type: {chan_type}, Reading as numpy type: {np_type}")
-            channel_buffer = exr_file.channel(channel_name)
-            channel_arr = np.frombuffer(channel_buffer, dtype=np_type)
-            channel_arr = channel_arr.reshape(shape)
-            
-            # Cast to float32 if half float, as domain expects standard floats
-            if np_type == np.float16:
-                 logger.debug("Casting FLOAT16 to FLOAT32...")
-                 channel_arr = channel_arr.astype(np.float32)
-                 
-            read_channels_list.append(channel_arr)
-        
-        logger.debug("Stacking channels into single array...")
-        result = np.stack(read_channels_list, axis=-1)
-        logger.debug(f"Channels read and stacked. Result shape: {result.shape}")
-        return result
-
     def _parse_layers(self, header: Any, path: str) -> List[CryptomatteLayer]:
         layers = []
         logger.debug("Extracting Cryptomatte metadata from header keys...")
@@ -116,23 +242,24 @@ class OpenExrRepository(ImageRepository):
             if isinstance(name, bytes):
                 name = name.decode('utf-8')
             
-            logger.debug(f"Processing layer metadata for: {name} (ID: {meta_id})")
+            logger.debug("Processing layer metadata for: %s (ID: %s)", name, meta_id)
 
             # Identify channels
             channels, naming_scheme = self._identify_channels(header, name)
-            logger.debug(f"Identified {len(channels)} channels with naming scheme '{naming_scheme}'")
+            logger.debug("Identified %s channels with naming scheme '%s'", len(channels), naming_scheme)
             
             # Parse Manifest
             logger.debug("Parsing manifest...")
-            manifest = ManifestFactory.create_from_metadata(meta_data, path)
-            logger.debug(f"Manifest parsed. Contains {len(manifest)} objects.")
+            manifest = ManifestFactory.create_from_metadata(meta_data, path, cache=self.manifest_cache)
+            logger.debug("Manifest parsed. Contains %s objects.", len(manifest))
             
             layer = CryptomatteLayer(
                 name=name,
                 manifest=manifest,
                 channel_names=channels,
                 naming_scheme=naming_scheme,
-                id_prefix=meta_id
+                id_prefix=meta_id,
+                manifest_path=ManifestFactory.sidecar_path(meta_data, path) or ""
             )
             layers.append(layer)
             
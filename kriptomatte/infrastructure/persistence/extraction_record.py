@@ -0,0 +1,109 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from typing import Any, Dict, List
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RECORD_VERSION = 1
+
+class ExtractionRecord:
+    """
+    What one extract_all run wrote for one input file, stored as JSON at {output_dir}/{base}.km.json:
+      input: path, mtime_ns and size of the EXR (no read needed to compare),
+      options: the extraction options that change the output,
+      layers: layer name -> {object name: hex Cryptomatte ID},
+      outputs: output path relative to output_dir -> content digest (None for outputs that are always rewritten).
+
+    A rerun compares input and options to skip the whole file, and asks unchanged(path, digest)
+    before each write to skip outputs whose content is the same as last time.
+    """
+    def __init__(self, output_dir: str, input_stat: Dict[str, Any], options: Dict[str, Any],
+                 previous: "ExtractionRecord | None" = None):
+        self.output_dir = output_dir
+        self.input = input_stat
+        self.options = options
+        self.layers: Dict[str, Dict[str, str]] = {}
+        self.outputs: Dict[str, str | None] = {}
+        # Digests cover the encoder settings, so they stay valid when other options change
+        self._previous_outputs = previous.outputs if previous is not None else {}
+        self._same_options = previous is not None and previous.options == options
+
+    @staticmethod
+    def path_for(file_path: str, output_dir: str) -> str:
+        base_name = os.path.splitext(os.path.basename(file_path))[0]
+        return os.path.join(output_dir, f"{base_name}.km.json")
+
+    @staticmethod
+    def stat_input(file_path: str) -> Dict[str, Any]:
+        stat = os.stat(file_path)
+        return {"path": os.path.abspath(file_path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    @staticmethod
+    def digest(*parts) -> str:
+        """SHA-1 of arrays (shape, dtype and bytes), strings and numbers."""
+        sha = hashlib.sha1()
+        for part in parts:
+            if isinstance(part, np.ndarray):
+                sha.update(f"{part.dtype.str}{part.shape}".encode("utf-8"))
+                sha.update(np.ascontiguousarray(part).data)
+            else:
+                sha.update(repr(part).encode("utf-8"))
+        return sha.hexdigest()
+
+    def matches(self, input_stat: Dict[str, Any], options: Dict[str, Any]) -> bool:
+        return self.input == input_stat and self.options == options
+
+    def unchanged(self, path: str, digest: str | None) -> bool:
+        """
+        Records that path holds content with this digest. Returns True when the previous
+        run wrote the same digest there and the file is still present, so it need not be rewritten.
+        """
+        key = os.path.relpath(path, self.output_dir)
+        self.outputs[key] = digest
+        return digest is not None and self._previous_outputs.get(key) == digest and os.path.exists(path)
+
+    def stale_outputs(self) -> List[str]:
+        """
+        Absolute paths written by the previous run with the same options and not by this one
+        (objects or layers that are gone). Outputs of other options are left alone.
+        """
+        if not self._same_options:
+            return []
+        return [os.path.join(self.output_dir, key) for key in self._previous_outputs if key not in self.outputs]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": RECORD_VERSION, "input": self.input, "options": self.options,
+                "layers": self.layers, "outputs": self.outputs}
+
+    def save(self, path: str):
+        # Written to a temporary file and renamed, a half-written record must not skip a frame
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def load(path: str, output_dir: str) -> "ExtractionRecord | None":
+        """Returns None when there is no readable record of the current version."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable extraction record %s: %s", path, e)
+            return None
+        if data.get("version") != RECORD_VERSION:
+            return None
+        record = ExtractionRecord(output_dir, data["input"], data["options"])
+        record.layers = data.get("layers", {})
+        record.outputs = data.get("outputs", {})
+        return record
@@ -0,0 +1,133 @@
+import os
+import hashlib
+import logging
+import threading
+import tempfile
+from collections import OrderedDict
+import numpy as np
+from kriptomatte.domain.model.value_objects import ColumnarManifest
+
+logger = logging.getLogger(__name__)
+
+class ManifestCache:
+    """
+    Two level cache of parsed manifests.
+    - In-process LRU of up to max_entries manifests.
+    - Optional on-disk store (one uncompressed .npz per manifest in cache_dir), shared
+      between processes and runs, evicted oldest-first above max_disk_bytes.
+
+    Keys come from key_for_bytes (embedded manifests, content hash)
+    or key_for_file (sidecar manifests, path + mtime + size, no read needed).
+    """
+    def __init__(self, max_entries: int = 32, cache_dir: str | None = None, max_disk_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, ColumnarManifest] = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __getstate__(self):
+        # Sent to batch worker processes: keep the settings, not the lock or the entries
+        return {"max_entries": self.max_entries, "cache_dir": self.cache_dir, "max_disk_bytes": self.max_disk_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @staticmethod
+    def key_for_bytes(manifest_bytes: bytes) -> str:
+        return "b" + hashlib.sha1(manifest_bytes).hexdigest()
+
+    @staticmethod
+    def key_for_file(path: str) -> str:
+        stat = os.stat(path)
+        identity = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}"
+        return "f" + hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> ColumnarManifest | None:
+        with self._lock:
+            manifest = self._memory.get(key)
+            if manifest is not None:
+                self._memory.move_to_end(key)
+                logger.debug("Manifest cache hit (memory): %s", key)
+                return manifest
+
+        manifest = self._load_from_disk(key)
+        if manifest is not None:
+            logger.debug("Manifest cache hit (disk): %s", key)
+            self._remember(key, manifest)
+        return manifest
+
+    def put(self, key: str, manifest: ColumnarManifest):
+        # Cached manifests are shared between frames, make sure nobody edits them in place
+        manifest.ids.setflags(write=False)
+        manifest.names.setflags(write=False)
+        self._remember(key, manifest)
+        if self.cache_dir:
+            self._save_to_disk(key, manifest)
+
+    def _remember(self, key: str, manifest: ColumnarManifest):
+        with self._lock:
+            self._memory[key] = manifest
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _load_from_disk(self, key: str) -> ColumnarManifest | None:
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                manifest = ColumnarManifest(data["names"].tolist(), data["ids"])
+            # Refresh mtime so eviction drops the least recently used files
+            os.utime(path)
+            return manifest
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Ignoring unreadable manifest cache file %s: %s", path, e)
+            return None
+
+    def _save_to_disk(self, key: str, manifest: ColumnarManifest):
+        path = self._disk_path(key)
+        tmp_path = None
+        try:
+            # Write to a temporary file and rename, so concurrent readers never see partial files
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, names=np.array(manifest.names.tolist(), dtype=str), ids=manifest.ids)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("Failed to write manifest cache file %s: %s", path, e)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                logger.debug("Evicted manifest cache file %s", path)
+            except FileNotFoundError:
+                pass
+            total -= size
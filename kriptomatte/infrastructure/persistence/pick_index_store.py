@@ -0,0 +1,75 @@
+import os
+import json
+import struct
+import logging
+import tempfile
+from typing import Any, Dict, Tuple
+import numpy as np
+from kriptomatte.domain.services.picking import PixelPickIndex
+
+logger = logging.getLogger(__name__)
+
+PICK_INDEX_MAGIC = b"KMPICK\x00\x01"
+# Arrays start on this boundary, so memory maps are aligned
+ALIGNMENT = 64
+
+class PickIndexStore:
+    """
+    Stores a PixelPickIndex in one uncompressed file that loads as memory maps:
+      magic (8 bytes), header length (uint64 little-endian), JSON header,
+      then labels and values, each C-ordered [H, W, k] at an aligned offset.
+    The header holds shape, label dtype, array offsets, object ids and names, and a free-form source dict
+    (the application stores the input EXR's stat and the build options there to detect stale indexes).
+    """
+    @staticmethod
+    def save(path: str, index: PixelPickIndex, source: Dict[str, Any] | None = None):
+        dir_name = os.path.dirname(path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        labels = np.ascontiguousarray(index.labels)
+        values = np.ascontiguousarray(index.values)
+        header = {"shape": list(labels.shape), "label_dtype": labels.dtype.str,
+                  "ids": index.ids.tolist(), "names": index.names, "source": source or {}}
+        # Offsets depend on the header length, which depends on the offsets: reserve digits for them
+        header["labels_offset"] = header["values_offset"] = 10 ** 15
+        prefix = len(PICK_INDEX_MAGIC) + 8 + len(json.dumps(header).encode("utf-8"))
+        header["labels_offset"] = -(-prefix // ALIGNMENT) * ALIGNMENT
+        header["values_offset"] = -(-(header["labels_offset"] + labels.nbytes) // ALIGNMENT) * ALIGNMENT
+        header_bytes = json.dumps(header).encode("utf-8")
+
+        # Written to a temporary file and renamed, a reader never maps a half-written index
+        fd, tmp_path = tempfile.mkstemp(dir=dir_name or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(PICK_INDEX_MAGIC)
+                f.write(struct.pack("<Q", len(header_bytes)))
+                f.write(header_bytes)
+                f.write(b"\0" * (header["labels_offset"] - f.tell()))
+                labels.tofile(f)
+                f.write(b"\0" * (header["values_offset"] - f.tell()))
+                values.tofile(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        logger.debug("Wrote pick index of %s objects to %s", index.ids.size, path)
+
+    @staticmethod
+    def read_header(path: str) -> Dict[str, Any]:
+        """The JSON header only, no arrays are mapped. Raises ValueError if path is not a pick index."""
+        with open(path, "rb") as f:
+            if f.read(len(PICK_INDEX_MAGIC)) != PICK_INDEX_MAGIC:
+                raise ValueError(f"{path} is not a Kriptomatte pick index")
+            (length,) = struct.unpack("<Q", f.read(8))
+            return json.loads(f.read(length))
+
+    @staticmethod
+    def load(path: str) -> Tuple[PixelPickIndex, Dict[str, Any]]:
+        """The index, with labels and values as read-only memory maps of path, and its source dict."""
+        header = PickIndexStore.read_header(path)
+        shape = tuple(header["shape"])
+        labels = np.memmap(path, dtype=np.dtype(header["label_dtype"]), mode="r",
+                           offset=header["labels_offset"], shape=shape)
+        values = np.memmap(path, dtype=np.uint8, mode="r", offset=header["values_offset"], shape=shape)
+        index = PixelPickIndex(labels, values, np.array(header["ids"], dtype=np.uint32), header["names"])
+        return index, header["source"]
@@ -1,33 +1,388 @@
 import argparse
+import os
 import sys
+import json
 import logging
-from kriptomatte.infrastructure.logging.logger import setup_logger
-from kriptomatte.infrastructure.persistence.exr_repository import OpenExrRepository
-from kriptomatte.application.services import CryptomatteExtractionService
+# Only light modules at import time: NumPy, Pillow and OpenEXR are imported by the subcommand that needs them
+from kriptomatte.application.options import OUTPUT_MODES, OUTPUT_FORMATS, describe_image, service_kwargs_from_options
+from kriptomatte.infrastructure.io.png_options import PNG_STRATEGIES
+from kriptomatte.infrastructure.io.file_system import FileSystem
+
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+# Header-only subcommands: "km inspect FILE" prints everything, "km ls FILE" omits the manifest entries
+INSPECT_COMMANDS = ('inspect', 'ls')
+SERVE_COMMAND = 'serve'
+PICK_COMMAND = 'pick'
+CONNECT_HELP = ('Forward to a running "km serve" on SOCKET (default: $KM_SOCKET or the per-user socket '
+                'in the temp directory)')
+
+def parse_roi(spec: str) -> tuple:
+    """Parses "x_min,y_min,x_max,y_max" (the BoundingBox is built once the domain model is imported)."""
+    try:
+        x_min, y_min, x_max, y_max = (int(value) for value in spec.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected x_min,y_min,x_max,y_max, got {spec!r}")
+    return x_min, y_min, x_max, y_max
 
 def get_args():
-    parser = argparse.ArgumentParser(description='Decode Cryptomattes in EXR file to PNG files (DDD Refactored).')
-    parser.add_argument('--input', '-i', dest='input_path', type=str, required=True,
-                        help='Provide path of exr file')
+    parser = argparse.ArgumentParser(description='Decode Cryptomattes in EXR file to PNG files (DDD Refactored).',
+                                     epilog='"km inspect FILE..." and "km ls FILE..." print the Cryptomatte layers '
+                                            'of files as JSON, reading headers only. "km serve" starts a resident '
+                                            'server that --connect forwards to. "km pick FILE --at X,Y" lists the '
+                                            'objects under pixels.')
+    parser.add_argument('--input', '-i', dest='input_paths', type=str, nargs='+', required=True,
+                        help='Provide path of exr file. Several files, directories, globs ("*.exr") '
+                             'and frame sequences ("shot_####.exr", "shot_%%04d.exr") run as a batch')
+    parser.add_argument('--frames', '-f', dest='frames', type=str, default=None,
+                        help='Frame range for sequence inputs, e.g. "1001-1100", "1001-1100x2" or "1,5,10-20"')
+    parser.add_argument('--jobs', '-j', dest='jobs', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes in batch mode. Defaults to the CPU count')
+    parser.add_argument('--pipeline', dest='pipeline', action='store_true',
+                        help='Extract a sequence in one process, reading the next frames and encoding the previous '
+                             'one while masking the current one (instead of --jobs worker processes)')
+    parser.add_argument('--read-ahead', dest='read_ahead', type=int, default=1, metavar='N',
+                        help='With --pipeline: frames read and waiting to be masked (default: 1)')
+    parser.add_argument('--mask-queue', dest='mask_queue', type=int, default=64, metavar='N',
+                        help='With --pipeline: masks computed and waiting to be written (default: 64)')
+    parser.add_argument('--masking-workers', dest='masking_workers', type=int, default=1, metavar='N',
+                        help='Threads decomposing each frame in row bands, to cut the latency of one large frame '
+                             '(default: 1)')
+    parser.add_argument('--legacy-masking', dest='legacy_masking', action='store_true',
+                        help='Compute masks one object at a time instead of in a single pass')
+    parser.add_argument('--output-mode', dest='output_mode', choices=OUTPUT_MODES, default='full',
+                        help='full: full-frame PNG per object. cropped: PNG cropped to the object, offset stored in PNG metadata')
+    parser.add_argument('--format', dest='formats', choices=OUTPUT_FORMATS, nargs='+', default=['png'],
+                        help='png: PNG per object and packed-ID preview. labels: one label map and JSON legend per layer. '
+                             'tiff: one multi-page TIFF per layer. npz: one compressed archive of cropped masks per layer')
+    parser.add_argument('--writers', dest='writers', type=int, default=None,
+                        help='Number of PNG encoding threads (0 encodes inline). '
+                             'Defaults to the CPU count for a single file and 0 in batch mode')
+    parser.add_argument('--png-compress-level', dest='png_compress_level', type=int, choices=range(10), default=None,
+                        metavar='0-9', help='zlib compression level for PNG output. Lower is faster and larger')
+    parser.add_argument('--png-strategy', dest='png_strategy', choices=list(PNG_STRATEGIES), default='default',
+                        help='zlib strategy for PNG output')
+    parser.add_argument('--memory-budget', dest='memory_budget', type=int, default=None, metavar='MB',
+                        help='Stream channels in row bands that fit this many MB instead of loading whole layers')
+    parser.add_argument('--manifest-cache', dest='manifest_cache', type=str, default=None,
+                        help='Directory for an on-disk cache of parsed manifests, shared between runs and workers')
+    parser.add_argument('--layer', dest='layers', action='append', default=[], metavar='GLOB',
+                        help='Only extract layers matching this glob (repeatable). Other layers are not read')
+    parser.add_argument('--include', dest='include', action='append', default=[], metavar='GLOB',
+                        help='Only extract objects whose manifest name matches this glob, e.g. "char_*" (repeatable)')
+    parser.add_argument('--exclude', dest='exclude', action='append', default=[], metavar='GLOB',
+                        help='Skip objects whose manifest name matches this glob (repeatable)')
+    parser.add_argument('--union', dest='union', action='store_true',
+                        help='Also write one matte of all selected objects per layer ({file}_{layer}_union.png)')
+    parser.add_argument('--roi', dest='roi', type=parse_roi, default=None, metavar='X0,Y0,X1,Y1',
+                        help='Only extract this inclusive pixel region of the data window. Only its scanlines are read')
+    parser.add_argument('--proxy', dest='proxy', type=int, default=1, metavar='N',
+                        help='Box-filter masks to 1/N resolution, e.g. 4 for quarter resolution proxies')
+    parser.add_argument('--incremental', dest='incremental', action='store_true',
+                        help='Keep a {file}.km.json record next to the outputs. Reruns skip unchanged files '
+                             'and only rewrite masks whose content changed')
+    parser.add_argument('--connect', dest='connect', nargs='?', const='', default=None, metavar='SOCKET',
+                        help=CONNECT_HELP)
+    parser.add_argument('--log-level', dest='log_level', choices=LOG_LEVELS, default='INFO',
+                        help='Logging verbosity. DEBUG logs every object and costs throughput')
+    parser.add_argument('--profile', dest='profile', type=str, default=None, metavar='PATH',
+                        help='Write per-stage timings and counters to PATH (.csv for CSV, JSON otherwise)')
+    parser.add_argument('--cprofile', dest='cprofile', type=str, default=None, metavar='PATH',
+                        help='Run under cProfile and dump the stats to PATH (main process only, use --jobs 0 for batches)')
+    parser.add_argument('--tracemalloc', dest='tracemalloc', action='store_true',
+                        help='Trace allocations and add the peak to the --profile report (main process only)')
     return parser.parse_args()
 
+def get_inspect_args(command: str, argv: list):
+    parser = argparse.ArgumentParser(prog=f'km {command}',
+                                     description='Print the Cryptomatte layers, channels and manifests of EXR files '
+                                                 'as JSON, one line per file. Only headers are read.')
+    parser.add_argument('input_paths', type=str, nargs='+', metavar='INPUT',
+                        help='EXR files, directories, globs or frame sequences, as for --input')
+    parser.add_argument('--frames', '-f', dest='frames', type=str, default=None,
+                        help='Frame range for sequence inputs')
+    parser.add_argument('--indent', dest='indent', type=int, default=None,
+                        help='Pretty-print each file with this indent')
+    parser.add_argument('--connect', dest='connect', nargs='?', const='', default=None, metavar='SOCKET',
+                        help=CONNECT_HELP)
+    return parser.parse_args(argv)
+
+def parse_point(spec: str) -> tuple:
+    """Parses "x,y" pixel coordinates."""
+    try:
+        x, y = (float(value) for value in spec.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected x,y, got {spec!r}")
+    return x, y
+
+def get_pick_args(argv: list):
+    parser = argparse.ArgumentParser(prog=f'km {PICK_COMMAND}',
+                                     description='Print the objects of a Cryptomatte layer under pixels, in a box '
+                                                 'or in a polygon, with their coverage, as JSON lines.')
+    parser.add_argument('input_path', type=str, metavar='INPUT', help='EXR file')
+    parser.add_argument('--layer', dest='layer', type=str, default=None,
+                        help='Cryptomatte layer name (default: the first layer)')
+    parser.add_argument('--at', dest='points', type=parse_point, nargs='+', default=[], metavar='X,Y',
+                        help='Pixels to pick')
+    parser.add_argument('--region', dest='regions', type=parse_roi, nargs='+', default=[], metavar='X0,Y0,X1,Y1',
+                        help='Inclusive pixel boxes to pick')
+    parser.add_argument('--polygon', dest='polygon', type=parse_point, nargs='+', default=None, metavar='X,Y',
+                        help='Vertices of a polygon (lasso) to pick, in pixel coordinates')
+    parser.add_argument('--top-k', dest='top_k', type=int, default=None, metavar='K',
+                        help='Objects kept per pixel in the index (default: every rank)')
+    parser.add_argument('--index', dest='index_path', nargs='?', const='', default=None, metavar='PATH',
+                        help='Save the index to PATH (default: {file}[.{layer}].kmpick next to the input) and '
+                             'memory-map it on later calls while the input is unchanged')
+    args = parser.parse_args(argv)
+    if not (args.points or args.regions or args.polygon):
+        parser.error('Give at least one of --at, --region or --polygon')
+    return args
+
+def get_serve_args(argv: list):
+    parser = argparse.ArgumentParser(prog=f'km {SERVE_COMMAND}',
+                                     description='Run a resident extraction server on a Unix domain socket. '
+                                                 'It keeps headers, manifests and decoded channels of recent files '
+                                                 'in memory for "km --connect" and "km inspect --connect".')
+    parser.add_argument('--socket', dest='socket', type=str, default=None,
+                        help='Socket path (default: $KM_SOCKET or the per-user socket in the temp directory)')
+    parser.add_argument('--workers', dest='workers', type=int, default=os.cpu_count() or 1,
+                        help='Files processed at once over all requests. Defaults to the CPU count')
+    parser.add_argument('--header-cache', dest='header_cache', type=int, default=256, metavar='N',
+                        help='Parsed headers (with manifests) kept in memory (default: 256)')
+    parser.add_argument('--channel-cache', dest='channel_cache', type=int, default=2048, metavar='MB',
+                        help='Memory for decoded channel arrays of recent files (default: 2048)')
+    parser.add_argument('--manifest-cache', dest='manifest_cache', type=str, default=None,
+                        help='Directory for an on-disk cache of parsed manifests')
+    parser.add_argument('--log-level', dest='log_level', choices=LOG_LEVELS, default='INFO',
+                        help='Logging verbosity')
+    parser.add_argument('--status', dest='status', action='store_true',
+                        help='Print the cache statistics of the running server and exit')
+    parser.add_argument('--stop', dest='stop', action='store_true',
+                        help='Stop the running server and exit')
+    return parser.parse_args(argv)
+
+def extraction_options(args, writers: int) -> dict:
+    """The extraction options of parsed CLI args, as plain JSON (what --connect sends to the server)."""
+    return {"use_decomposition": not args.legacy_masking,
+            "output_mode": args.output_mode,
+            "writer_workers": writers,
+            "memory_budget": args.memory_budget * 1024 * 1024 if args.memory_budget else None,
+            "png_compress_level": args.png_compress_level,
+            "png_strategy": args.png_strategy,
+            "layers": args.layers,
+            "include": args.include,
+            "exclude": args.exclude,
+            "union": args.union,
+            "output_formats": args.formats,
+            "roi": list(args.roi) if args.roi else None,
+            "proxy": args.proxy,
+            "incremental": args.incremental,
+            "masking_workers": args.masking_workers}
+
+def _connect(socket_path: str):
+    from kriptomatte.interface.client import ServerClient
+    return ServerClient(socket_path or None)
+
+def inspect_main(command: str, argv: list) -> int:
+    """
+    Header-only listing built on OpenExrRepository.load_header, no pixels are read.
+    "inspect" lists every manifest entry (name -> hex ID), "ls" only counts them.
+    """
+    args = get_inspect_args(command, argv)
+    input_files = FileSystem.expand_inputs(args.input_paths, args.frames)
+    
+    if args.connect is not None:
+        response = _connect(args.connect).request({"command": "inspect", "manifest": command == 'inspect',
+                                                   "files": [os.path.abspath(path) for path in input_files]})
+        if "files" not in response:
+            print(json.dumps(response), flush=True)
+            return 1
+        for entry in response["files"]:
+            print(json.dumps(entry, indent=args.indent), flush=True)
+        return 0 if response["ok"] else 1
+    
+    from kriptomatte.infrastructure.persistence.exr_repository import OpenExrRepository
+    repo = OpenExrRepository()
+    ok = True
+    for file_path in input_files:
+        try:
+            image = repo.load_header(file_path)
+        except Exception as e:
+            print(json.dumps({"file": file_path, "error": str(e)}), flush=True)
+            ok = False
+            continue
+        print(json.dumps({"file": file_path, **describe_image(image, with_manifest=command == 'inspect')},
+                         indent=args.indent), flush=True)
+    return 0 if ok else 1
+
+def pick_main(argv: list) -> int:
+    """Point, box and polygon queries on the PixelPickIndex of one layer, built by ObjectPickService."""
+    args = get_pick_args(argv)
+    from kriptomatte.infrastructure.logging.logger import setup_logger
+    from kriptomatte.infrastructure.persistence.exr_repository import OpenExrRepository
+    from kriptomatte.application.picking import ObjectPickService
+    from kriptomatte.domain.model.value_objects import BoundingBox
+    setup_logger(level=logging.WARNING)
+    
+    index_path = args.index_path
+    if index_path == '':
+        index_path = ObjectPickService.index_path_for(args.input_path, args.layer)
+    index = ObjectPickService(OpenExrRepository()).open(args.input_path, args.layer, args.top_k, index_path)
+    ok = True
+    for x, y in args.points:
+        try:
+            hits = index.pick(int(x), int(y))
+        except IndexError as e:
+            print(json.dumps({"at": [int(x), int(y)], "error": str(e)}), flush=True)
+            ok = False
+            continue
+        print(json.dumps({"at": [int(x), int(y)], "objects": [hit._asdict() for hit in hits]}), flush=True)
+    for x_min, y_min, x_max, y_max in args.regions:
+        hits = index.pick_region(BoundingBox(x_min=x_min, y_min=y_min, x_max=x_max, y_max=y_max))
+        print(json.dumps({"region": [x_min, y_min, x_max, y_max], "objects": [hit._asdict() for hit in hits]}),
+              flush=True)
+    if args.polygon:
+        hits = index.pick_region(args.polygon)
+        print(json.dumps({"polygon": [list(vertex) for vertex in args.polygon],
+                          "objects": [hit._asdict() for hit in hits]}), flush=True)
+    return 0 if ok else 1
+
+def serve_main(argv: list) -> int:
+    args = get_serve_args(argv)
+    from kriptomatte.infrastructure.logging.logger import setup_logger
+    logger = setup_logger(level=getattr(logging, args.log_level))
+    
+    if args.status or args.stop:
+        try:
+            response = _connect(args.socket).request({"command": "shutdown" if args.stop else "stats"})
+        except ConnectionError as e:
+            logger.error("%s", e)
+            return 1
+        print(json.dumps(response, indent=2), flush=True)
+        return 0
+    
+    from kriptomatte.infrastructure.persistence.exr_repository import OpenExrRepository
+    from kriptomatte.infrastructure.persistence.manifest_cache import ManifestCache
+    from kriptomatte.infrastructure.persistence.cached_repository import CachingImageRepository
+    from kriptomatte.interface.client import default_socket_path
+    from kriptomatte.interface.server import ExtractionServer
+    
+    socket_path = args.socket or default_socket_path()
+    repo = CachingImageRepository(OpenExrRepository(manifest_cache=ManifestCache(cache_dir=args.manifest_cache)),
+                                  max_headers=args.header_cache, max_channel_bytes=args.channel_cache * 1024 * 1024)
+    with ExtractionServer(socket_path, repo, workers=args.workers) as server:
+        logger.info("km server listening on %s with %s workers", socket_path, args.workers)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    logger.info("km server stopped")
+    return 0
+
+def connect_main(args, input_files: list, writers: int) -> int:
+    """Forwards an extraction to the km server and reports its results."""
+    logger = logging.getLogger("kriptomatte")
+    try:
+        response = _connect(args.connect).request({
+            "command": "extract", "files": [os.path.abspath(path) for path in input_files], "output_dir": None,
+            "options": extraction_options(args, writers)})
+    except ConnectionError as e:
+        logger.error("%s", e)
+        return 1
+    if "results" not in response:
+        logger.error("Server error: %s", response.get("error"))
+        return 1
+    for done, result in enumerate(response["results"], start=1):
+        if result["ok"]:
+            logger.info("[%s/%s] Done %s in %.2fs", done, len(input_files), result["file"], result["seconds"])
+        else:
+            logger.error("[%s/%s] Failed %s:\n%s", done, len(input_files), result["file"], result["error"])
+    return 0 if response["ok"] else 1
+
 def main():
+    try:
+        sys.exit(run())
+    except BrokenPipeError:
+        # Output piped into a reader that exited early (km ls ... | head): stop quietly.
+        # stdout is pointed at devnull so the interpreter's final flush does not fail again
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
+
+def run() -> int:
+    if len(sys.argv) > 1 and sys.argv[1] in INSPECT_COMMANDS:
+        return inspect_main(sys.argv[1], sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == SERVE_COMMAND:
+        return serve_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == PICK_COMMAND:
+        return pick_main(sys.argv[2:])
+    
+    # Required for the batch process pool in frozen executables (km.exe). Header-only subcommands
+    # never start worker processes, so they skip importing multiprocessing
+    import multiprocessing
+    multiprocessing.freeze_support()
     args = get_args()
     
+    from kriptomatte.infrastructure.logging.logger import setup_logger
+    
     # Setup Infrastructure
-    # Setting level to DEBUG as requested for troubleshooting
-    logger = setup_logger(level=logging.DEBUG)
+    logger = setup_logger(level=getattr(logging, args.log_level))
     
-    logger.debug(f"CLI args: {args}")
+    logger.debug("CLI args: %s", args)
     
-    repo = OpenExrRepository()
-    service = CryptomatteExtractionService(repo)
+    input_files = FileSystem.expand_inputs(args.input_paths, args.frames)
+    # A single plain file path keeps the original in-process behaviour
+    batch_mode = len(args.input_paths) > 1 or input_files != [os.path.normpath(args.input_paths[0])]
+    if not input_files:
+        logger.error("No input files found.")
+        return 1
+    
+    # Batch workers already use every core, so encode inline inside them by default
+    pool_mode = batch_mode and not args.pipeline
+    writers = args.writers if args.writers is not None else (0 if pool_mode else os.cpu_count() or 1)
+    if args.connect is not None:
+        return connect_main(args, input_files, writers)
+    
+    import functools
+    from kriptomatte.infrastructure.logging.metrics import StageMetrics, profiling_hooks
+    from kriptomatte.infrastructure.persistence.exr_repository import OpenExrRepository
+    from kriptomatte.infrastructure.persistence.manifest_cache import ManifestCache
+    from kriptomatte.application.services import CryptomatteExtractionService
+    from kriptomatte.application.batch import BatchExtractionService
+    from kriptomatte.application.pipeline import PipelinedExtractionService
     
+    service_kwargs = service_kwargs_from_options(extraction_options(args, writers))
+    
+    manifest_cache = ManifestCache(cache_dir=args.manifest_cache)
+    repo_factory = functools.partial(OpenExrRepository, manifest_cache=manifest_cache)
+    metrics = StageMetrics()
+    
+    ok = True
     try:
-        service.extract_all(args.input_path)
-    except Exception as e:
-        logger.error(f"An error occurred: {e}", exc_info=True)
-        sys.exit(1)
+        with profiling_hooks(metrics, cprofile_path=args.cprofile, trace_memory=args.tracemalloc):
+            if batch_mode and args.pipeline:
+                service = CryptomatteExtractionService(repo_factory(), metrics=metrics, **service_kwargs)
+                pipeline = PipelinedExtractionService(service, read_ahead=args.read_ahead, mask_queue=args.mask_queue)
+                results = pipeline.extract_files(input_files)
+                ok = all(result.ok for result in results)
+            elif batch_mode:
+                batch = BatchExtractionService(repo_factory, workers=args.jobs, service_kwargs=service_kwargs,
+                                               log_level=logger.level, metrics=metrics)
+                results = batch.extract_files(input_files)
+                ok = all(result.ok for result in results)
+            else:
+                repo = repo_factory()
+                service = CryptomatteExtractionService(repo, metrics=metrics, **service_kwargs)
+                try:
+                    service.extract_all(input_files[0])
+                except Exception as e:
+                    logger.error("An error occurred: %s", e, exc_info=True)
+                    ok = False
+    finally:
+        if args.profile:
+            metrics.write(args.profile)
+            logger.info("Wrote profile report to %s", args.profile)
+    
+    return 0 if ok else 1
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,37 @@
+import os
+import json
+import socket
+import getpass
+import tempfile
+from typing import Any, Dict
+
+def default_socket_path() -> str:
+    """Per-user socket of the km server: $KM_SOCKET, or kriptomatte-<user>.sock in the temp directory."""
+    if os.environ.get("KM_SOCKET"):
+        return os.environ["KM_SOCKET"]
+    return os.path.join(tempfile.gettempdir(), f"kriptomatte-{getpass.getuser()}.sock")
+
+class ServerClient:
+    """
+    Thin client of the km server (kriptomatte.interface.server). Imports nothing heavy.
+    Protocol: one JSON request per connection, one line each way, e.g.
+      {"command": "extract", "files": [...], "output_dir": null, "options": {...}} -> {"ok": true, "results": [...]}
+    """
+    def __init__(self, socket_path: str | None = None, timeout: float | None = None):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+
+    def request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Sends one request and returns the server's response. Raises ConnectionError if no server is listening."""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(self.timeout)
+            try:
+                connection.connect(self.socket_path)
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                raise ConnectionError(f"No km server listening on {self.socket_path}: {e}") from e
+            connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+            with connection.makefile("rb") as reply:
+                line = reply.readline()
+        if not line:
+            raise ConnectionError(f"km server on {self.socket_path} closed the connection without a response")
+        return json.loads(line)
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import socket
+import logging
+import traceback
+import socketserver
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+from kriptomatte.application.services import CryptomatteExtractionService
+from kriptomatte.infrastructure.logging.metrics import StageMetrics
+from kriptomatte.infrastructure.persistence.cached_repository import CachingImageRepository
+from kriptomatte.application.options import describe_image, service_kwargs_from_options
+
+logger = logging.getLogger(__name__)
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            response = self.server.dispatch(request)
+        except Exception as e:
+            logger.error("Request failed: %s", e, exc_info=True)
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+    def finish(self):
+        # The response is flushed first, so a shutdown never cuts off its own reply
+        super().finish()
+        if self.server.shutdown_requested:
+            self.server.shutdown()
+
+class ExtractionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Long-lived km process serving ServerClient requests on a Unix domain socket.
+    Connections are handled on their own threads; the files of every request run on one shared
+    pool of worker threads, so concurrent requests share the cores and the caches of repo
+    (headers, manifests and decoded channels of recently used files).
+
+    Commands ({"command": ...}):
+      ping: {"pid"}. stats: cache and stage statistics. shutdown: stops the server.
+      inspect: {"files", "manifest"} -> {"files": [describe_image output or {"file", "error"}]}.
+      extract: {"files", "output_dir", "options"} -> {"results": [{"file", "ok", "seconds", "error"}]},
+               options as in application.options.EXTRACTION_OPTION_DEFAULTS.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, repo: CachingImageRepository, workers: int = 1):
+        if workers < 1:
+            raise ValueError(f"Server workers must be >= 1, got {workers}")
+        self.socket_path = socket_path
+        self.repo = repo
+        self.metrics = StageMetrics()
+        self.shutdown_requested = False
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="km-worker")
+        self._remove_stale_socket()
+        super().__init__(socket_path, _RequestHandler)
+
+    def server_bind(self):
+        # Requests name files to read and write, only this user may send them:
+        # the socket is created owner-only (umask 077), never accessible to others even briefly
+        previous_umask = os.umask(0o077)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(previous_umask)
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.socket_path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.socket_path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(self.socket_path)
+                return
+        raise RuntimeError(f"A km server is already listening on {self.socket_path}")
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        command = request.get("command")
+        if command == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if command == "stats":
+            return {"ok": True, "caches": self.repo.stats(), "metrics": self.metrics.report()}
+        if command == "shutdown":
+            logger.info("Shutdown requested")
+            # The handler stops serve_forever once this response is written
+            self.shutdown_requested = True
+            return {"ok": True}
+        if command == "inspect":
+            return self._inspect(request["files"], request.get("manifest", True))
+        if command == "extract":
+            return self._extract(request["files"], request.get("output_dir"), request.get("options", {}))
+        raise ValueError(f"Unknown command {command!r}")
+
+    def _inspect(self, files: List[str], with_manifest: bool) -> Dict[str, Any]:
+        def describe(file_path: str) -> Dict[str, Any]:
+            return {"file": file_path, **describe_image(self.repo.load_header(file_path), with_manifest)}
+
+        outcomes = self._run_all(files, describe)
+        entries = [entry if error is None else {"file": file_path, "error": error}
+                   for file_path, (entry, error) in zip(files, outcomes)]
+        return {"ok": all(error is None for _, error in outcomes), "files": entries}
+
+    def _extract(self, files: List[str], output_dir: str | None, options: Dict[str, Any]) -> Dict[str, Any]:
+        # Bad options fail the whole request before any file is touched
+        service_kwargs = service_kwargs_from_options(options)
+
+        def extract(file_path: str) -> float:
+            metrics = StageMetrics()
+            service = CryptomatteExtractionService(self.repo, metrics=metrics, **service_kwargs)
+            start = time.perf_counter()
+            try:
+                service.extract_all(file_path, output_dir)
+            finally:
+                self.metrics.merge(metrics.report())
+            return time.perf_counter() - start
+
+        outcomes = self._run_all(files, extract)
+        results = [{"file": file_path, "ok": error is None, "seconds": seconds, "error": error}
+                   for file_path, (seconds, error) in zip(files, outcomes)]
+        for result in results:
+            self.metrics.count("succeeded_files" if result["ok"] else "failed_files")
+        return {"ok": all(result["ok"] for result in results), "results": results}
+
+    def _run_all(self, files: List[str], fn: Callable[[str], Any]) -> List[tuple]:
+        """Runs fn over files on the worker pool. Returns (value, None) or (None, traceback) per file, in order."""
+        def run(file_path: str) -> tuple:
+            try:
+                return fn(file_path), None
+            except Exception:
+                logger.error("Failed %s", file_path, exc_info=True)
+                return None, traceback.format_exc()
+
+        return list(self._pool.map(run, files))
@@ -0,0 +1,27 @@
+import struct
+import numpy as np
+from kriptomatte.domain.services.hashing import MurmurHashService, murmurhash3_32, _BATCH_GROUP
+
+def reference_ids(names):
+    """uint32 IDs of hash_name_to_float, the scalar murmurhash3_32 plus the exponent fix-up."""
+    return np.array([struct.unpack('<L', struct.pack('<f', MurmurHashService.hash_name_to_float(name)))[0]
+                     for name in names], dtype=np.uint32)
+
+def test_murmurhash3_32_known_value():
+    assert murmurhash3_32(b"bunny") == 0x13851a76
+
+def test_hash_names_short_and_unaligned_lengths():
+    names = ["", "a", "ab", "abc", "abcd", "abcde", "abcdefg", "char_hero", "flowerB.leaf_03"]
+    np.testing.assert_array_equal(MurmurHashService.hash_names(names), reference_ids(names))
+
+def test_hash_names_multibyte_utf8():
+    names = ["é", "café", "日本語", "objeto_ñandú", "🐇", "mix_ß_字_🙂_end"]
+    np.testing.assert_array_equal(MurmurHashService.hash_names(names), reference_ids(names))
+
+def test_hash_names_regroups_long_inputs_in_order():
+    rng = np.random.default_rng(0)
+    # More than one length group, lengths interleaved so sorting by length reorders them
+    names = [f"obj_{i}" + "x" * int(rng.integers(0, 40)) for i in range(2 * _BATCH_GROUP + 123)]
+    ids = MurmurHashService.hash_names(names)
+    np.testing.assert_array_equal(ids, reference_ids(names))
+    np.testing.assert_array_equal(MurmurHashService.hash_names_to_float(names), ids.view(np.float32))
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from kriptomatte.domain.model.value_objects import PixelWindow, RankData
+from kriptomatte.domain.services.hashing import MurmurHashService
+from kriptomatte.domain.services.masking import (MaskCompositionService, LabelDecompositionService, BandAccumulator,
+                                                 RankIndex)
+from kriptomatte.domain.services.parallel_masking import ParallelDecompositionService
+
+HEIGHT, WIDTH, RANKS = 37, 29, 4
+OBJECT_IDS = MurmurHashService.hash_names([f"obj_{i}" for i in range(12)])
+
+def overlapping_frame(seed: int = 0) -> np.ndarray:
+    """
+    Interleaved float32 [H, W, 2 * RANKS] rank pairs where ranks overlap: pixels hold several objects,
+    some IDs repeat on several ranks of the same pixel, some entries have zero coverage, summed
+    coverage can exceed 1, and the last rank is empty.
+    """
+    rng = np.random.default_rng(seed)
+    ids = OBJECT_IDS[rng.integers(0, OBJECT_IDS.size, size=(HEIGHT, WIDTH, RANKS))]
+    # Same ID on rank 0 and 1 of some pixels
+    repeat = rng.random((HEIGHT, WIDTH)) < 0.2
+    ids[repeat, 1] = ids[repeat, 0]
+    coverage = rng.random((HEIGHT, WIDTH, RANKS)).astype(np.float32) * 0.9
+    coverage[rng.random((HEIGHT, WIDTH, RANKS)) < 0.15] = 0
+    ids[:, :, -1] = 0
+    coverage[:, :, -1] = 0
+    channels = np.empty((HEIGHT, WIDTH, 2 * RANKS), dtype=np.float32)
+    channels[:, :, 0::2] = ids.view(np.float32)
+    channels[:, :, 1::2] = coverage
+    return channels
+
+def reference_masks(channels: np.ndarray):
+    return {int(obj_id): MaskCompositionService.compute_mask(float(np.uint32(obj_id).view(np.float32)), channels)
+            for obj_id in OBJECT_IDS}
+
+def decomposed_masks(decomposition, window: PixelWindow):
+    return dict(LabelDecompositionService.iter_masks_from(decomposition, [int(i) for i in OBJECT_IDS], window))
+
+def assert_same_masks(masks, reference):
+    assert masks.keys() == reference.keys()
+    for obj_id, mask in reference.items():
+        np.testing.assert_array_equal(masks[obj_id], mask, err_msg=f"object {obj_id:08x}")
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_decompose_matches_compute_mask(seed):
+    channels = overlapping_frame(seed)
+    window = PixelWindow(height=HEIGHT, width=WIDTH)
+    reference = reference_masks(channels)
+    assert any(mask.any() for mask in reference.values())
+
+    assert_same_masks(decomposed_masks(LabelDecompositionService.decompose(OBJECT_IDS, channels), window), reference)
+    assert_same_masks(dict(LabelDecompositionService.iter_masks([int(i) for i in OBJECT_IDS], channels)), reference)
+
+def test_rank_index_and_rank_data_match_compute_mask():
+    channels = overlapping_frame()
+    window = PixelWindow(height=HEIGHT, width=WIDTH)
+    reference = reference_masks(channels)
+    ranks = RankData.from_channels(channels)
+    index = RankIndex.from_channels(ranks)
+    assert index.empty_ranks() == 1
+
+    assert_same_masks(decomposed_masks(LabelDecompositionService.decompose(OBJECT_IDS, ranks, index=index), window),
+                      reference)
+    for obj_id, mask in reference.items():
+        float_id = float(np.uint32(obj_id).view(np.float32))
+        np.testing.assert_array_equal(MaskCompositionService.compute_mask(float_id, ranks, index=index), mask)
+
+def test_half_coverage_matches_its_float32_upcast():
+    channels = overlapping_frame()
+    half = RankData(ids=RankData.from_channels(channels).ids,
+                    coverage=np.moveaxis(channels[:, :, 1::2], 2, 0).astype(np.float16))
+    upcast = channels.copy()
+    upcast[:, :, 1::2] = np.moveaxis(half.coverage, 0, 2).astype(np.float32)
+    window = PixelWindow(height=HEIGHT, width=WIDTH)
+    assert_same_masks(decomposed_masks(LabelDecompositionService.decompose(OBJECT_IDS, half), window),
+                      reference_masks(upcast))
+
+def test_bands_match_single_pass():
+    channels = overlapping_frame()
+    window = PixelWindow(height=HEIGHT, width=WIDTH)
+    reference = reference_masks(channels)
+
+    accumulator = BandAccumulator(OBJECT_IDS, window)
+    for first in range(0, HEIGHT, 10):
+        accumulator.add_band(first, channels[first:first + 10])
+    assert_same_masks(decomposed_masks(accumulator.finalize(), window), reference)
+
+    parallel = ParallelDecompositionService(workers=3, min_band_rows=1)
+    ranks = RankData.from_channels(channels)
+    assert_same_masks(decomposed_masks(parallel.decompose(OBJECT_IDS, ranks, index=RankIndex.from_channels(ranks)),
+                                       window), reference)
+    np.testing.assert_array_equal(parallel.union_mask(OBJECT_IDS[:5], ranks),
+                                  MaskCompositionService.compute_union_mask(OBJECT_IDS[:5], channels))
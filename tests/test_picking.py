@@ -0,0 +1,97 @@
+import os
+import numpy as np
+import pytest
+from benchmarks.generator import SyntheticExrSpec, generate
+from kriptomatte.application.picking import ObjectPickService
+from kriptomatte.domain.model.value_objects import BoundingBox, ColumnarManifest
+from kriptomatte.domain.services.masking import MaskCompositionService
+from kriptomatte.infrastructure.persistence.exr_repository import OpenExrRepository
+from kriptomatte.infrastructure.persistence.pick_index_store import PickIndexStore
+
+SPEC = SyntheticExrSpec(width=64, height=48, ranks=4, objects=12, softness=6.0, seed=3)
+
+@pytest.fixture
+def frame(tmp_path):
+    """A synthetic EXR and the compute_mask mask of every object of its layer, by name."""
+    path = str(tmp_path / "shot.exr")
+    generate(path, SPEC)
+    with OpenExrRepository().open_session(path) as session:
+        layer = session.image.layers[0]
+        channels = session.read_layers([layer])[layer.name]
+    manifest = layer.manifest if isinstance(layer.manifest, ColumnarManifest) else ColumnarManifest.from_dict(layer.manifest)
+    masks = {name: MaskCompositionService.compute_mask(manifest[name], channels) for name in manifest}
+    return path, masks
+
+def brute_force_polygon(vertices, height, width):
+    """Pixels whose centers are inside the polygon, even-odd rule, one test per pixel."""
+    ys, xs = np.mgrid[0:height, 0:width] + 0.5
+    inside = np.zeros((height, width), dtype=bool)
+    for (x0, y0), (x1, y1) in zip(vertices, vertices[1:] + vertices[:1]):
+        crosses = (y0 <= ys) != (y1 <= ys)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cross_x = x0 + (ys - y0) * (x1 - x0) / (y1 - y0)
+        inside ^= crosses & (xs < cross_x)
+    return inside
+
+def expected_region(masks, inside):
+    area = int(inside.sum())
+    return {name: (int((mask[inside] > 0).sum()), mask[inside].sum(dtype=np.int64) / 255.0 / area)
+            for name, mask in masks.items() if mask[inside].any()}
+
+def assert_region(hits, expected):
+    assert {hit.name: hit.pixels for hit in hits} == {name: pixels for name, (pixels, _) in expected.items()}
+    for hit in hits:
+        assert hit.coverage == pytest.approx(expected[hit.name][1])
+    assert [hit.coverage for hit in hits] == sorted((hit.coverage for hit in hits), reverse=True)
+
+def test_pick_matches_compute_mask(frame):
+    path, masks = frame
+    index = ObjectPickService(OpenExrRepository()).build(path)
+    overlapping = 0
+    for y in range(SPEC.height):
+        for x in range(SPEC.width):
+            hits = index.pick(x, y)
+            assert {hit.name: hit.coverage for hit in hits} == {name: mask[y, x] / 255.0
+                                                                for name, mask in masks.items() if mask[y, x]}
+            assert [hit.coverage for hit in hits] == sorted((hit.coverage for hit in hits), reverse=True)
+            overlapping += len(hits) > 1
+    assert overlapping
+    for name, mask in masks.items():
+        np.testing.assert_array_equal(index.mask_for(name), mask)
+    with pytest.raises(IndexError):
+        index.pick(SPEC.width, 0)
+
+def test_region_and_polygon_match_compute_mask(frame):
+    path, masks = frame
+    index = ObjectPickService(OpenExrRepository()).build(path)
+
+    box = BoundingBox(x_min=5, y_min=7, x_max=40, y_max=30)
+    inside = np.zeros((SPEC.height, SPEC.width), dtype=bool)
+    inside[box.slices()] = True
+    assert_region(index.pick_region(box), expected_region(masks, inside))
+
+    lasso = [(3.2, 2.7), (50.5, 9.0), (30.0, 20.0), (60.9, 44.1), (8.0, 40.0)]
+    assert_region(index.pick_region(lasso), expected_region(masks, brute_force_polygon(lasso, SPEC.height, SPEC.width)))
+
+def test_saved_index_is_reused_until_the_input_changes(frame, tmp_path):
+    path, masks = frame
+    index_path = str(tmp_path / "shot.kmpick")
+    service = ObjectPickService(OpenExrRepository())
+    built = service.open(path, index_path=index_path)
+    assert not isinstance(built.labels, np.memmap)
+
+    reused = service.open(path, index_path=index_path)
+    assert isinstance(reused.labels, np.memmap)
+    assert reused.names == built.names
+    np.testing.assert_array_equal(reused.labels, built.labels)
+    np.testing.assert_array_equal(reused.values, built.values)
+
+    # A re-rendered input (new content, different mtime) makes the saved index stale
+    generate(path, SyntheticExrSpec(**{**SPEC.__dict__, "seed": SPEC.seed + 1}))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    rebuilt = service.open(path, index_path=index_path)
+    assert not isinstance(rebuilt.labels, np.memmap)
+    assert not np.array_equal(rebuilt.values, built.values)
+    _, source = PickIndexStore.load(index_path)
+    assert source["input"]["mtime_ns"] == os.stat(path).st_mtime_ns